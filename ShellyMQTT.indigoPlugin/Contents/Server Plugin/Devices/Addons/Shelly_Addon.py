@@ -10,28 +10,39 @@ class Shelly_Addon(Shelly):
     The host devices can be a Shelly 1 or Shelly 1PM.
     """
 
+    # Add-ons only share the online status of their host, the host handles the rest of its topics
+    topicHandlers = {
+        "shellies/announce": None,
+        "{address}/input_event/{channel}": None,
+        "{address}/ext_temperatures": None,
+        "{address}/ext_humidities": None,
+        "{address}/temperature_status": None
+    }
+
     def __init__(self, device):
         Shelly.__init__(self, device)
+        # The Shelly object of the host, resolved from the host-id prop on first use
+        self.host = None
 
-    def getSubscriptions(self):
+    def refresh_device(self):
         """
-        Default method to return a list of topics that the device subscribes to.
+        Gets an indigo device from the device identifier. The host is resolved again the next time
+        it is needed since the host-id may have changed.
 
-        :return: A list.
+        :return: None
         """
 
-        pass
+        Shelly.refresh_device(self)
+        self.host = None
 
-    def handleMessage(self, topic, payload):
+    def getSubscriptions(self):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Default method to return a list of topics that the device subscribes to.
 
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
-        :return: None
+        :return: A list.
         """
 
-        Shelly.handleMessage(self, topic, payload)
+        pass
 
     def handleAction(self, action):
         """
@@ -51,9 +62,34 @@ class Shelly_Addon(Shelly):
         :return: The Shelly object that the sensor is attached to.
         """
 
-        dev = self.device.pluginProps.get('host-id', None)
-        if dev:
-            return indigo.activePlugin.shellyDevices.get(int(dev), None)
+        host = self.host
+        if host is None:
+            hostId = self.getHostId()
+            if hostId:
+                host = self.host = indigo.activePlugin.shellyDevices.get(hostId, None)
+        return host
+
+    def setHostDevice(self, host):
+        """
+        Binds the add-on to a host device.
+
+        :param host: The Shelly object of the host, or None to resolve the host from the host-id prop again.
+        :return: None
+        """
+
+        self.host = host
+
+    def getHostId(self):
+        """
+        Getter for the id of the host device.
+
+        :return: The device id of the host, or None if no host is set.
+        """
+
+        hostId = self.device.pluginProps.get('host-id', None)
+        if hostId:
+            return int(hostId)
+        return None
 
     def getBrokerId(self):
         """
@@ -62,8 +98,9 @@ class Shelly_Addon(Shelly):
         :return: The broker id of the host device.
         """
 
-        if self.getHostDevice():
-            return self.getHostDevice().getBrokerId()
+        host = self.getHostDevice()
+        if host:
+            return host.getBrokerId()
         else:
             return None
 
@@ -74,8 +111,9 @@ class Shelly_Addon(Shelly):
         :return: The address of the host device.
         """
 
-        if self.getHostDevice():
-            return self.getHostDevice().getAddress()
+        host = self.getHostDevice()
+        if host:
+            return host.getAddress()
         else:
             return None
 
@@ -86,8 +124,9 @@ class Shelly_Addon(Shelly):
         :return: The device ip address
         """
 
-        if self.getHostDevice():
-            return self.getHostDevice().getIpAddress()
+        host = self.getHostDevice()
+        if host:
+            return host.getIpAddress()
         else:
             return None
 
@@ -98,8 +137,9 @@ class Shelly_Addon(Shelly):
         :return: The message type of the host device.
         """
 
-        if self.getHostDevice():
-            return self.getHostDevice().getMessageType()
+        host = self.getHostDevice()
+        if host:
+            return host.getMessageType()
         else:
             return None
 
@@ -110,8 +150,9 @@ class Shelly_Addon(Shelly):
         :return: A list of message type being listened to.
         """
 
-        if self.getHostDevice():
-            return [self.getHostDevice().getMessageType()]
+        host = self.getHostDevice()
+        if host:
+            return [host.getMessageType()]
         else:
             return []
 
@@ -1,7 +1,7 @@
 # coding=utf-8
 import indigo
-import json
 from .Shelly_Addon import Shelly_Addon
+from ..ShellyPayload import decodeSensors
 
 
 class Shelly_Addon_DHT22(Shelly_Addon):
@@ -10,6 +10,13 @@ class Shelly_Addon_DHT22(Shelly_Addon):
     The host devices can be a Shelly 1 or Shelly 1PM.
     """
 
+    topicHandlers = {
+        "{address}/ext_temperature/{probe}": "handleTemperature",
+        "{address}/ext_humidity/{probe}": "handleHumidity",
+        "{address}/ext_temperatures": "handleTemperatures",
+        "{address}/ext_humidities": "handleHumidities"
+    }
+
     def __init__(self, device):
         Shelly_Addon.__init__(self, device)
 
@@ -41,57 +48,96 @@ class Shelly_Addon_DHT22(Shelly_Addon):
         :return: None
         """
 
-        if topic == "{}/ext_temperature/{}".format(self.getAddress(), self.getProbeNumber()):
-            # For some reason, the shelly reports the temperature with a preceding colon...
-            temperature = payload
-            try:
-                self.setTemperature(float(temperature))
-            except ValueError:
-                self.logger.error(u"Unable to convert value of \"{}\" into a float!".format(payload))
-        elif topic == "{}/ext_humidity/{}".format(self.getAddress(), self.getProbeNumber()):
-            decimals = int(self.device.pluginProps.get('humidity-decimals', 1))
-            offset = 0
-            try:
-                offset = float(self.device.pluginProps.get('humidity-offset', 0))
-            except ValueError:
-                self.logger.error(u"Unable to convert offset of \"{}\" into a float!".format(self.device.pluginProps.get('humidity-offset', 0)))
+        with self.stateTransaction():
+            Shelly_Addon.handleMessage(self, topic, payload)
 
+            # Set the display state after data changed
+            temp = self.getState('temperature')
+            temp_decimals = int(self.device.pluginProps.get('temp-decimals', 1))
+            temp_units = self.device.pluginProps.get('temp-units', 'F')[-1]
+            humidity = self.getState('humidity')
+            humidity_decimals = int(self.device.pluginProps.get('humidity-decimals', 1))
+            self.updateStateOnServer(key="status", value='{:.{}f}°{} / {:.{}f}%'.format(temp, temp_decimals, temp_units, humidity, humidity_decimals))
+            self.refreshStateImage()
+
+    def handleTemperature(self, payload):
+        """
+        Handles a message reporting the temperature of the probe.
+
+        :param payload: The temperature.
+        :return: None
+        """
+
+        # For some reason, the shelly reports the temperature with a preceding colon...
+        temperature = payload
+        try:
+            self.setTemperature(float(temperature))
+        except ValueError:
+            self.logger.error(u"Unable to convert value of \"{}\" into a float!".format(payload))
+
+    def handleHumidity(self, payload):
+        """
+        Handles a message reporting the humidity of the probe.
+
+        :param payload: The relative humidity.
+        :return: None
+        """
+
+        decimals = int(self.device.pluginProps.get('humidity-decimals', 1))
+        offset = 0
+        try:
+            offset = float(self.device.pluginProps.get('humidity-offset', 0))
+        except ValueError:
+            self.logger.error(u"Unable to convert offset of \"{}\" into a float!".format(self.device.pluginProps.get('humidity-offset', 0)))
+
+        try:
+            humidity = float(payload) + offset
+            self.updateStateOnServer(key="humidity", value=humidity, uiValue='{:.{}f}%'.format(humidity, decimals), decimalPlaces=decimals)
+        except ValueError:
+            self.logger.error(u"Unable to convert value of \"{}\" into a float!".format(payload))
+
+    def handleTemperatures(self, payload):
+        """
+        Handles a message reporting the temperatures of all probes on the host.
+
+        :param payload: The json temperatures keyed by channel.
+        :return: None
+        """
+
+        if len(self.getProbeNumber()) > 1:
             try:
-                humidity = float(payload) + offset
-                self.device.updateStateOnServer(key="humidity", value=humidity, uiValue='{:.{}f}%'.format(humidity, decimals), decimalPlaces=decimals)
-            except ValueError:
-                self.logger.error(u"Unable to convert value of \"{}\" into a float!".format(payload))
-        elif topic == "{}/ext_temperatures".format(self.getAddress()) and len(self.getProbeNumber()) > 1:
-            try:
-                data = json.loads(payload)
-                for sensor in data.values():
-                    if sensor['hwID'] == self.getProbeNumber():
-                        value = sensor['tC']
-                        self.handleMessage("{}/ext_temperature/{}".format(self.getAddress(), self.getProbeNumber()), value)
-                        break
+                sensor = decodeSensors(payload).get(self.getProbeNumber(), None)
+                if sensor:
+                    self.handleTemperature(sensor['tC'])
             except ValueError:
                 self.logger.warn("Unable to convert payload to json: {}".format(payload))
-        elif topic == "{}/ext_humidities".format(self.getAddress()) and len(self.getProbeNumber()) > 1:
+
+    def handleHumidities(self, payload):
+        """
+        Handles a message reporting the humidities of all probes on the host.
+
+        :param payload: The json humidities keyed by channel.
+        :return: None
+        """
+
+        if len(self.getProbeNumber()) > 1:
             try:
-                data = json.loads(payload)
-                for sensor in data.values():
-                    if sensor['hwID'] == self.getProbeNumber():
-                        value = sensor['hum']
-                        self.handleMessage("{}/ext_humidity/{}".format(self.getAddress(), self.getProbeNumber()), value)
-                        break
+                sensor = decodeSensors(payload).get(self.getProbeNumber(), None)
+                if sensor:
+                    self.handleHumidity(sensor['hum'])
             except ValueError:
                 self.logger.warn("Unable to convert payload to json: {}".format(payload))
-        elif topic == "{}/online".format(self.getAddress()):
-            Shelly_Addon.handleMessage(self, topic, payload)
 
-        # Set the display state after data changed
-        temp = self.device.states['temperature']
-        temp_decimals = int(self.device.pluginProps.get('temp-decimals', 1))
-        temp_units = self.device.pluginProps.get('temp-units', 'F')[-1]
-        humidity = self.device.states['humidity']
-        humidity_decimals = int(self.device.pluginProps.get('humidity-decimals', 1))
-        self.device.updateStateOnServer(key="status", value='{:.{}f}°{} / {:.{}f}%'.format(temp, temp_decimals, temp_units, humidity, humidity_decimals))
-        self.updateStateImage()
+    def getTopicFields(self):
+        """
+        Getter for the values that are substituted into the topics of the topic handlers.
+
+        :return: A dictionary of field names and values.
+        """
+
+        fields = Shelly_Addon.getTopicFields(self)
+        fields['probe'] = self.getProbeNumber()
+        return fields
 
     def handleAction(self, action):
         """
@@ -119,7 +165,7 @@ class Shelly_Addon_DHT22(Shelly_Addon):
         :return:
         """
 
-        if self.device.states.get('online', True):
+        if self.getState('online', True):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensorOn)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensor)
@@ -1,7 +1,7 @@
 # coding=utf-8
 import indigo
-import json
 from .Shelly_Addon import Shelly_Addon
+from ..ShellyPayload import decodeSensors
 
 
 class Shelly_Addon_DS1820(Shelly_Addon):
@@ -10,6 +10,11 @@ class Shelly_Addon_DS1820(Shelly_Addon):
     The host devices can be a Shelly 1 or Shelly 1PM.
     """
 
+    topicHandlers = {
+        "{address}/ext_temperature/{probe}": "handleTemperature",
+        "{address}/ext_temperatures": "handleTemperatures"
+    }
+
     def __init__(self, device):
         Shelly_Addon.__init__(self, device)
 
@@ -39,33 +44,58 @@ class Shelly_Addon_DS1820(Shelly_Addon):
         :return: None
         """
 
-        if topic == "{}/ext_temperature/{}".format(self.getAddress(), self.getProbeNumber()):
-            try:
-                temperature = float(payload)
-                self.setTemperature(temperature)
-            except ValueError:
-                self.logger.error(u"Unable to convert value of \"{}\" into a float!".format(payload))
-        elif topic == "{}/ext_temperatures".format(self.getAddress()) and len(self.getProbeNumber()) > 1:
-            # If the user selected a channel number (0-2), then the string version will have 1 character
-            # and we will not get to this block
+        with self.stateTransaction():
+            Shelly_Addon.handleMessage(self, topic, payload)
+
+            # Update the display state after data changed
+            temp = self.getState('temperature')
+            temp_decimals = int(self.device.pluginProps.get('temp-decimals', 1))
+            temp_units = self.device.pluginProps.get('temp-units', 'F')[-1]
+            self.updateStateOnServer(key="status", value='{:.{}f}°{}'.format(temp, temp_decimals, temp_units))
+            self.refreshStateImage()
+
+    def handleTemperature(self, payload):
+        """
+        Handles a message reporting the temperature of the probe.
+
+        :param payload: The temperature.
+        :return: None
+        """
+
+        try:
+            temperature = float(payload)
+            self.setTemperature(temperature)
+        except ValueError:
+            self.logger.error(u"Unable to convert value of \"{}\" into a float!".format(payload))
+
+    def handleTemperatures(self, payload):
+        """
+        Handles a message reporting the temperatures of all probes on the host.
+
+        :param payload: The json temperatures keyed by channel.
+        :return: None
+        """
+
+        # If the user selected a channel number (0-2), then the string version will have 1 character
+        # and the temperature will be reported on its own topic
+        if len(self.getProbeNumber()) > 1:
             try:
-                data = json.loads(payload)
-                for sensor in data.values():
-                    if sensor['hwID'] == self.getProbeNumber():
-                        value = sensor['tC']
-                        self.handleMessage("{}/ext_temperature/{}".format(self.getAddress(), self.getProbeNumber()), value)
-                        break
+                sensor = decodeSensors(payload).get(self.getProbeNumber(), None)
+                if sensor:
+                    self.handleTemperature(sensor['tC'])
             except ValueError:
                 self.logger.warn("Unable to convert payload to json: {}".format(payload))
-        elif topic == "{}/online".format(self.getAddress()):
-            Shelly_Addon.handleMessage(self, topic, payload)
 
-        # Update the display state after data changed
-        temp = self.device.states['temperature']
-        temp_decimals = int(self.device.pluginProps.get('temp-decimals', 1))
-        temp_units = self.device.pluginProps.get('temp-units', 'F')[-1]
-        self.device.updateStateOnServer(key="status", value='{:.{}f}°{}'.format(temp, temp_decimals, temp_units))
-        self.updateStateImage()
+    def getTopicFields(self):
+        """
+        Getter for the values that are substituted into the topics of the topic handlers.
+
+        :return: A dictionary of field names and values.
+        """
+
+        fields = Shelly_Addon.getTopicFields(self)
+        fields['probe'] = self.getProbeNumber()
+        return fields
 
     def handleAction(self, action):
         """
@@ -93,7 +123,7 @@ class Shelly_Addon_DS1820(Shelly_Addon):
         :return:
         """
 
-        if self.device.states.get('online', True):
+        if self.getState('online', True):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensorOn)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensor)
@@ -9,6 +9,10 @@ class Shelly_Addon_Detached_Switch(Shelly_Addon):
     The host devices can be a Shelly 1 or Shelly 1PM.
     """
 
+    topicHandlers = {
+        "{address}/input/{channel}": "handleInput"
+    }
+
     def __init__(self, device):
         Shelly_Addon.__init__(self, device)
 
@@ -37,19 +41,26 @@ class Shelly_Addon_Detached_Switch(Shelly_Addon):
         :return: None
         """
 
-        if topic == "{}/input/{}".format(self.getAddress(), self.getChannel()):
-            # For some reason, the shelly reports the temperature with a preceding colon...
-            invert = self.device.pluginProps.get("invert", False)
-            state = (payload == '0') if invert else (payload == '1')
-            if self.device.states['onOffState'] != state:
-                self.logCommandReceived("{}".format("on" if state else "off"))
-            self.device.updateStateOnServer(key="onOffState", value=state)
-        elif topic == "{}/online".format(self.getAddress()):
+        with self.stateTransaction():
             Shelly_Addon.handleMessage(self, topic, payload)
 
-        # Update the display state after data changed
-        # self.device.updateStateOnServer(key="status", value='{}'.format("on" if self.device.states.get("sw-input", False) else "off"))
-        self.updateStateImage()
+            # Update the display state after data changed
+            # self.updateStateOnServer(key="status", value='{}'.format("on" if self.getState("sw-input", False) else "off"))
+            self.refreshStateImage()
+
+    def handleInput(self, payload):
+        """
+        Handles a message reporting the state of the switch input.
+
+        :param payload: "1" if the input is on.
+        :return: None
+        """
+
+        invert = self.device.pluginProps.get("invert", False)
+        state = (payload == '0') if invert else (payload == '1')
+        if self.getState('onOffState') != state:
+            self.logCommandReceived("{}".format("on" if state else "off"))
+        self.updateStateOnServer(key="onOffState", value=state)
 
     def handleAction(self, action):
         """
@@ -68,7 +79,7 @@ class Shelly_Addon_Detached_Switch(Shelly_Addon):
         :return: None
         """
 
-        if self.device.states.get('onOffState', True):
+        if self.getState('onOffState', True):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
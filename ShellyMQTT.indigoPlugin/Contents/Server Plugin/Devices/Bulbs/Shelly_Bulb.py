@@ -31,53 +31,49 @@ class Shelly_Bulb(Shelly_Bulb_Vintage):
                 "{}/light/{}/energy".format(address, self.getChannel())
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleLightStatus(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the status of the bulb.
 
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        :param payload: The json status of the bulb.
         :return: None
         """
 
-        if topic == "{}/light/{}/status".format(self.getAddress(), self.getChannel()):
-            # the payload will be json in the form
-            # {
-            #     "ison": false,        /* whether the bulb is on */
-            #     "has_timer": false,   /* whether a timer is currently armed */
-            #     "timer_remaining": 0, /* if there is an active timer, shows seconds until timer elapses; 0 otherwise */
-            #     "mode": "color",      /* currently configured mode */
-            #     "red": 255,           /* red brightness, 0..255, applies in mode="color" */
-            #     "green": 125,         /* green brightness, 0..255, applies in mode="color" */
-            #     "blue": 0,            /* blue brightness, 0..255, applies in mode="color" */
-            #     "white": 0,           /* white brightness, 0..255, applies in mode="color" */
-            #     "gain": 100,          /* gain for all channels, 0..100, applies in mode="color" */
-            #     "temp": 5406,         /* color temperature in K, 3000..6500, applies in mode="white" */
-            #     "brightness": 90,     /* brightness, 0..100, applies in mode="white" */
-            #     "effect": 0           /* currently applied effect */
-            # }
-            try:
-                payload = json.loads(payload)
-                if payload['ison']:
-                    # we will accept a brightness value and save it
-                    self.device.updateStateOnServer("brightnessLevel", payload['brightness'])
-                    self.turnOn()
-                    self.logCommandReceived("brightness to {}%".format(payload['brightness']))
-                else:
-                    # The light should be off regardless of a reported brightness value
-                    if not self.isOff():
-                        self.logCommandReceived("off")
-                    self.turnOff()
-
-                # Record the color data
-                self.device.updateStateOnServer("redLevel", payload.get("red", 0))
-                self.device.updateStateOnServer("greenLevel", payload.get("green", 0))
-                self.device.updateStateOnServer("blueLevel", payload.get("blue", 0))
-                self.device.updateStateOnServer("whiteLevel", payload.get("white", 0))
-            except ValueError:
-                self.logger.error(u"Problem parsing JSON: {}".format(payload))
-        else:
-            Shelly_Bulb_Vintage.handleMessage(self, topic, payload)
+        # the payload will be json in the form
+        # {
+        #     "ison": false,        /* whether the bulb is on */
+        #     "has_timer": false,   /* whether a timer is currently armed */
+        #     "timer_remaining": 0, /* if there is an active timer, shows seconds until timer elapses; 0 otherwise */
+        #     "mode": "color",      /* currently configured mode */
+        #     "red": 255,           /* red brightness, 0..255, applies in mode="color" */
+        #     "green": 125,         /* green brightness, 0..255, applies in mode="color" */
+        #     "blue": 0,            /* blue brightness, 0..255, applies in mode="color" */
+        #     "white": 0,           /* white brightness, 0..255, applies in mode="color" */
+        #     "gain": 100,          /* gain for all channels, 0..100, applies in mode="color" */
+        #     "temp": 5406,         /* color temperature in K, 3000..6500, applies in mode="white" */
+        #     "brightness": 90,     /* brightness, 0..100, applies in mode="white" */
+        #     "effect": 0           /* currently applied effect */
+        # }
+        try:
+            payload = json.loads(payload)
+            if payload['ison']:
+                # we will accept a brightness value and save it
+                self.updateStateOnServer("brightnessLevel", payload['brightness'])
+                self.turnOn()
+                self.logCommandReceived("brightness to {}%".format(payload['brightness']))
+            else:
+                # The light should be off regardless of a reported brightness value
+                if not self.isOff():
+                    self.logCommandReceived("off")
+                self.turnOff()
+
+            # Record the color data
+            self.updateStateOnServer("redLevel", payload.get("red", 0))
+            self.updateStateOnServer("greenLevel", payload.get("green", 0))
+            self.updateStateOnServer("blueLevel", payload.get("blue", 0))
+            self.updateStateOnServer("whiteLevel", payload.get("white", 0))
+        except ValueError:
+            self.logger.error(u"Problem parsing JSON: {}".format(payload))
 
     def handleAction(self, action):
         """
@@ -89,20 +85,20 @@ class Shelly_Bulb(Shelly_Bulb_Vintage):
 
         if action.deviceAction == indigo.kDeviceAction.SetColorLevels:
             if 'whiteLevel' in action.actionValue:
-                self.device.updateStateOnServer("whiteLevel", action.actionValue['whiteLevel'])
+                self.updateStateOnServer("whiteLevel", action.actionValue['whiteLevel'])
             if 'redLevel' in action.actionValue:
-                self.device.updateStateOnServer("redLevel", int(float(action.actionValue['redLevel'])))
+                self.updateStateOnServer("redLevel", int(float(action.actionValue['redLevel'])))
             if 'greenLevel' in action.actionValue:
-                self.device.updateStateOnServer("greenLevel", int(float(action.actionValue['greenLevel'])))
+                self.updateStateOnServer("greenLevel", int(float(action.actionValue['greenLevel'])))
             if 'blueLevel' in action.actionValue:
-                self.device.updateStateOnServer("blueLevel", int(float(action.actionValue['blueLevel'])))
+                self.updateStateOnServer("blueLevel", int(float(action.actionValue['blueLevel'])))
             self.set()
             self.logCommandSent(
                 u"color values RGBW to {}, {}, {}, {}".format(
-                    self.device.states['redLevel'],
-                    self.device.states['greenLevel'],
-                    self.device.states['blueLevel'],
-                    self.device.states['whiteLevel']
+                    self.getState('redLevel'),
+                    self.getState('greenLevel'),
+                    self.getState('blueLevel'),
+                    self.getState('whiteLevel')
                 )
             )
         else:
@@ -115,11 +111,11 @@ class Shelly_Bulb(Shelly_Bulb_Vintage):
         :return: None
         """
 
-        red = self.device.states.get('redLevel', 0)
-        green = self.device.states.get('greenLevel', 0)
-        blue = self.device.states.get('blueLevel', 0)
-        white = self.device.states.get('whiteLevel', 0)
-        brightness = self.device.states.get('brightnessLevel', 0)
+        red = self.getState('redLevel', 0)
+        green = self.getState('greenLevel', 0)
+        blue = self.getState('blueLevel', 0)
+        white = self.getState('whiteLevel', 0)
+        brightness = self.getState('brightnessLevel', 0)
         turn = "on" if brightness >= 1 else "off"
 
         # Ensure all values are in the 8-bit range
@@ -31,43 +31,39 @@ class Shelly_Bulb_Duo(Shelly_Bulb_Vintage):
                 "{}/light/{}/energy".format(address, self.getChannel())
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleLightStatus(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the status of the bulb.
 
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        :param payload: The json status of the bulb.
         :return: None
         """
 
-        if topic == "{}/light/{}/status".format(self.getAddress(), self.getChannel()):
-            # the payload will be json in the form: {"ison": true/false, "mode": "white", "brightness": x}
-            try:
-                payload = json.loads(payload)
-                if payload['ison']:
-                    # we will accept a brightness value and save it
-                    if self.isOff():
-                        # self.logger.info(u"\"{}\" on to {}%".format(self.device.name, payload['brightness']))
-                        self.logCommandReceived(u"brightness to {}%".format(payload['brightness']))
-                    elif self.device.states['brightnessLevel'] != payload['brightness']:
-                        # self.logger.info(u"\"{}\" set to {}%".format(self.device.name, payload['brightness']))
-                        self.logCommandReceived(u"brightness to {}%".format(payload['brightness']))
-                    self.device.updateStateOnServer("brightnessLevel", payload['brightness'])
-                    self.device.updateStateOnServer("whiteLevel", payload['white'])
-
-                    if self.device.states['whiteTemperature'] != payload['temp']:
-                        self.logCommandReceived(u"white temperature to {}°K".format(payload['temp']))
-                    self.device.updateStateOnServer("whiteTemperature", payload['temp'])
-                    self.turnOn()
-                else:
-                    # The light should be off regardless of a reported brightness value
-                    if not self.isOff():
-                        self.logCommandReceived("off")
-                    self.turnOff()
-            except ValueError:
-                self.logger.error(u"Problem parsing JSON: {}".format(payload))
-        else:
-            Shelly_Bulb_Vintage.handleMessage(self, topic, payload)
+        # the payload will be json in the form: {"ison": true/false, "mode": "white", "brightness": x}
+        try:
+            payload = json.loads(payload)
+            if payload['ison']:
+                # we will accept a brightness value and save it
+                if self.isOff():
+                    # self.logger.info(u"\"{}\" on to {}%".format(self.device.name, payload['brightness']))
+                    self.logCommandReceived(u"brightness to {}%".format(payload['brightness']))
+                elif self.getState('brightnessLevel') != payload['brightness']:
+                    # self.logger.info(u"\"{}\" set to {}%".format(self.device.name, payload['brightness']))
+                    self.logCommandReceived(u"brightness to {}%".format(payload['brightness']))
+                self.updateStateOnServer("brightnessLevel", payload['brightness'])
+                self.updateStateOnServer("whiteLevel", payload['white'])
+
+                if self.getState('whiteTemperature') != payload['temp']:
+                    self.logCommandReceived(u"white temperature to {}°K".format(payload['temp']))
+                self.updateStateOnServer("whiteTemperature", payload['temp'])
+                self.turnOn()
+            else:
+                # The light should be off regardless of a reported brightness value
+                if not self.isOff():
+                    self.logCommandReceived("off")
+                self.turnOff()
+        except ValueError:
+            self.logger.error(u"Problem parsing JSON: {}".format(payload))
 
     def handleAction(self, action):
         """
@@ -79,10 +75,10 @@ class Shelly_Bulb_Duo(Shelly_Bulb_Vintage):
 
         if action.deviceAction == indigo.kDeviceAction.SetColorLevels:
             if 'whiteLevel' in action.actionValue:
-                self.device.updateStateOnServer("whiteLevel", int(float(action.actionValue['whiteLevel'])))
+                self.updateStateOnServer("whiteLevel", int(float(action.actionValue['whiteLevel'])))
                 self.logCommandSent(u"white level to {}%".format(action.actionValue['whiteLevel']))
             if 'whiteTemperature' in action.actionValue:
-                self.device.updateStateOnServer("whiteTemperature", int(float(action.actionValue['whiteTemperature'])))
+                self.updateStateOnServer("whiteTemperature", int(float(action.actionValue['whiteTemperature'])))
                 self.logCommandSent(u"white temperature to {}°K".format(action.actionValue['whiteTemperature']))
             self.set()
         else:
@@ -95,9 +91,9 @@ class Shelly_Bulb_Duo(Shelly_Bulb_Vintage):
         :return: None
         """
 
-        brightness = self.device.states.get('brightnessLevel', 0)
-        white = self.device.states.get('whiteLevel', 0)
-        temp = self.device.states.get('whiteTemperature', 5000)
+        brightness = self.getState('brightnessLevel', 0)
+        white = self.getState('whiteLevel', 0)
+        temp = self.getState('whiteTemperature', 5000)
         turn = "on" if self.isOn() else "off"
 
         # Ensure values are within their operating range
@@ -31,17 +31,6 @@ class Shelly_Plug(Shelly_1PM):
                 "{}/relay/{}/energy".format(address, self.getChannel())
             ]
 
-    def handleMessage(self, topic, payload):
-        """
-        This method is called when a message comes in and matches one of this devices subscriptions.
-
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
-        :return: None
-        """
-
-        Shelly_1PM.handleMessage(self, topic, payload)
-
     @staticmethod
     def validateConfigUI(valuesDict, typeId, devId):
         """
@@ -8,6 +8,10 @@ class Shelly_Plug_S(Shelly_Plug):
 
     """
 
+    stateSampling = {
+        "curEnergyLevel": ("power", "{:.2f} W")
+    }
+
     def __init__(self, device):
         Shelly_Plug.__init__(self, device)
 
@@ -33,17 +37,6 @@ class Shelly_Plug_S(Shelly_Plug):
                 "{}/overtemperature".format(address)
             ]
 
-    def handleMessage(self, topic, payload):
-        """
-        This method is called when a message comes in and matches one of this devices subscriptions.
-
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
-        :return: None
-        """
-
-        Shelly_Plug.handleMessage(self, topic, payload)
-
     @staticmethod
     def validateConfigUI(valuesDict, typeId, devId):
         """
@@ -55,4 +48,16 @@ class Shelly_Plug_S(Shelly_Plug):
         :return: Tuple of the form (valid, valuesDict, errors)
         """
 
-        return Shelly_Plug.validateConfigUI(valuesDict, typeId, devId)
+        isValid, valuesDict, errors = Shelly_Plug.validateConfigUI(valuesDict, typeId, devId)
+
+        # Validate the sampling interval
+        interval = valuesDict.get('power-sample-interval', None)
+        if interval:
+            try:
+                if float(interval) < 0:
+                    raise ValueError()
+            except ValueError:
+                isValid = False
+                errors['power-sample-interval'] = u"You must enter a number of seconds of 0 or more."
+
+        return isValid, valuesDict, errors
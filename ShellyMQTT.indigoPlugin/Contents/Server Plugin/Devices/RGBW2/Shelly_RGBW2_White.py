@@ -5,6 +5,11 @@ from ..Relays.Shelly_1PM import Shelly_1PM
 
 
 class Shelly_RGBW2_White(Shelly_1PM):
+
+    topicHandlers = {
+        "{address}/white/{channel}/status": "handleWhiteStatus"
+    }
+
     def __init__(self, device):
         Shelly_1PM.__init__(self, device)
 
@@ -24,64 +29,60 @@ class Shelly_RGBW2_White(Shelly_1PM):
                 "{}/white/{}/status".format(address, self.getChannel())
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleWhiteStatus(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the status of the white channel.
 
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        :param payload: The json status of the channel.
         :return: None
         """
 
-        if topic == "{}/white/{}/status".format(self.getAddress(), self.getChannel()):
-            # The payload will be of the form:
-            # {
-            #     "ison",             /* whether the output is ON or OFF */
-            #     "has_timer",        /* whether a timer is currently armed for this channel */
-            #     "timer_remaining",  /* if there is an active timer, shows seconds until timer elapses; 0 otherwise */
-            #     "mode",             /* currently configured mode */
-            #     "brightness",       /* output brightness, 0..100 */
-            #     "power",            /* consumed power, W */
-            #     "overpower"         /* whether an overpower condition has occurred */
-            # }
-            try:
-                payload = json.loads(payload)
-                # Ensure the device is in white mode
-                if payload.get("mode", "") != "white":
-                    self.logger.error(u"\"{}\" expects the device to be in mode \"white\", but is in mode \"{}\"".format(self.device.name, payload.get("mode", "")))
-                    return
-
-                if payload.get("ison", False):
-                    # we will accept a brightness value and save it
-                    if self.isOff():
-                        # self.logger.info(u"\"{}\" on to {}%".format(self.device.name, payload['brightness']))
-                        self.logCommandReceived("brightness to {}%".format(payload['brightness']))
-                    elif self.device.states['brightnessLevel'] != payload['brightness']:
-                        # Brightness will change
-                        # self.logger.info(u"\"{}\" set to {}%".format(self.device.name, payload['brightness']))
-                        self.logCommandReceived("brightness to {}%".format(payload['brightness']))
-
-                    self.applyBrightness(payload['brightness'])
-                else:
-                    # The light should be off regardless of a reported brightness value
-                    if not self.isOff():
-                        self.logCommandReceived("off")
-                    self.turnOff()
-
-                # Record the overpower status
-                overloaded = payload.get("overpower", False)
-                if not self.device.states['overpower'] and overloaded:
-                    self.logger.error(u"\"{}\" was overloaded!".format(self.device.name))
-                self.device.updateStateOnServer('overpower', overloaded)
-
-                # Record the current power
-                power = payload.get("power", None)
-                if power is not None:
-                    self.device.updateStateOnServer('curEnergyLevel', power, uiValue='{} W'.format(power))
-            except ValueError:
-                self.logger.error(u"Problem parsing JSON: {}".format(payload))
-        else:
-            Shelly_1PM.handleMessage(self, topic.replace("light", "relay"), payload)
+        # The payload will be of the form:
+        # {
+        #     "ison",             /* whether the output is ON or OFF */
+        #     "has_timer",        /* whether a timer is currently armed for this channel */
+        #     "timer_remaining",  /* if there is an active timer, shows seconds until timer elapses; 0 otherwise */
+        #     "mode",             /* currently configured mode */
+        #     "brightness",       /* output brightness, 0..100 */
+        #     "power",            /* consumed power, W */
+        #     "overpower"         /* whether an overpower condition has occurred */
+        # }
+        try:
+            payload = json.loads(payload)
+            # Ensure the device is in white mode
+            if payload.get("mode", "") != "white":
+                self.logger.error(u"\"{}\" expects the device to be in mode \"white\", but is in mode \"{}\"".format(self.device.name, payload.get("mode", "")))
+                return
+
+            if payload.get("ison", False):
+                # we will accept a brightness value and save it
+                if self.isOff():
+                    # self.logger.info(u"\"{}\" on to {}%".format(self.device.name, payload['brightness']))
+                    self.logCommandReceived("brightness to {}%".format(payload['brightness']))
+                elif self.getState('brightnessLevel') != payload['brightness']:
+                    # Brightness will change
+                    # self.logger.info(u"\"{}\" set to {}%".format(self.device.name, payload['brightness']))
+                    self.logCommandReceived("brightness to {}%".format(payload['brightness']))
+
+                self.applyBrightness(payload['brightness'])
+            else:
+                # The light should be off regardless of a reported brightness value
+                if not self.isOff():
+                    self.logCommandReceived("off")
+                self.turnOff()
+
+            # Record the overpower status
+            overloaded = payload.get("overpower", False)
+            if not self.getState('overpower') and overloaded:
+                self.logger.error(u"\"{}\" was overloaded!".format(self.device.name))
+            self.updateStateOnServer('overpower', overloaded)
+
+            # Record the current power
+            power = payload.get("power", None)
+            if power is not None:
+                self.updateStateOnServer('curEnergyLevel', power, uiValue='{} W'.format(power))
+        except ValueError:
+            self.logger.error(u"Problem parsing JSON: {}".format(payload))
 
     def handleAction(self, action):
         """
@@ -145,7 +146,7 @@ class Shelly_RGBW2_White(Shelly_1PM):
         """
 
         if brightness > 0:
-            # if self.device.states['brightnessLevel'] != brightness:
+            # if self.getState('brightnessLevel') != brightness:
             #     if self.isOn():
             #         self.logger.info(u"\"{}\" set to {}%".format(self.device.name, brightness))
             #     else:
@@ -154,7 +155,7 @@ class Shelly_RGBW2_White(Shelly_1PM):
         else:
             self.turnOff()
 
-        self.device.updateStateOnServer("brightnessLevel", brightness)
+        self.updateStateOnServer("brightnessLevel", brightness)
 
     def set(self):
         """
@@ -163,7 +164,7 @@ class Shelly_RGBW2_White(Shelly_1PM):
         :return: None
         """
 
-        brightness = self.device.states.get('brightnessLevel', 0)
+        brightness = self.getState('brightnessLevel', 0)
         turn = "on" if self.isOn() else "off"
         payload = {
             "turn": turn,
@@ -178,8 +179,8 @@ class Shelly_RGBW2_White(Shelly_1PM):
         :return: None
         """
 
-        self.device.updateStateOnServer(key='onOffState', value=True)
-        self.updateStateImage()
+        self.updateStateOnServer(key='onOffState', value=True)
+        self.refreshStateImage()
 
     def updateStateImage(self):
         """
@@ -7,6 +7,12 @@ class Shelly_1(Shelly):
     The Shelly 1 is a simple on/off relay.
     """
 
+    topicHandlers = {
+        "{address}/relay/{channel}": "handleRelay",
+        "{address}/input/{channel}": "handleInput",
+        "{address}/longpush/{channel}": "handleLongpush"
+    }
+
     def __init__(self, device):
         Shelly.__init__(self, device)
 
@@ -32,30 +38,42 @@ class Shelly_1(Shelly):
                 "{}/ext_humidities".format(address)
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleRelay(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the state of the relay.
 
-        :param topic: The topic of the message.
-        :param payload: The payload of the message.
+        :param payload: Either "on" or "off".
         :return: None
         """
 
-        if topic == "{}/relay/{}".format(self.getAddress(), self.getChannel()):
-            if payload == "on":
-                if not self.isOn():
-                    self.logCommandReceived("on")
-                self.turnOn()
-            elif payload == "off":
-                if not self.isOff():
-                    self.logCommandReceived("off")
-                self.turnOff()
-        elif topic == "{}/input/{}".format(self.getAddress(), self.getChannel()):
-            self.device.updateStateOnServer(key="sw-input", value=(payload == '1'))
-        elif topic == "{}/longpush/{}".format(self.getAddress(), self.getChannel()):
-            self.device.updateStateOnServer(key="longpush", value=(payload == '1'))
-        else:
-            Shelly.handleMessage(self, topic, payload)
+        if payload == "on":
+            if not self.isOn():
+                self.logCommandReceived("on")
+            self.turnOn()
+        elif payload == "off":
+            if not self.isOff():
+                self.logCommandReceived("off")
+            self.turnOff()
+
+    def handleInput(self, payload):
+        """
+        Handles a message reporting the state of the switch input.
+
+        :param payload: "1" if the input is on.
+        :return: None
+        """
+
+        self.updateStateOnServer(key="sw-input", value=(payload == '1'))
+
+    def handleLongpush(self, payload):
+        """
+        Handles a message reporting whether the switch input is being long pushed.
+
+        :param payload: "1" if the input is being long pushed.
+        :return: None
+        """
+
+        self.updateStateOnServer(key="longpush", value=(payload == '1'))
 
     def handleAction(self, action):
         """
@@ -74,6 +92,7 @@ class Shelly_1(Shelly):
             self.publish("{}/relay/{}/command".format(self.getAddress(), self.getChannel()), "off")
             self.logCommandSent("off")
         elif action.deviceAction == indigo.kDeviceAction.RequestStatus:
+            self.flushSampledStates(force=True)
             self.sendStatusRequestCommand()
         elif action.deviceAction == indigo.kDeviceAction.Toggle:
             if self.isOn():
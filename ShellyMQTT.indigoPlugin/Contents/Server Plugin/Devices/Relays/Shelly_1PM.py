@@ -8,6 +8,16 @@ class Shelly_1PM(Shelly_1):
     The Shelly 1PM is a Shelly 1 with power, energy, and temperature reporting.
     """
 
+    topicHandlers = {
+        "{address}/relay/{channel}/power": "handlePower",
+        "{address}/relay/{channel}/overpower_value": "handleOverpowerValue",
+        "{address}/relay/{channel}/energy": "handleEnergy",
+        "{address}/temperature": "handleInternalTemperature",
+        "{address}/overtemperature": "handleOvertemperature"
+    }
+
+    telemetryTopics = ("{address}/relay/{channel}/power",)
+
     def __init__(self, device):
         Shelly_1.__init__(self, device)
 
@@ -39,50 +49,82 @@ class Shelly_1PM(Shelly_1):
                 "{}/temperature_status".format(address)
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleRelay(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the state of the relay. The 1PM will report overpower as well as on and off.
 
-        :param topic: The topic of the message.
-        :param payload: The payload of the message.
+        :param payload: Either "on", "off", or "overpower".
         :return: None
         """
 
-        if topic == "{}/relay/{}/power".format(self.getAddress(), self.getChannel()):
-            self.device.updateStateOnServer('curEnergyLevel', payload, uiValue='{} W'.format(payload))
-        elif topic == "{}/relay/{}/overpower_value".format(self.getAddress(), self.getChannel()):
-            self.device.updateStateOnServer('overpower-value', payload, uiValue='{} W'.format(payload))
-            # Fire all triggers watching for an overpower event
-            for trigger in indigo.activePlugin.triggers.values():
-                if trigger.pluginTypeId == "overpower-any":
-                    indigo.trigger.execute(trigger)
-                elif trigger.pluginTypeId == "overpower-device" and int(trigger.pluginProps['device-id']) == self.device.id:
-                    indigo.trigger.execute(trigger)
-        elif topic == "{}/relay/{}/energy".format(self.getAddress(), self.getChannel()):
-            try:
-                self.updateEnergy(int(payload))
-            except ValueError:
-                self.logger.error(u"Unable to convert value of \"{}\" into an int!".format(payload))
-        elif topic == "{}/temperature".format(self.getAddress()):
-            try:
-                self.setTemperature(float(payload), state='internal-temperature', unitsProps='int-temp-units')
-            except ValueError:
-                self.logger.error(u"Unable to convert value of \"{}\" into a float!".format(payload))
-        elif topic == "{}/overtemperature".format(self.getAddress()):
-            self.device.updateStateOnServer('overtemperature', (payload == '1'))
-        elif topic == "{}/relay/{}".format(self.getAddress(), self.getChannel()):
-            # The 1PM will report overpower as well as on and off
-            # Pass the on/off messages to the Shelly 1 implementation.
-            overpower = (payload == 'overpower')
-            # Set overpower in any case since on/off should clear the overpower state
-            self.device.updateStateOnServer('overpower', (payload == 'overpower'))
-            if overpower:
-                indigo.device.turnOff(self.device.id)
-                self.logCommandReceived("off (overpower)")
-            else:
-                Shelly_1.handleMessage(self, topic, payload)
+        overpower = (payload == 'overpower')
+        # Set overpower in any case since on/off should clear the overpower state
+        self.updateStateOnServer('overpower', (payload == 'overpower'))
+        if overpower:
+            indigo.device.turnOff(self.device.id)
+            self.logCommandReceived("off (overpower)")
         else:
-            Shelly_1.handleMessage(self, topic, payload)
+            Shelly_1.handleRelay(self, payload)
+
+    def handlePower(self, payload):
+        """
+        Handles a message reporting the current power usage.
+
+        :param payload: The power in watts.
+        :return: None
+        """
+
+        self.updateStateOnServer('curEnergyLevel', payload, uiValue='{} W'.format(payload))
+
+    def handleOverpowerValue(self, payload):
+        """
+        Handles a message reporting the power that caused an overpower event.
+
+        :param payload: The power in watts.
+        :return: None
+        """
+
+        self.updateStateOnServer('overpower-value', payload, uiValue='{} W'.format(payload))
+        # Fire all triggers watching for an overpower event
+        triggers = indigo.activePlugin.triggers
+        for trigger in triggers.get("overpower-any") + triggers.get("overpower-device", self.device.id):
+            indigo.trigger.execute(trigger)
+
+    def handleEnergy(self, payload):
+        """
+        Handles a message reporting the energy counter.
+
+        :param payload: The energy in watt-minutes.
+        :return: None
+        """
+
+        try:
+            self.updateEnergy(int(payload))
+        except ValueError:
+            self.logger.error(u"Unable to convert value of \"{}\" into an int!".format(payload))
+
+    def handleInternalTemperature(self, payload):
+        """
+        Handles a message reporting the internal temperature of the device.
+
+        :param payload: The temperature.
+        :return: None
+        """
+
+        try:
+            self.setTemperature(float(payload), state='internal-temperature', unitsProps='int-temp-units')
+        except ValueError:
+            self.logger.error(u"Unable to convert value of \"{}\" into a float!".format(payload))
+
+    def handleOvertemperature(self, payload):
+        """
+        Handles a message reporting whether the device is overheating.
+
+        :param payload: "1" if the device is overheating.
+        :return: None
+        """
+
+        self.updateStateOnServer('overtemperature', (payload == '1'))
 
     def handleAction(self, action):
         """
@@ -96,6 +138,7 @@ class Shelly_1PM(Shelly_1):
             self.resetEnergy()
         elif action.deviceAction == indigo.kUniversalAction.EnergyUpdate:
             # This will be handled by making a status request
+            self.flushSampledStates(force=True)
             self.sendStatusRequestCommand()
         else:
             Shelly_1.handleAction(self, action)
@@ -27,17 +27,6 @@ class Shelly_2_5_Relay(Shelly_1PM):
             subscriptions.remove("{}/ext_humidities".format(self.getAddress()))
         return subscriptions
 
-    def handleMessage(self, topic, payload):
-        """
-        This method is called when a message comes in and matches one of this devices subscriptions.
-
-        :param topic: The topic of the message.
-        :param payload: The payload of the message.
-        :return: None
-        """
-
-        Shelly_1PM.handleMessage(self, topic, payload)
-
     @staticmethod
     def validateConfigUI(valuesDict, typeId, devId):
         """
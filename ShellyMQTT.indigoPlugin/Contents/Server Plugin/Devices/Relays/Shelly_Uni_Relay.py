@@ -8,6 +8,10 @@ class Shelly_Uni_Relay(Shelly_1):
 
     """
 
+    topicHandlers = {
+        "{address}/info": "handleInfo"
+    }
+
     def __init__(self, device):
         Shelly_1.__init__(self, device)
 
@@ -31,34 +35,36 @@ class Shelly_Uni_Relay(Shelly_1):
                 "{}/ext_humidities".format(address)
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleRelay(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the state of the relay. The relay will report overpower as well as on and off.
 
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        :param payload: Either "on", "off", or "overpower".
         :return: None
         """
 
-        if topic == "{}/relay/{}".format(self.getAddress(), self.getChannel()):
-            # The relay will report overpower as well as on and off
-            # Pass the on/off messages to the Shelly 1 implementation.
-            overpower = (payload == 'overpower')
-            # Set overpower in any case since on/off should clear the overpower state
-            self.device.updateStateOnServer('overpower', (payload == 'overpower'))
-            if not overpower:
-                Shelly_1.handleMessage(self, topic, payload)
-        elif topic == "{}/info".format(self.getAddress()):
-            try:
-                payload = json.loads(payload)
-                adcs = payload.get('adcs', [])
-                if len(adcs) > 0 and type(adcs[0]) is dict:
-                    voltage = adcs[0].get('voltage', None)
-                    self.device.updateStateOnServer(key="voltage", value=voltage)
-            except ValueError:
-                self.logger.error(u"Problem parsing JSON: {}".format(payload))
-        else:
-            Shelly_1.handleMessage(self, topic, payload)
+        overpower = (payload == 'overpower')
+        # Set overpower in any case since on/off should clear the overpower state
+        self.updateStateOnServer('overpower', (payload == 'overpower'))
+        if not overpower:
+            Shelly_1.handleRelay(self, payload)
+
+    def handleInfo(self, payload):
+        """
+        Handles the info message to get the voltage of the ADC.
+
+        :param payload: The json info payload.
+        :return: None
+        """
+
+        try:
+            payload = json.loads(payload)
+            adcs = payload.get('adcs', [])
+            if len(adcs) > 0 and type(adcs[0]) is dict:
+                voltage = adcs[0].get('voltage', None)
+                self.updateStateOnServer(key="voltage", value=voltage)
+        except ValueError:
+            self.logger.error(u"Problem parsing JSON: {}".format(payload))
 
     def handleAction(self, action):
         """
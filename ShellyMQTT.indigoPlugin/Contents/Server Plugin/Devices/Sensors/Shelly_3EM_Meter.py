@@ -10,6 +10,20 @@ class Shelly_3EM_Meter(Shelly_EM_Meter):
     and the online status.
     """
 
+    topicHandlers = {
+        "{address}/emeter/{channel}/current": "handleCurrent",
+        "{address}/emeter/{channel}/pf": "handlePowerFactor"
+    }
+
+    telemetryTopics = (
+        "{address}/emeter/{channel}/current",
+        "{address}/emeter/{channel}/pf"
+    )
+
+    stateDeadbands = dict(Shelly_EM_Meter.stateDeadbands, current="current-deadband")
+
+    stateSampling = dict(Shelly_EM_Meter.stateSampling, current=("current", "{:.1f} A"))
+
     def __init__(self, device):
         Shelly_EM_Meter.__init__(self, device)
 
@@ -38,29 +52,33 @@ class Shelly_3EM_Meter(Shelly_EM_Meter):
                 "{}/emeter/{}/total_returned".format(address, self.getChannel())
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleCurrent(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the current.
 
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        :param payload: The current in amps.
         :return: None
         """
 
-        if topic == "{}/emeter/{}/current".format(self.getAddress(), self.getChannel()):
-            try:
-                current = float(payload)
-                self.device.updateStateOnServer('current', current, uiValue="{:.1f} A".format(current), decimalPlaces=1)
-            except ValueError:
-                self.logger.error(u"Unable to convert current of \"{}\" to a float!".format(payload))
-        if topic == "{}/emeter/{}/pf".format(self.getAddress(), self.getChannel()):
-            try:
-                pf = float(payload)
-                self.device.updateStateOnServer('power-factor', pf, uiValue="{:.1f}".format(pf), decimalPlaces=1)
-            except ValueError:
-                self.logger.error(u"Unable to convert power-factor of \"{}\" to a float!".format(payload))
-        else:
-            Shelly_EM_Meter.handleMessage(self, topic, payload)
+        try:
+            current = float(payload)
+            self.updateStateOnServer('current', current, uiValue="{:.1f} A".format(current), decimalPlaces=1)
+        except ValueError:
+            self.logger.error(u"Unable to convert current of \"{}\" to a float!".format(payload))
+
+    def handlePowerFactor(self, payload):
+        """
+        Handles a message reporting the power factor.
+
+        :param payload: The power factor.
+        :return: None
+        """
+
+        try:
+            pf = float(payload)
+            self.updateStateOnServer('power-factor', pf, uiValue="{:.1f}".format(pf), decimalPlaces=1)
+        except ValueError:
+            self.logger.error(u"Unable to convert power-factor of \"{}\" to a float!".format(payload))
 
     def handleAction(self, action):
         """
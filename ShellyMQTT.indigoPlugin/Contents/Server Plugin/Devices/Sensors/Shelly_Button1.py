@@ -8,6 +8,12 @@ class Shelly_Button1(Shelly):
 
     """
 
+    topicHandlers = {
+        "{address}/sensor/battery": "handleBattery"
+    }
+
+    burstSettleTime = 0.5
+
     def __init__(self, device):
         Shelly.__init__(self, device)
 
@@ -38,14 +44,22 @@ class Shelly_Button1(Shelly):
         :return: None
         """
 
-        if topic == "{}/sensor/battery".format(self.getAddress()):
-            Shelly.updateBatteryLevel(self, payload)
-            self.device.updateStateOnServer(key="sensorValue", value=payload, uiValue='{}%'.format(payload))
-        else:
+        with self.stateTransaction():
             Shelly.handleMessage(self, topic, payload)
 
-        # Update the display state after data changed
-        self.updateStateImage()
+            # Update the display state after data changed
+            self.refreshStateImage()
+
+    def handleBattery(self, payload):
+        """
+        Handles a message reporting the battery level.
+
+        :param payload: The battery level.
+        :return: None
+        """
+
+        Shelly.updateBatteryLevel(self, payload)
+        self.updateStateOnServer(key="sensorValue", value=payload, uiValue='{}%'.format(payload))
 
     def handleAction(self, action):
         """
@@ -66,7 +80,7 @@ class Shelly_Button1(Shelly):
         """
 
         """
-        if self.device.states.get('onOffState', True):
+        if self.getState('onOffState', True):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
@@ -8,6 +8,20 @@ class Shelly_Door_Window(Shelly):
     The Shelly Door/Window is small battery-operated contact sensor that reports lux values.
     """
 
+    topicHandlers = {
+        "{address}/sensor/state": "handleState",
+        "{address}/sensor/lux": "handleLux",
+        "{address}/sensor/tilt": "handleTilt",
+        "{address}/sensor/vibration": "handleVibration",
+        "{address}/sensor/battery": "updateBatteryLevel",
+        "{address}/sensor/temperature": "handleTemperature"
+    }
+
+    burstSettleTime = 0.5
+    burstBypassTopics = (
+        "{address}/sensor/state",
+    )
+
     def __init__(self, device):
         Shelly.__init__(self, device)
 
@@ -33,38 +47,64 @@ class Shelly_Door_Window(Shelly):
                 "{}/sensor/battery".format(address)
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleState(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting whether the door or window is open.
 
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        :param payload: Either "open" or "close".
         :return: None
         """
 
-        if topic == "{}/sensor/state".format(self.getAddress()):
-            newState = (payload == "close")
-            if self.device.states.get('onOffState', False) != newState:
-                # self.logger.info("\"{}\" {}".format(self.device.name, payload))
-                self.logCommandReceived(payload)
-            self.device.updateStateOnServer(key='onOffState', value=newState, uiValue=payload)
-            self.updateStateImage()
-        elif topic == "{}/sensor/lux".format(self.getAddress()):
-            self.device.updateStateOnServer(key="lux", value=payload)
-        elif topic == "{}/sensor/tilt".format(self.getAddress()):
-            self.device.updateStateOnServer(key="tilt", value=payload, uiValue="{}°".format(payload))
-        elif topic == "{}/sensor/vibration".format(self.getAddress()):
-            self.device.updateStateOnServer(key="vibration", value=(payload == "1"))
-        elif topic == "{}/sensor/battery".format(self.getAddress()):
-            Shelly.updateBatteryLevel(self, payload)
-        elif topic == "{}/sensor/temperature".format(self.getAddress()):
-            temperature = payload
-            try:
-                self.setTemperature(float(temperature))
-            except ValueError:
-                self.logger.error(u"Unable to convert value of \"{}\" into a float!".format(payload))
-        else:
-            Shelly.handleMessage(self, topic, payload)
+        newState = (payload == "close")
+        if self.getState('onOffState', False) != newState:
+            # self.logger.info("\"{}\" {}".format(self.device.name, payload))
+            self.logCommandReceived(payload)
+        self.updateStateOnServer(key='onOffState', value=newState, uiValue=payload)
+        self.refreshStateImage()
+
+    def handleLux(self, payload):
+        """
+        Handles a message reporting the light level.
+
+        :param payload: The light level in lux.
+        :return: None
+        """
+
+        self.updateStateOnServer(key="lux", value=payload)
+
+    def handleTilt(self, payload):
+        """
+        Handles a message reporting the tilt angle.
+
+        :param payload: The tilt angle in degrees.
+        :return: None
+        """
+
+        self.updateStateOnServer(key="tilt", value=payload, uiValue="{}°".format(payload))
+
+    def handleVibration(self, payload):
+        """
+        Handles a message reporting whether vibration has been detected.
+
+        :param payload: "1" if vibration was detected.
+        :return: None
+        """
+
+        self.updateStateOnServer(key="vibration", value=(payload == "1"))
+
+    def handleTemperature(self, payload):
+        """
+        Handles a message reporting the temperature.
+
+        :param payload: The temperature.
+        :return: None
+        """
+
+        temperature = payload
+        try:
+            self.setTemperature(float(temperature))
+        except ValueError:
+            self.logger.error(u"Unable to convert value of \"{}\" into a float!".format(payload))
 
     def handleAction(self, action):
         """
@@ -83,7 +123,7 @@ class Shelly_Door_Window(Shelly):
         :return: None
         """
 
-        if self.device.states.get('onOffState', False):
+        if self.getState('onOffState', False):
             if self.device.pluginProps['useCase'] == "door":
                 self.device.updateStateImageOnServer(indigo.kStateImageSel.DoorSensorClosed)
             elif self.device.pluginProps['useCase'] == "window":
@@ -10,6 +10,35 @@ class Shelly_EM_Meter(Shelly):
     and the online status.
     """
 
+    topicHandlers = {
+        "{address}/emeter/{channel}/energy": "handleEnergy",
+        "{address}/emeter/{channel}/returned_energy": "handleReturnedEnergy",
+        "{address}/emeter/{channel}/power": "handlePower",
+        "{address}/emeter/{channel}/reactive_power": "handleReactivePower",
+        "{address}/emeter/{channel}/voltage": "handleVoltage",
+        "{address}/emeter/{channel}/total": "handleTotal",
+        "{address}/emeter/{channel}/total_returned": "handleTotalReturned"
+    }
+
+    telemetryTopics = (
+        "{address}/emeter/{channel}/power",
+        "{address}/emeter/{channel}/reactive_power",
+        "{address}/emeter/{channel}/voltage"
+    )
+
+    stateDeadbands = {
+        "power": "power-deadband",
+        "curEnergyLevel": "power-deadband",
+        "voltage": "voltage-deadband"
+    }
+
+    stateSampling = {
+        "power": ("power", "{:.2f} W"),
+        "curEnergyLevel": ("power", "{:.2f} W"),
+        "power-reactive": ("power", "{:.2f} W"),
+        "voltage": ("voltage", "{:.1f} V")
+    }
+
     def __init__(self, device):
         Shelly.__init__(self, device)
 
@@ -36,60 +65,104 @@ class Shelly_EM_Meter(Shelly):
                 "{}/emeter/{}/total_returned".format(address, self.getChannel())
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleEnergy(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the energy consumed.
 
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        :param payload: The energy in watt-minutes.
         :return: None
         """
 
-        if topic == "{}/emeter/{}/energy".format(self.getAddress(), self.getChannel()):
-            try:
-                energy = int(payload)
-                self.updateEnergy(energy, offsetProp='resetEnergyConsumedOffset', energyState='energy-consumed')
-            except ValueError:
-                self.logger.error(u"Unable to convert energy-consumed of \"{}\" to an int!".format(payload))
-        elif topic == "{}/emeter/{}/returned_energy".format(self.getAddress(), self.getChannel()):
-            try:
-                energy = int(payload)
-                self.updateEnergy(energy, offsetProp='resetEnergyReturnedOffset', energyState='energy-returned')
-            except ValueError:
-                self.logger.error(u"Unable to convert energy-returned of \"{}\" to an int!".format(payload))
-        elif topic == "{}/emeter/{}/power".format(self.getAddress(), self.getChannel()):
-            try:
-                power = float(payload)
-                self.device.updateStateOnServer('power', power, uiValue="{:.2f} W".format(power), decimalPlaces=2)
-                self.device.updateStateOnServer('curEnergyLevel', power, uiValue='{:.2f} W'.format(power), decimalPlaces=2)
-            except ValueError:
-                self.logger.error(u"Unable to convert power of \"{}\" to a float!".format(payload))
-        elif topic == "{}/emeter/{}/reactive_power".format(self.getAddress(), self.getChannel()):
-            try:
-                reactivePower = float(payload)
-                self.device.updateStateOnServer('power-reactive', reactivePower, uiValue="{:.2f} W".format(reactivePower), decimalPlaces=2)
-            except ValueError:
-                self.logger.error(u"Unable to convert reactive-power of \"{}\" to a float!".format(payload))
-        elif topic == "{}/emeter/{}/voltage".format(self.getAddress(), self.getChannel()):
-            try:
-                voltage = float(payload)
-                self.device.updateStateOnServer('voltage', voltage, uiValue="{:.1f} V".format(voltage), decimalPlaces=1)
-            except ValueError:
-                self.logger.error(u"Unable to convert voltage of \"{}\" to a float!".format(payload))
-        elif topic == "{}/emeter/{}/total".format(self.getAddress(), self.getChannel()):
-            try:
-                energy = float(payload)
-                self.device.updateStateOnServer('total-energy', energy, uiValue="{:.1f} Wh".format(energy), decimalPlaces=1)
-            except ValueError:
-                self.logger.error(u"Unable to convert energy of \"{}\" to a float!".format(payload))
-        elif topic == "{}/emeter/{}/total_returned".format(self.getAddress(), self.getChannel()):
-            try:
-                returned_energy = float(payload)
-                self.device.updateStateOnServer('total-returned-energy', returned_energy, uiValue="{:.1f} Wh".format(returned_energy), decimalPlaces=1)
-            except ValueError:
-                self.logger.error(u"Unable to convert returned_energy of \"{}\" to a float!".format(payload))
-        else:
-            Shelly.handleMessage(self, topic, payload)
+        try:
+            energy = int(payload)
+            self.updateEnergy(energy, offsetProp='resetEnergyConsumedOffset', energyState='energy-consumed')
+        except ValueError:
+            self.logger.error(u"Unable to convert energy-consumed of \"{}\" to an int!".format(payload))
+
+    def handleReturnedEnergy(self, payload):
+        """
+        Handles a message reporting the energy returned.
+
+        :param payload: The energy in watt-minutes.
+        :return: None
+        """
+
+        try:
+            energy = int(payload)
+            self.updateEnergy(energy, offsetProp='resetEnergyReturnedOffset', energyState='energy-returned')
+        except ValueError:
+            self.logger.error(u"Unable to convert energy-returned of \"{}\" to an int!".format(payload))
+
+    def handlePower(self, payload):
+        """
+        Handles a message reporting the current power.
+
+        :param payload: The power in watts.
+        :return: None
+        """
+
+        try:
+            power = float(payload)
+            self.updateStateOnServer('power', power, uiValue="{:.2f} W".format(power), decimalPlaces=2)
+            self.updateStateOnServer('curEnergyLevel', power, uiValue='{:.2f} W'.format(power), decimalPlaces=2)
+        except ValueError:
+            self.logger.error(u"Unable to convert power of \"{}\" to a float!".format(payload))
+
+    def handleReactivePower(self, payload):
+        """
+        Handles a message reporting the current reactive power.
+
+        :param payload: The reactive power in watts.
+        :return: None
+        """
+
+        try:
+            reactivePower = float(payload)
+            self.updateStateOnServer('power-reactive', reactivePower, uiValue="{:.2f} W".format(reactivePower), decimalPlaces=2)
+        except ValueError:
+            self.logger.error(u"Unable to convert reactive-power of \"{}\" to a float!".format(payload))
+
+    def handleVoltage(self, payload):
+        """
+        Handles a message reporting the voltage.
+
+        :param payload: The voltage in volts.
+        :return: None
+        """
+
+        try:
+            voltage = float(payload)
+            self.updateStateOnServer('voltage', voltage, uiValue="{:.1f} V".format(voltage), decimalPlaces=1)
+        except ValueError:
+            self.logger.error(u"Unable to convert voltage of \"{}\" to a float!".format(payload))
+
+    def handleTotal(self, payload):
+        """
+        Handles a message reporting the total energy consumed.
+
+        :param payload: The energy in watt-hours.
+        :return: None
+        """
+
+        try:
+            energy = float(payload)
+            self.updateStateOnServer('total-energy', energy, uiValue="{:.1f} Wh".format(energy), decimalPlaces=1)
+        except ValueError:
+            self.logger.error(u"Unable to convert energy of \"{}\" to a float!".format(payload))
+
+    def handleTotalReturned(self, payload):
+        """
+        Handles a message reporting the total energy returned.
+
+        :param payload: The energy in watt-hours.
+        :return: None
+        """
+
+        try:
+            returned_energy = float(payload)
+            self.updateStateOnServer('total-returned-energy', returned_energy, uiValue="{:.1f} Wh".format(returned_energy), decimalPlaces=1)
+        except ValueError:
+            self.logger.error(u"Unable to convert returned_energy of \"{}\" to a float!".format(payload))
 
     def handleAction(self, action):
         """
@@ -104,11 +177,13 @@ class Shelly_EM_Meter(Shelly):
             self.resetEnergy()
 
             # "Reset" the ui value
-            self.device.updateStateOnServer('accumEnergyTotal', 0.0)
+            self.updateStateOnServer('accumEnergyTotal', 0.0)
         elif action.deviceAction == indigo.kUniversalAction.EnergyUpdate:
             # This will be handled by making a status request
+            self.flushSampledStates(force=True)
             self.sendStatusRequestCommand()
         elif action.deviceAction == indigo.kDeviceAction.RequestStatus:
+            self.flushSampledStates(force=True)
             self.sendStatusRequestCommand()
         else:
             Shelly.handleAction(self, action)
@@ -129,19 +204,19 @@ class Shelly_EM_Meter(Shelly):
         # Calculate the value to display.
         displayMethod = self.device.pluginProps.get('energy-display', None)
         if displayMethod == "net":
-            consumed = self.device.states.get('energy-consumed', 0)
-            returned = self.device.states.get('energy-returned', 0)
+            consumed = self.getState('energy-consumed', 0)
+            returned = self.getState('energy-returned', 0)
             net = consumed - returned
 
-            self.device.updateStateOnServer('accumEnergyTotal', net, uiValue=self.buildEnergyUIValue(net))
+            self.updateStateOnServer('accumEnergyTotal', net, uiValue=self.buildEnergyUIValue(net))
         elif displayMethod == "consumed":
-            consumed = self.device.states.get('energy-consumed', 0)
+            consumed = self.getState('energy-consumed', 0)
 
-            self.device.updateStateOnServer('accumEnergyTotal', consumed, uiValue=self.buildEnergyUIValue(consumed))
+            self.updateStateOnServer('accumEnergyTotal', consumed, uiValue=self.buildEnergyUIValue(consumed))
         elif displayMethod == "returned":
-            returned = -1 * self.device.states.get('energy-returned', 0)
+            returned = -1 * self.getState('energy-returned', 0)
 
-            self.device.updateStateOnServer('accumEnergyTotal', returned, uiValue=self.buildEnergyUIValue(returned))
+            self.updateStateOnServer('accumEnergyTotal', returned, uiValue=self.buildEnergyUIValue(returned))
 
     def resetEnergy(self):
         """
@@ -153,17 +228,17 @@ class Shelly_EM_Meter(Shelly):
 
         newProps = self.device.pluginProps
 
-        currEnergyWattMins = self.device.states.get('energy-consumed', 0) * 60 * 1000
+        currEnergyWattMins = self.getState('energy-consumed', 0) * 60 * 1000
         previousResetEnergyOffset = int(self.device.pluginProps.get('resetEnergyConsumedOffset', 0))
         offset = currEnergyWattMins + previousResetEnergyOffset
         newProps['resetEnergyConsumedOffset'] = offset
-        self.device.updateStateOnServer('energy-consumed', 0.0)
+        self.updateStateOnServer('energy-consumed', 0.0)
 
-        currEnergyWattMins = self.device.states.get('energy-returned', 0) * 60 * 1000
+        currEnergyWattMins = self.getState('energy-returned', 0) * 60 * 1000
         previousResetEnergyOffset = int(self.device.pluginProps.get('resetEnergyReturnedOffset', 0))
         offset = currEnergyWattMins + previousResetEnergyOffset
         newProps['resetEnergyReturnedOffset'] = offset
-        self.device.updateStateOnServer('energy-returned', 0.0)
+        self.updateStateOnServer('energy-returned', 0.0)
 
         self.device.replacePluginPropsOnServer(newProps)
 
@@ -193,7 +268,7 @@ class Shelly_EM_Meter(Shelly):
         :return: None
         """
 
-        if self.device.states['online']:
+        if self.getState('online'):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.EnergyMeterOn)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.EnergyMeterOff)
@@ -240,4 +315,28 @@ class Shelly_EM_Meter(Shelly):
                 isValid = False
                 errors['announce-message-type'] = u"You must supply the message type that will be associated with the announce messages."
 
+        # Validate the deadbands
+        for propId in ('power-deadband', 'voltage-deadband', 'current-deadband'):
+            deadband = valuesDict.get(propId, None)
+            if not deadband:
+                continue
+            try:
+                if float(deadband) < 0:
+                    raise ValueError()
+            except ValueError:
+                isValid = False
+                errors[propId] = u"You must enter a number of 0 or more."
+
+        # Validate the sampling intervals
+        for propId in ('power-sample-interval', 'voltage-sample-interval', 'current-sample-interval'):
+            interval = valuesDict.get(propId, None)
+            if not interval:
+                continue
+            try:
+                if float(interval) < 0:
+                    raise ValueError()
+            except ValueError:
+                isValid = False
+                errors[propId] = u"You must enter a number of seconds of 0 or more."
+
         return isValid, valuesDict, errors
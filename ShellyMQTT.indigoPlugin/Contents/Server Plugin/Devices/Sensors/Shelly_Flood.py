@@ -8,6 +8,17 @@ class Shelly_Flood(Shelly):
     The Shelly Flood is a small flood detector that also reports temperature.
     """
 
+    topicHandlers = {
+        "{address}/sensor/temperature": "handleTemperature",
+        "{address}/sensor/flood": "handleFlood",
+        "{address}/sensor/battery": "updateBatteryLevel"
+    }
+
+    burstSettleTime = 0.5
+    burstBypassTopics = (
+        "{address}/sensor/flood",
+    )
+
     def __init__(self, device):
         Shelly.__init__(self, device)
 
@@ -30,30 +41,32 @@ class Shelly_Flood(Shelly):
                 "{}/sensor/battery".format(address)
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleTemperature(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the temperature.
 
-        :param topic: The topic of the message.
-        :param payload: The payload of the message.
+        :param payload: The temperature.
         :return: None
         """
 
-        if topic == "{}/sensor/temperature".format(self.getAddress()):
-            self.setTemperature(float(payload))
-        elif topic == "{}/sensor/flood".format(self.getAddress()):
-            if self.device.states['onOffState'] != (payload == 'true'):
-                self.logCommandReceived("{}".format("wet" if (payload == 'true') else "dry"))
-            if payload == 'true':
-                self.device.updateStateOnServer(key='onOffState', value=True, uiValue='wet')
-            elif payload == 'false':
-                self.device.updateStateOnServer(key='onOffState', value=False, uiValue='dry')
-
-            self.updateStateImage()
-        elif topic == "{}/sensor/battery".format(self.getAddress()):
-            Shelly.updateBatteryLevel(self, payload)
-        else:
-            Shelly.handleMessage(self, topic, payload)
+        self.setTemperature(float(payload))
+
+    def handleFlood(self, payload):
+        """
+        Handles a message reporting whether a flood has been detected.
+
+        :param payload: "true" if the sensor is wet.
+        :return: None
+        """
+
+        if self.getState('onOffState') != (payload == 'true'):
+            self.logCommandReceived("{}".format("wet" if (payload == 'true') else "dry"))
+        if payload == 'true':
+            self.updateStateOnServer(key='onOffState', value=True, uiValue='wet')
+        elif payload == 'false':
+            self.updateStateOnServer(key='onOffState', value=False, uiValue='dry')
+
+        self.refreshStateImage()
 
     def handleAction(self, action):
         """
@@ -72,7 +85,7 @@ class Shelly_Flood(Shelly):
         :return: None
         """
 
-        if self.device.states['onOffState']:
+        if self.getState('onOffState'):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorTripped)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
@@ -8,6 +8,13 @@ class Shelly_Gas(Shelly):
 
     """
 
+    topicHandlers = {
+        "{address}/sensor/operation": "handleOperation",
+        "{address}/sensor/gas": "handleGas",
+        "{address}/sensor/self_test": "handleSelfTest",
+        "{address}/sensor/concentration": "handleConcentration"
+    }
+
     def __init__(self, device):
         Shelly.__init__(self, device)
 
@@ -40,24 +47,56 @@ class Shelly_Gas(Shelly):
         :return: None
         """
 
-        if topic == "{}/sensor/operation".format(self.getAddress()):
-            self.device.updateStateOnServer(key="sensor-status", value=payload)
-        elif topic == "{}/sensor/gas".format(self.getAddress()):
-            self.device.updateStateOnServer(key="gas-detected", value=payload)
-            self.updateStateImage()
-        elif topic == "{}/sensor/self_test".format(self.getAddress()):
-            self.device.updateStateOnServer(key="self-test", value=payload)
-        elif topic == "{}/sensor/concentration".format(self.getAddress()):
-            try:
-                concentration = int(payload)
-                self.device.updateStateOnServer(key="sensorValue", value=concentration, uiValue='{} ppm'.format(concentration))
-            except ValueError:
-                self.logger.error(u"Unable to convert concentration of \"{}\" to an int!".format(payload))
-        else:
+        with self.stateTransaction():
             Shelly.handleMessage(self, topic, payload)
 
-        # Update the display state after data changed
-        self.updateStateImage()
+            # Update the display state after data changed
+            self.refreshStateImage()
+
+    def handleOperation(self, payload):
+        """
+        Handles a message reporting the operation status of the sensor.
+
+        :param payload: The sensor status.
+        :return: None
+        """
+
+        self.updateStateOnServer(key="sensor-status", value=payload)
+
+    def handleGas(self, payload):
+        """
+        Handles a message reporting the gas alarm state.
+
+        :param payload: The alarm state.
+        :return: None
+        """
+
+        self.updateStateOnServer(key="gas-detected", value=payload)
+        self.refreshStateImage()
+
+    def handleSelfTest(self, payload):
+        """
+        Handles a message reporting the self test status.
+
+        :param payload: The self test status.
+        :return: None
+        """
+
+        self.updateStateOnServer(key="self-test", value=payload)
+
+    def handleConcentration(self, payload):
+        """
+        Handles a message reporting the gas concentration.
+
+        :param payload: The concentration in ppm.
+        :return: None
+        """
+
+        try:
+            concentration = int(payload)
+            self.updateStateOnServer(key="sensorValue", value=concentration, uiValue='{} ppm'.format(concentration))
+        except ValueError:
+            self.logger.error(u"Unable to convert concentration of \"{}\" to an int!".format(payload))
 
     def handleAction(self, action):
         """
@@ -88,7 +127,7 @@ class Shelly_Gas(Shelly):
         :return: None
         """
 
-        if self.device.states.get('gas-detected', '') in ['mild', 'heavy']:
+        if self.getState('gas-detected', '') in ['mild', 'heavy']:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorTripped)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
@@ -8,6 +8,14 @@ class Shelly_HT(Shelly):
     The Shelly H&T is a small temperature and humidity sensor.
     """
 
+    topicHandlers = {
+        "{address}/sensor/temperature": "handleTemperature",
+        "{address}/sensor/humidity": "handleHumidity",
+        "{address}/sensor/battery": "updateBatteryLevel"
+    }
+
+    burstSettleTime = 0.5
+
     def __init__(self, device):
         Shelly.__init__(self, device)
 
@@ -39,30 +47,44 @@ class Shelly_HT(Shelly):
         :return: None
         """
 
-        if topic == "{}/sensor/temperature".format(self.getAddress()):
-            self.setTemperature(float(payload))
-        elif topic == "{}/sensor/humidity".format(self.getAddress()):
-            decimals = int(self.device.pluginProps.get('humidity-decimals', 1))
-            offset = 0
-            try:
-                offset = float(self.device.pluginProps.get('humidity-offset', 0))
-            except ValueError:
-                self.logger.error(u"Unable to convert offset of \"{}\" into a float!".format(self.device.pluginProps.get('humidity-offset', 0)))
-
-            humidity = float(payload) + offset
-            self.device.updateStateOnServer(key="humidity", value=humidity, uiValue='{:.{}f}%'.format(humidity, decimals), decimalPlaces=decimals)
-        elif topic == "{}/sensor/battery".format(self.getAddress()):
-            Shelly.updateBatteryLevel(self, payload)
-        else:
+        with self.stateTransaction():
             Shelly.handleMessage(self, topic, payload)
 
-        temp = self.device.states['temperature']
-        temp_decimals = int(self.device.pluginProps.get('temp-decimals', 1))
-        temp_units = self.device.pluginProps.get('temp-units', 'F')[-1]
-        humidity = self.device.states['humidity']
-        humidity_decimals = int(self.device.pluginProps.get('humidity-decimals', 1))
-        self.device.updateStateOnServer(key="status", value='{:.{}f}°{} / {:.{}f}%'.format(temp, temp_decimals, temp_units, humidity, humidity_decimals))
-        self.updateStateImage()
+            temp = self.getState('temperature')
+            temp_decimals = int(self.device.pluginProps.get('temp-decimals', 1))
+            temp_units = self.device.pluginProps.get('temp-units', 'F')[-1]
+            humidity = self.getState('humidity')
+            humidity_decimals = int(self.device.pluginProps.get('humidity-decimals', 1))
+            self.updateStateOnServer(key="status", value='{:.{}f}°{} / {:.{}f}%'.format(temp, temp_decimals, temp_units, humidity, humidity_decimals))
+            self.refreshStateImage()
+
+    def handleTemperature(self, payload):
+        """
+        Handles a message reporting the temperature.
+
+        :param payload: The temperature.
+        :return: None
+        """
+
+        self.setTemperature(float(payload))
+
+    def handleHumidity(self, payload):
+        """
+        Handles a message reporting the humidity.
+
+        :param payload: The relative humidity.
+        :return: None
+        """
+
+        decimals = int(self.device.pluginProps.get('humidity-decimals', 1))
+        offset = 0
+        try:
+            offset = float(self.device.pluginProps.get('humidity-offset', 0))
+        except ValueError:
+            self.logger.error(u"Unable to convert offset of \"{}\" into a float!".format(self.device.pluginProps.get('humidity-offset', 0)))
+
+        humidity = float(payload) + offset
+        self.updateStateOnServer(key="humidity", value=humidity, uiValue='{:.{}f}%'.format(humidity, decimals), decimalPlaces=decimals)
 
     def handleAction(self, action):
         """
@@ -81,7 +103,7 @@ class Shelly_HT(Shelly):
         :return:
         """
 
-        if self.device.states.get('online', True):
+        if self.getState('online', True):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensorOn)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensor)
@@ -9,6 +9,10 @@ class Shelly_Motion(Shelly):
     The Shelly Motion is battery-operated motion sensor.
     """
 
+    topicHandlers = {
+        "{address}/status": "handleStatus"
+    }
+
     def __init__(self, device):
         Shelly.__init__(self, device)
 
@@ -29,52 +33,45 @@ class Shelly_Motion(Shelly):
                 "{}/status".format(address)
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleStatus(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
-
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        Handles a message reporting the status of the sensor. The payload will be json in the form:
+
+        {
+            "motion": true,
+            "timestamp": 1614208769,
+            "active": false,
+            "vibration": false,
+            "lux": 416,
+            "bat": 94
+        }
+
+        :param payload: The json status of the sensor.
         :return: None
         """
 
-        if topic == "{}/status".format(self.getAddress()):
-            """
-            The payload will json in the form:
-            
-            {
-                "motion": true,
-                "timestamp": 1614208769,
-                "active": false,
-                "vibration": false,
-                "lux": 416,
-                "bat": 94
-            }
-            """
-            try:
-                payload = json.loads(payload)
-                if "motion" in payload:
-                    motion = payload['motion'] is True
-                    if self.device.states.get('onOffState', False) != motion and motion:
-                        self.logCommandReceived("motion detected")
-                    self.device.updateStateOnServer(key='onOffState', value=motion)
-                    self.updateStateImage()
-                if "active" in payload:
-                    active = payload['active'] is True
-                    self.device.updateStateOnServer(key="active", value=active)
-                if "vibration" in payload:
-                    vibration = payload['vibration'] is True
-                    if self.device.states.get('vibration', False) != vibration and vibration:
-                        self.logCommandReceived("tampering detected!")
-                    self.device.updateStateOnServer(key="vibration", value=vibration)
-                if "lux" in payload:
-                    self.device.updateStateOnServer(key="lux", value=payload['lux'])
-                if "bat" in payload:
-                    Shelly.updateBatteryLevel(self, payload['bat'])
-            except ValueError:
-                self.logger.error(u"Problem parsing JSON: {}".format(payload))
-        else:
-            Shelly.handleMessage(self, topic, payload)
+        try:
+            payload = json.loads(payload)
+            if "motion" in payload:
+                motion = payload['motion'] is True
+                if self.getState('onOffState', False) != motion and motion:
+                    self.logCommandReceived("motion detected")
+                self.updateStateOnServer(key='onOffState', value=motion)
+                self.refreshStateImage()
+            if "active" in payload:
+                active = payload['active'] is True
+                self.updateStateOnServer(key="active", value=active)
+            if "vibration" in payload:
+                vibration = payload['vibration'] is True
+                if self.getState('vibration', False) != vibration and vibration:
+                    self.logCommandReceived("tampering detected!")
+                self.updateStateOnServer(key="vibration", value=vibration)
+            if "lux" in payload:
+                self.updateStateOnServer(key="lux", value=payload['lux'])
+            if "bat" in payload:
+                Shelly.updateBatteryLevel(self, payload['bat'])
+        except ValueError:
+            self.logger.error(u"Problem parsing JSON: {}".format(payload))
 
     def handleAction(self, action):
         """
@@ -93,7 +90,7 @@ class Shelly_Motion(Shelly):
         :return: None
         """
 
-        if self.device.states.get('onOffState', False):
+        if self.getState('onOffState', False):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.MotionSensorTripped)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.MotionSensor)
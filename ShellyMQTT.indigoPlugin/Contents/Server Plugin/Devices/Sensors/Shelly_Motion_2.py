@@ -9,6 +9,10 @@ class Shelly_Motion_2(Shelly):
     The Shelly Motion is battery-operated motion sensor.
     """
 
+    topicHandlers = {
+        "{address}/info": "handleInfo"
+    }
+
     def __init__(self, device):
         Shelly.__init__(self, device)
 
@@ -29,118 +33,111 @@ class Shelly_Motion_2(Shelly):
                 "{}/info".format(address)
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleInfo(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
-
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        Handles a message reporting the info of the sensor. The payload will be json in the form:
+
+        {
+            "wifi_sta":{
+                "connected":true,
+                "ssid":"Lionsheep",
+                "ip":"192.168.100.76",
+                "rssi":-57
+            },
+            "cloud":{
+                "enabled":false,
+                "connected":false
+            },
+            "mqtt":{
+                "connected":true
+            },
+            "time":"14:09",
+            "unixtime":1661018974,
+            "serial":0,
+            "has_update":false,
+            "mac":"84FD2772A492",
+            "cfg_changed_cnt":0,
+            "actions_stats":{
+                "skipped":0
+            },
+            "sleep_time":0,
+            "lux":{
+                "value":128,
+                "illumination":"twilight",
+                "is_valid":true
+            },
+            "tmp":{
+                "value":79.0,
+                "units":"F",
+                "is_valid":true
+            },
+            "sensor":{
+                "vibration":false,
+                "motion":false,
+                "timestamp":1661018914,
+                "active":true,
+                "is_valid":true
+            },
+            "bat":{
+                "value":91,
+                "voltage":3.792
+            },
+            "charger":false,
+            "update":{
+                "status":"unknown",
+                "has_update":false,
+                "new_version":"20220811-152232/v2.1.8@5afc928c",
+                "old_version":"20220811-152232/v2.1.8@5afc928c",
+                "beta_version":null
+            },
+            "ram_total":97280,
+            "ram_free":22408,
+            "fs_size":65536,
+            "fs_free":59504,
+            "uptime":211075,
+            "fw_info":{
+                "device":"shellymotion2-84FD2772A492",
+                "fw":"20220811-152232/v2.1.8@5afc928c"
+            },
+            "ps_mode":0,
+            "dbg_flags":0
+        }
+
+        :param payload: The json info of the sensor.
         :return: None
         """
 
-        if topic == "{}/info".format(self.getAddress()):
-            """
-            The payload will json in the form:
-            
-            {
-                "wifi_sta":{
-                    "connected":true,
-                    "ssid":"Lionsheep",
-                    "ip":"192.168.100.76",
-                    "rssi":-57
-                },
-                "cloud":{
-                    "enabled":false,
-                    "connected":false
-                },
-                "mqtt":{
-                    "connected":true
-                },
-                "time":"14:09",
-                "unixtime":1661018974,
-                "serial":0,
-                "has_update":false,
-                "mac":"84FD2772A492",
-                "cfg_changed_cnt":0,
-                "actions_stats":{
-                    "skipped":0
-                },
-                "sleep_time":0,
-                "lux":{
-                    "value":128,
-                    "illumination":"twilight",
-                    "is_valid":true
-                },
-                "tmp":{
-                    "value":79.0,
-                    "units":"F",
-                    "is_valid":true
-                },
-                "sensor":{
-                    "vibration":false,
-                    "motion":false,
-                    "timestamp":1661018914,
-                    "active":true,
-                    "is_valid":true
-                },
-                "bat":{
-                    "value":91,
-                    "voltage":3.792
-                },
-                "charger":false,
-                "update":{
-                    "status":"unknown",
-                    "has_update":false,
-                    "new_version":"20220811-152232/v2.1.8@5afc928c",
-                    "old_version":"20220811-152232/v2.1.8@5afc928c",
-                    "beta_version":null
-                },
-                "ram_total":97280,
-                "ram_free":22408,
-                "fs_size":65536,
-                "fs_free":59504,
-                "uptime":211075,
-                "fw_info":{
-                    "device":"shellymotion2-84FD2772A492",
-                    "fw":"20220811-152232/v2.1.8@5afc928c"
-                },
-                "ps_mode":0,
-                "dbg_flags":0
-            }
-            """
-            try:
-                payload = json.loads(payload)
-
-                if payload.get("lux", {}).get("is_valid", False):
-                    lux = payload.get("lux", {}).get("value", None)
-                    illumination = payload.get("lux", {}).get("illumination", None)
-                    self.device.updateStateOnServer(key='lux', value=lux)
-                    self.device.updateStateOnServer(key='illumination', value=illumination)
-
-                if payload.get("tmp", {}).get("is_valid", False):
-                    temperature = payload.get("tmp", {}).get("value", None)
-                    units = payload.get("tmp", {}).get("units", None)
-                    self.device.updateStateOnServer(key='temperature', value=temperature,
-                                                    uiValue="{} °{}".format(temperature, units))
-
-                if payload.get("sensor", {}).get("is_valid", False):
-                    vibration = payload.get("sensor", {}).get("vibration", False)
-                    motion = payload.get("sensor", {}).get("motion", False)
-                    self.device.updateStateOnServer(key='vibration', value=vibration)
-                    self.device.updateStateOnServer(key='onOffState', value=motion)
-                    self.updateStateImage()
-
-                if payload.get("bat", None):
-                    level = payload.get("bat", {}).get("value", None)
-                    voltage = payload.get("bat", {}).get("voltage", None)
-                    self.updateBatteryLevel(level)
-                    self.device.updateStateOnServer(key='voltage', value=voltage,
-                                                    uiValue="{}V".format(voltage))
-
-            except ValueError:
-                self.logger.error(u"Problem parsing JSON: {}".format(payload))
-        else:
-            Shelly.handleMessage(self, topic, payload)
+        try:
+            payload = json.loads(payload)
+
+            if payload.get("lux", {}).get("is_valid", False):
+                lux = payload.get("lux", {}).get("value", None)
+                illumination = payload.get("lux", {}).get("illumination", None)
+                self.updateStateOnServer(key='lux', value=lux)
+                self.updateStateOnServer(key='illumination', value=illumination)
+
+            if payload.get("tmp", {}).get("is_valid", False):
+                temperature = payload.get("tmp", {}).get("value", None)
+                units = payload.get("tmp", {}).get("units", None)
+                self.updateStateOnServer(key='temperature', value=temperature,
+                                                uiValue="{} °{}".format(temperature, units))
+
+            if payload.get("sensor", {}).get("is_valid", False):
+                vibration = payload.get("sensor", {}).get("vibration", False)
+                motion = payload.get("sensor", {}).get("motion", False)
+                self.updateStateOnServer(key='vibration', value=vibration)
+                self.updateStateOnServer(key='onOffState', value=motion)
+                self.refreshStateImage()
+
+            if payload.get("bat", None):
+                level = payload.get("bat", {}).get("value", None)
+                voltage = payload.get("bat", {}).get("voltage", None)
+                self.updateBatteryLevel(level)
+                self.updateStateOnServer(key='voltage', value=voltage,
+                                                uiValue="{}V".format(voltage))
+
+        except ValueError:
+            self.logger.error(u"Problem parsing JSON: {}".format(payload))
 
     def handleAction(self, action):
         """
@@ -159,7 +156,7 @@ class Shelly_Motion_2(Shelly):
         :return: None
         """
 
-        if self.device.states.get('onOffState', False):
+        if self.getState('onOffState', False):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.MotionSensorTripped)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.MotionSensor)
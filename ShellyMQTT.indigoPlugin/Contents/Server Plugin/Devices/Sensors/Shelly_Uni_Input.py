@@ -9,6 +9,10 @@ class Shelly_Uni_Input(Shelly_i3):
 
     """
 
+    topicHandlers = {
+        "{address}/info": "handleInfo"
+    }
+
     def __init__(self, device):
         Shelly_i3.__init__(self, device)
 
@@ -33,29 +37,22 @@ class Shelly_Uni_Input(Shelly_i3):
                 "{}/ext_humidities".format(address)
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleInfo(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles the info message to get the voltage of the ADC.
 
-        :param topic: The topic of the message.
-        :param payload: The payload of the message.
+        :param payload: The json info payload.
         :return: None
         """
 
-        if topic == "{}/info".format(self.getAddress()):
-            try:
-                payload = json.loads(payload)
-                adcs = payload.get('adcs', [])
-                if len(adcs) > 0 and type(adcs[0]) is dict:
-                    voltage = adcs[0].get('voltage', None)
-                    self.device.updateStateOnServer(key="voltage", value=voltage)
-            except ValueError:
-                self.logger.error(u"Problem parsing JSON: {}".format(payload))
-        else:
-            Shelly_i3.handleMessage(self, topic, payload)
-
-        # Update the display state after data changed
-        self.updateStateImage()
+        try:
+            payload = json.loads(payload)
+            adcs = payload.get('adcs', [])
+            if len(adcs) > 0 and type(adcs[0]) is dict:
+                voltage = adcs[0].get('voltage', None)
+                self.updateStateOnServer(key="voltage", value=voltage)
+        except ValueError:
+            self.logger.error(u"Problem parsing JSON: {}".format(payload))
 
     def handleAction(self, action):
         """
@@ -75,7 +72,7 @@ class Shelly_Uni_Input(Shelly_i3):
         :return: None
         """
 
-        if self.device.states.get('onOffState', True):
+        if self.getState('onOffState', True):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
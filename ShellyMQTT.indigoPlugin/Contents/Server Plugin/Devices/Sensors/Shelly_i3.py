@@ -8,6 +8,10 @@ class Shelly_i3(Shelly):
 
     """
 
+    topicHandlers = {
+        "{address}/input/{channel}": "handleInput"
+    }
+
     def __init__(self, device):
         Shelly.__init__(self, device)
 
@@ -39,17 +43,25 @@ class Shelly_i3(Shelly):
         :return: None
         """
 
-        if topic == "{}/input/{}".format(self.getAddress(), self.getChannel()):
-            invert = self.device.pluginProps.get("invert", False)
-            state = (payload == '0') if invert else (payload == '1')
-            if self.device.states['onOffState'] != state:
-                self.logCommandReceived("on" if state else "off")
-            self.device.updateStateOnServer(key="onOffState", value=state)
-        else:
+        with self.stateTransaction():
             Shelly.handleMessage(self, topic, payload)
 
-        # Update the display state after data changed
-        self.updateStateImage()
+            # Update the display state after data changed
+            self.refreshStateImage()
+
+    def handleInput(self, payload):
+        """
+        Handles a message reporting the state of the input.
+
+        :param payload: "1" if the input is on.
+        :return: None
+        """
+
+        invert = self.device.pluginProps.get("invert", False)
+        state = (payload == '0') if invert else (payload == '1')
+        if self.getState('onOffState') != state:
+            self.logCommandReceived("on" if state else "off")
+        self.updateStateOnServer(key="onOffState", value=state)
 
     def handleAction(self, action):
         """
@@ -69,7 +81,7 @@ class Shelly_i3(Shelly):
         :return: None
         """
 
-        if self.device.states.get('onOffState', True):
+        if self.getState('onOffState', True):
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
         else:
             self.device.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
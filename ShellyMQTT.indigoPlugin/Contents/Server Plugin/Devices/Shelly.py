@@ -1,7 +1,13 @@
 # coding=utf-8
 import indigo
-import json
+import threading
+import time
+from contextlib import contextmanager
 from Devices.ShellyLogger import ShellyLogger
+from Devices.ShellyPayload import decodePayload
+from Devices.ShellyProps import ShellyProps
+from Devices.ShellySampling import ShellySampling
+from Devices.ShellySubscriptions import ShellySubscriptions
 
 
 class Shelly:
@@ -9,24 +15,83 @@ class Shelly:
     The base class for all Shelly devices.
     """
 
+    # Maps the topics that a device handles to the name of the method that processes the payload.
+    # Topics are formatted with the values from getTopicFields when the device compiles its handlers.
+    topicHandlers = {
+        "shellies/announce": "parseAnnouncement",
+        "{address}/online": "handleOnline",
+        "{address}/input_event/{channel}": "processInputEvent",
+        "{address}/ext_temperatures": "processTemperatureSensors",
+        "{address}/ext_humidities": "processHumiditySensors",
+        "{address}/temperature_status": "processTemperatureStatus"
+    }
+
+    # Topics that report continuous readings. When messages back up, only the newest message on
+    # each of these topics is handled. The topics are merged from the base class down.
+    telemetryTopics = ()
+
+    # Battery devices publish a burst of topics each time they wake up. While a device has a settle
+    # time, the messages of a burst are collected for that many seconds and handled in a single
+    # pass, except for the bypass topics which are handled at once. The topics are merged from the
+    # base class down.
+    burstSettleTime = 0
+    burstBypassTopics = (
+        "{address}/input_event/{channel}",
+    )
+
+    # Maps float states to the pluginProps field holding the deadband for that state. A new value
+    # that is within the deadband of the last written value is not sent to the server.
+    stateDeadbands = {}
+
+    # Maps float states to the prefix of the pluginProps fields holding the sampling policy for that
+    # state, and the format of the value to display for a mean. While a state has a sampling interval,
+    # its readings are collected and one aggregated value is written once the interval has passed.
+    stateSampling = {}
+
     def __init__(self, device):
         self.device = device
         self.logger = ShellyLogger(self)
         self.triggers = []
         self.temperature_sensors = []
         self.humidity_sensors = []
+        self.compiledTopicHandlers = None
+        self.burstTopics = frozenset()
+        self.props = None
+        # Guards the state transaction, since the states can be updated by a message worker and by
+        # an Indigo action thread at the same time
+        self.stateLock = threading.RLock()
+        self.stateTransactionDepth = 0
+        self.stateImagePending = False
+        self.pendingStates = {}
+        self.lastStates = {}
+        self.sampledStates = {}
+        self.writtenStateCount = 0
+        self.suppressedStateCount = 0
+        self.lastInputEventId = None
+        self.lastInputEventIdChanged = False
 
     def refresh_device(self):
         """
-        Gets an indigo device from the device identifier.
+        Gets an indigo device from the device identifier. The cached props are rebuilt from the
+        refreshed device the next time they are needed.
 
         :return: The indigo device object.
         """
 
         if self.device:
+            sampling = self.props.sampling if self.props is not None else None
             indigo.devices[self.device.id].refreshFromServer()
             self.device = indigo.devices[self.device.id]
-            self.logger.debug(u"Refreshed device info for \"{}\"".format(self.device.name))
+            self.props = None
+            # Muting is resolved again from the rebuilt props
+            self.logger.refresh()
+            if not self.lastInputEventIdChanged:
+                self.lastInputEventId = None
+            if self.sampledStates and self.getProps().sampling != sampling:
+                # The open windows were sampled with the old policies, so they are written now
+                self.flushSampledStates(force=True)
+                self.sampledStates = {}
+            self.logger.debug(u"Refreshed device info for \"%s\"", self.device.name)
 
     def getSubscriptions(self):
         """
@@ -46,45 +111,261 @@ class Shelly:
 
         mqtt = self.getMQTT()
         if mqtt is not None:
-            for subscription in self.getSubscriptions():
-                # Band-aid for bug in MQTT-Connector (Issue #10 on MQTT-Connector GitHub)
-                if indigo.activePlugin.pluginPrefs.get('connector-fix', False):
-                    subscription = "0:%s" % subscription
+            # Band-aid for bug in MQTT-Connector (Issue #10 on MQTT-Connector GitHub)
+            connectorFix = indigo.activePlugin.pluginPrefs.get('connector-fix', False)
+            ShellySubscriptions.executeSubscriptionAction(mqtt, "add_subscription", self.getBrokerId(), self.getSubscriptions(), connectorFix)
+
+    def getTopicFields(self):
+        """
+        Getter for the values that are substituted into the topics of the topic handlers.
+
+        :return: A dictionary of field names and values.
+        """
+
+        return {
+            'address': self.getAddress(),
+            'channel': self.getChannel()
+        }
+
+    def compileTopicHandlers(self):
+        """
+        Builds the dispatch table for this device. The topic handlers declared by each class are
+        merged from the base class down, so a subclass can replace (or remove with None) the handler
+        for a topic, and the topics are then formatted with the values from getTopicFields.
+
+        :return: A dictionary of full topics and the bound method that handles each of them.
+        """
+
+        handlers = {}
+        for cls in reversed(type(self).__mro__):
+            handlers.update(vars(cls).get('topicHandlers', {}))
+
+        fields = self.getTopicFields()
+        self.compiledTopicHandlers = {topic.format(**fields): getattr(self, name) for topic, name in handlers.items() if name}
+
+        if self.burstSettleTime > 0:
+            bypass = set()
+            for cls in type(self).__mro__:
+                bypass.update(topic.format(**fields) for topic in vars(cls).get('burstBypassTopics', ()))
+            self.burstTopics = frozenset(topic for topic in self.compiledTopicHandlers if topic not in bypass)
+        return self.compiledTopicHandlers
 
-                props = {
-                    'topic': subscription,
-                    'qos': 0
-                }
-                mqtt.executeAction("add_subscription", deviceId=self.getBrokerId(), props=props)
+    def getTelemetryTopics(self):
+        """
+        Getter for the telemetry topics of this device, formatted with the values from getTopicFields.
+
+        :return: A list of topics.
+        """
+
+        topics = set()
+        for cls in type(self).__mro__:
+            topics.update(vars(cls).get('telemetryTopics', ()))
+
+        fields = self.getTopicFields()
+        return sorted(topic.format(**fields) for topic in topics)
 
     def handleMessage(self, topic, payload):
         """
-        The default handler for incoming messages.
-        These are messages that are handled by ANY Shelly device.
+        The default handler for incoming messages. The message is passed to the method that is
+        registered for the topic in the compiled topic handlers.
 
         :param topic: The topic of the incoming message.
         :param payload: The content of the massage.
         :return:  None
         """
 
-        if topic == "shellies/announce":
-            self.parseAnnouncement(payload)
-        elif topic == "{}/online".format(self.getAddress()):
-            wasOnline = self.device.states.get('online', False)
-            self.device.updateStateOnServer(key='online', value=(payload == "true"))
-            self.updateStateImage()
-            if not wasOnline:
-                self.setLastInputEventId(0)
-        elif topic == "{}/input_event/{}".format(self.getAddress(), self.getChannel()):
-            self.processInputEvent(payload)
-        elif topic == "{}/ext_temperatures".format(self.getAddress()):
-            self.processTemperatureSensors(payload)
-        elif topic == "{}/ext_humidities".format(self.getAddress()):
-            self.processHumiditySensors(payload)
-        elif topic == "{}/temperature_status".format(self.getAddress()):
-            self.processTemperatureStatus(payload)
+        handlers = self.compiledTopicHandlers
+        if handlers is None:
+            handlers = self.compileTopicHandlers()
+
+        handler = handlers.get(topic, None)
+        if handler is not None:
+            with self.stateTransaction():
+                handler(payload)
         return None
 
+    def handleMessages(self, messages):
+        """
+        Handles a burst of messages in a single state transaction, so the states of the burst are
+        sent to the server together and the state image is only updated once.
+
+        :param messages: A list of (topic, payload) tuples.
+        :return: None
+        """
+
+        with self.stateTransaction():
+            for topic, payload in messages:
+                self.handleMessage(topic, payload)
+
+    @contextmanager
+    def stateTransaction(self):
+        """
+        Collects the state updates made within the block and sends them to the server in a single
+        updateStatesOnServer call when the outermost transaction ends, followed by the state image
+        if it was refreshed. Transactions can be nested, so a subclass can wrap its own processing
+        around the default handleMessage. Other threads wait for the transaction to end before
+        they can update the states of the device.
+
+        :return: None
+        """
+
+        with self.stateLock:
+            self.stateTransactionDepth += 1
+            try:
+                yield
+            finally:
+                self.stateTransactionDepth -= 1
+                if self.stateTransactionDepth == 0:
+                    self.commitStates()
+                    if self.stateImagePending:
+                        self.stateImagePending = False
+                        self.updateStateImage()
+
+    def commitStates(self):
+        """
+        Sends all pending state updates to the server.
+
+        :return: None
+        """
+
+        if self.pendingStates:
+            states = list(self.pendingStates.values())
+            self.pendingStates = {}
+            self.device.updateStatesOnServer(states)
+
+    def updateStateOnServer(self, key, value, uiValue=None, decimalPlaces=None):
+        """
+        Updates a state of the device. Inside of a state transaction the update is held until the
+        transaction ends, otherwise it is sent to the server immediately. Updates that would not
+        change the state are skipped, and updates to a sampled state are held until its sampling
+        interval has passed.
+
+        :param key: The state key to update.
+        :param value: The new value of the state.
+        :param uiValue: The optional value to display for the state.
+        :param decimalPlaces: The optional number of decimal places to display.
+        :return: None
+        """
+
+        policy = self.getProps().sampling.get(key, None)
+        with self.stateLock:
+            if policy is not None:
+                sampling = self.sampledStates.get(key, None)
+                if sampling is None:
+                    sampling = self.sampledStates[key] = ShellySampling(*policy)
+                if not sampling.add(value, uiValue, decimalPlaces, time.monotonic()):
+                    return
+                value, uiValue, decimalPlaces = sampling.take()
+
+            self.writeState(key, value, uiValue, decimalPlaces)
+
+    def writeState(self, key, value, uiValue=None, decimalPlaces=None):
+        """
+        Writes a state of the device, unless the update would not change the state.
+
+        :param key: The state key to update.
+        :param value: The new value of the state.
+        :param uiValue: The optional value to display for the state.
+        :param decimalPlaces: The optional number of decimal places to display.
+        :return: None
+        """
+
+        with self.stateLock:
+            if self.isUnchangedState(key, value, uiValue):
+                self.suppressedStateCount += 1
+                return
+
+            self.lastStates[key] = (value, uiValue, time.monotonic())
+            self.writtenStateCount += 1
+
+            state = {'key': key, 'value': value}
+            if uiValue is not None:
+                state['uiValue'] = uiValue
+            if decimalPlaces is not None:
+                state['decimalPlaces'] = decimalPlaces
+
+            if self.stateTransactionDepth > 0:
+                self.pendingStates[key] = state
+            else:
+                self.device.updateStatesOnServer([state])
+
+    def flushSampledStates(self, force=False):
+        """
+        Writes the aggregated value of the sampled states whose sampling interval has passed.
+
+        :param force: True to write every sampled state that holds readings.
+        :return: None
+        """
+
+        if not self.sampledStates:
+            return
+
+        now = time.monotonic()
+        with self.stateTransaction():
+            for key, sampling in self.sampledStates.items():
+                if force or sampling.isOver(now):
+                    reading = sampling.take()
+                    if reading is not None:
+                        self.writeState(key, *reading)
+
+    def isUnchangedState(self, key, value, uiValue):
+        """
+        Determines if an update would leave a state as it was last written. Float states with a
+        deadband only need to be within the deadband of the last value. Every state is written again
+        once the plugin's state refresh interval has passed, so that it still acts as a heartbeat.
+
+        :param key: The state key being updated.
+        :param value: The new value of the state.
+        :param uiValue: The new value to display for the state.
+        :return: True if the update can be skipped.
+        """
+
+        last = self.lastStates.get(key, None)
+        if last is None:
+            return False
+
+        lastValue, lastUiValue, writtenAt = last
+        if time.monotonic() - writtenAt >= indigo.activePlugin.stateRefreshInterval:
+            return False
+
+        # The state was changed by something other than this device
+        if self.getState(key) != lastValue:
+            return False
+
+        deadband = self.getProps().deadbands.get(key, None)
+        if deadband is not None and isinstance(value, float) and isinstance(lastValue, (int, float)):
+            return abs(value - lastValue) < deadband
+
+        return value == lastValue and uiValue == lastUiValue and type(value) == type(lastValue)
+
+    def getState(self, key, default=None):
+        """
+        Getter for a state of the device, including any update that has not been sent to the server yet.
+
+        :param key: The state key to get.
+        :param default: The value to return if the state does not exist.
+        :return: The value of the state.
+        """
+
+        state = self.pendingStates.get(key, None)
+        if state is not None:
+            return state['value']
+        return self.device.states.get(key, default)
+
+    def handleOnline(self, payload):
+        """
+        Handles a message reporting whether the device is online.
+
+        :param payload: "true" if the device is online.
+        :return: None
+        """
+
+        wasOnline = self.getState('online', False)
+        self.updateStateOnServer(key='online', value=(payload == "true"))
+        self.refreshStateImage()
+        if not wasOnline:
+            self.setLastInputEventId(0)
+
     def handleAction(self, action):
         """
         The default handler for an action.
@@ -125,6 +406,18 @@ class Shelly:
             mqtt.executeAction("publish", deviceId=self.getBrokerId(), props=props, waitUntilDone=False)
             self.logger.debug(u"\"%s\" published \"%s\" to \"%s\"", self.device.name, payload, topic)
 
+    def getProps(self):
+        """
+        Getter for the routing properties of the device, which are parsed from pluginProps on first use.
+
+        :return: The ShellyProps of the device.
+        """
+
+        props = self.props
+        if props is None:
+            props = self.props = ShellyProps(self.device.pluginProps, self.stateDeadbands, self.stateSampling)
+        return props
+
     def getAddress(self):
         """
         Helper function to get the base address of this device. Trailing '/' will be removed.
@@ -132,14 +425,7 @@ class Shelly:
         :return: The cleaned base address.
         """
 
-        address = self.device.pluginProps.get('address', None)
-        if not address or address == '':
-            return None
-
-        address.strip()
-        if address.endswith('/'):
-            address = address[:-1]
-        return address
+        return self.getProps().address
 
     def getIpAddress(self):
         """
@@ -148,7 +434,7 @@ class Shelly:
         :return: The device ip address
         """
 
-        return self.device.states.get('ip-address', None)
+        return self.getState('ip-address', None)
 
     def updateAvailable(self):
         """
@@ -157,7 +443,7 @@ class Shelly:
         :return: True or false to indicate if there is a firmware update.
         """
 
-        return self.device.states.get('has-firmware-update', False)
+        return self.getState('has-firmware-update', False)
 
     def getFirmware(self):
         """
@@ -166,7 +452,7 @@ class Shelly:
         :return: The current firmware of the device.
         """
 
-        return self.device.states.get('firmware-version', None)
+        return self.getState('firmware-version', None)
 
     def getMQTT(self):
         """
@@ -189,11 +475,7 @@ class Shelly:
         :return: The Indigo deviceId of the broker for this device.
         """
 
-        brokerId = self.device.pluginProps.get('broker-id', None)
-        if brokerId is None or brokerId == '':
-            return None
-        else:
-            return int(brokerId)
+        return self.getProps().brokerId
 
     def getMessageType(self):
         """
@@ -202,7 +484,7 @@ class Shelly:
         :return: The message type for this device.
         """
 
-        return self.device.pluginProps.get('message-type', "")
+        return self.getProps().messageType
 
     def getAnnounceMessageType(self):
         """
@@ -211,10 +493,7 @@ class Shelly:
         :return: The message type for announce messages, or None if this is the same as the regular message type.
         """
 
-        if not self.device.pluginProps.get('announce-message-type-same-as-message-type', True):
-            return self.device.pluginProps.get('announce-message-type', "")
-        else:
-            return None
+        return self.getProps().announceMessageType
 
     def getMessageTypes(self):
         """
@@ -223,12 +502,7 @@ class Shelly:
         :return: A list of messages types for this device.
         """
 
-        messageTypes = []
-        if self.getMessageType() != "":
-            messageTypes.append(self.getMessageType())
-        if self.getAnnounceMessageType():
-            messageTypes.append(self.getAnnounceMessageType())
-        return messageTypes
+        return self.getProps().messageTypes
 
     def sendStatusRequestCommand(self):
         """
@@ -258,7 +532,7 @@ class Shelly:
         """
 
         if self.getAddress() is not None:
-            if not self.device.states.get('has-firmware-update', False):
+            if not self.getState('has-firmware-update', False):
                 self.logger.warning(u"\"%s\" has not notified that it has a newer firmware. Attempting to update anyway...", self.device.name)
             self.publish("{}/command".format(self.getAddress()), "update_fw")
             self.logCommandSent("update firmware")
@@ -285,18 +559,18 @@ class Shelly:
 
         if units == "F":
             temperature += offset
-            self.device.updateStateOnServer(state, temperature, uiValue='{:.{}f} °F'.format(temperature, decimals), decimalPlaces=decimals)
+            self.updateStateOnServer(state, temperature, uiValue='{:.{}f} °F'.format(temperature, decimals), decimalPlaces=decimals)
         elif units == "C->F":
             temperature = self.convertCtoF(temperature)
             temperature += offset
-            self.device.updateStateOnServer(state, temperature, uiValue='{:.{}f} °F'.format(temperature, decimals), decimalPlaces=decimals)
+            self.updateStateOnServer(state, temperature, uiValue='{:.{}f} °F'.format(temperature, decimals), decimalPlaces=decimals)
         elif units == "C":
             temperature += offset
-            self.device.updateStateOnServer(state, temperature, uiValue='{:.{}f} °C'.format(temperature, decimals), decimalPlaces=decimals)
+            self.updateStateOnServer(state, temperature, uiValue='{:.{}f} °C'.format(temperature, decimals), decimalPlaces=decimals)
         elif units == "F->C":
             temperature = self.convertFtoC(temperature)
             temperature += offset
-            self.device.updateStateOnServer(state, temperature, uiValue='{:.{}f} °C'.format(temperature, decimals), decimalPlaces=decimals)
+            self.updateStateOnServer(state, temperature, uiValue='{:.{}f} °C'.format(temperature, decimals), decimalPlaces=decimals)
 
     def convertCtoF(self, celsius):
         """
@@ -329,11 +603,12 @@ class Shelly:
             "new_fw": <true/false>
         }
 
-        :param payload: The payload of the announce message.
+        :param payload: The payload of the announce message, either as json or already decoded by the plugin.
         :return: None
         """
 
-        payload = json.loads(payload)
+        if isinstance(payload, str):
+            payload = decodePayload(payload)
         identifier = payload.get('id', None)
         mac_address = payload.get('mac', None)
         ip_address = payload.get('ip', None)
@@ -342,14 +617,14 @@ class Shelly:
 
         # id should appear in part of the device address
         if identifier and self.getAddress() and identifier in self.getAddress():
-            self.logger.debug(u"Updated device details for \"{}\" via announcement message".format(self.device.name))
-            self.device.updateStateOnServer('mac-address', mac_address)
-            self.device.updateStateOnServer('ip-address', ip_address)
+            self.logger.debug(u"Updated device details for \"%s\" via announcement message", self.device.name)
+            self.updateStateOnServer('mac-address', mac_address)
+            self.updateStateOnServer('ip-address', ip_address)
 
-            if self.device.states.get('firmware-version', '') not in [firmware_version, None, '']:
-                self.logger.debug(u"Detected a firmware change for \"{}\"".format(self.device.name))
-            self.device.updateStateOnServer('firmware-version', firmware_version)
-            self.device.updateStateOnServer('has-firmware-update', has_firmware_update)
+            if self.getState('firmware-version', '') not in [firmware_version, None, '']:
+                self.logger.debug(u"Detected a firmware change for \"%s\"", self.device.name)
+            self.updateStateOnServer('firmware-version', firmware_version)
+            self.updateStateOnServer('has-firmware-update', has_firmware_update)
 
             if firmware_version:
                 # Populate the firmware UI column
@@ -389,7 +664,7 @@ class Shelly:
         """
 
         # Parse the event message
-        event = json.loads(eventMessage)
+        event = decodePayload(eventMessage)
         eventType = event.get('event', None)
         eventId = event.get('event_cnt', None)
         if eventType is None or eventId is None:
@@ -404,9 +679,8 @@ class Shelly:
 
         # Process all triggers for this input event
         eventName = u"input-event-{}".format(eventType.lower())
-        for trigger in indigo.activePlugin.triggers.values():
-            if trigger.pluginTypeId == eventName and int(trigger.pluginProps.get('device-id', -1)) == self.device.id:
-                indigo.trigger.execute(trigger)
+        for trigger in indigo.activePlugin.triggers.get(eventName, self.device.id):
+            indigo.trigger.execute(trigger)
 
     def processTemperatureSensors(self, payload):
         """
@@ -424,7 +698,7 @@ class Shelly:
         """
 
         try:
-            sensors = json.loads(payload)
+            sensors = decodePayload(payload)
             self.temperature_sensors = []
             for channel, sensor in sensors.items():
                 # Invalid if the sensor reads 999
@@ -450,7 +724,7 @@ class Shelly:
         """
 
         try:
-            sensors = json.loads(payload)
+            sensors = decodePayload(payload)
             self.humidity_sensors = []
             for channel, sensor in sensors.items():
                 # Invalid if the sensor reads 999
@@ -470,35 +744,52 @@ class Shelly:
         :return: None
         """
 
-        previous_status = self.device.states.get('temperature-status', None)
-        self.device.updateStateOnServer("temperature-status", payload)
+        previous_status = self.getState('temperature-status', None)
+        self.updateStateOnServer("temperature-status", payload)
 
         if payload != previous_status and payload != "Normal":
             # The temperature status has changed to an abnormal value
-            for trigger in indigo.activePlugin.triggers.values():
-                if trigger.pluginTypeId == "abnormal-temperature-status-any":
-                    indigo.trigger.execute(trigger)
+            for trigger in indigo.activePlugin.triggers.get("abnormal-temperature-status-any"):
+                indigo.trigger.execute(trigger)
 
     def getLastInputEventId(self):
         """
-        Getter for the last processed input event identifier.
+        Getter for the last processed input event identifier. The identifier is read from
+        pluginProps the first time, and is then kept in memory.
 
         :return: an integer of the last input event identifier.
         """
 
-        return int(self.device.pluginProps.get('last-input-event-id', -1))
+        if self.lastInputEventId is None:
+            self.lastInputEventId = int(self.device.pluginProps.get('last-input-event-id', -1))
+        return self.lastInputEventId
 
     def setLastInputEventId(self, eventId):
         """
-        Sets the internal last input event count for the device.
+        Sets the internal last input event count for the device. The count is only written to
+        pluginProps by saveLastInputEventId.
 
         :param eventId: The event id
         :return: None
         """
 
-        props = self.device.pluginProps
-        props["last-input-event-id"] = int(eventId)
-        self.device.replacePluginPropsOnServer(props)
+        eventId = int(eventId)
+        if eventId != self.getLastInputEventId():
+            self.lastInputEventId = eventId
+            self.lastInputEventIdChanged = True
+
+    def saveLastInputEventId(self):
+        """
+        Writes the last input event identifier to pluginProps if it has changed since it was last written.
+
+        :return: None
+        """
+
+        if self.lastInputEventIdChanged:
+            props = self.device.pluginProps
+            props["last-input-event-id"] = self.lastInputEventId
+            self.device.replacePluginPropsOnServer(props)
+            self.lastInputEventIdChanged = False
 
     def updateEnergy(self, energy, offsetProp='resetEnergyOffset', energyState='accumEnergyTotal'):
         """
@@ -517,7 +808,7 @@ class Shelly:
         if new_energy < 0:  # If the offset is greater than what is being reported, the device must have reset
             # our last known energy total can be used to determine the previous energy usage
             self.logger.debug(u"%s: Must have lost power and the energy usage has reset to 0. Determining previous usage based on last known energy usage value...")
-            resetEnergyOffset = self.device.states.get(energyState, 0) * 60 * 1000 * -1
+            resetEnergyOffset = self.getState(energyState, 0) * 60 * 1000 * -1
             newProps = self.device.pluginProps
             newProps[offsetProp] = resetEnergyOffset
             self.device.replacePluginPropsOnServer(newProps)
@@ -533,7 +824,7 @@ class Shelly:
         else:
             uiValue = '{:.1f} kWh'.format(kwh)
 
-        self.device.updateStateOnServer(energyState, kwh, uiValue=uiValue, decimalPlaces=4)
+        self.updateStateOnServer(energyState, kwh, uiValue=uiValue, decimalPlaces=4)
 
     def resetEnergy(self):
         """
@@ -543,12 +834,12 @@ class Shelly:
         :return: None
         """
 
-        currEnergyWattMins = self.device.states.get('accumEnergyTotal', 0) * 60 * 1000
+        currEnergyWattMins = self.getState('accumEnergyTotal', 0) * 60 * 1000
         previousResetEnergyOffset = int(self.device.pluginProps.get('resetEnergyOffset', 0))
         offset = currEnergyWattMins + previousResetEnergyOffset
         newProps = self.device.pluginProps
         newProps['resetEnergyOffset'] = offset
-        self.device.updateStateOnServer('accumEnergyTotal', 0.0)
+        self.updateStateOnServer('accumEnergyTotal', 0.0)
         self.device.replacePluginPropsOnServer(newProps)
 
     def turnOn(self):
@@ -560,8 +851,8 @@ class Shelly:
 
         # if not self.isOn():
         #     self.logger.info(u"\"{}\" on".format(self.device.name))
-        self.device.updateStateOnServer(key='onOffState', value=True)
-        self.updateStateImage()
+        self.updateStateOnServer(key='onOffState', value=True)
+        self.refreshStateImage()
 
     def turnOff(self):
         """
@@ -572,8 +863,8 @@ class Shelly:
 
         # if not self.isOff():
         #     self.logger.info(u"\"{}\" off".format(self.device.name))
-        self.device.updateStateOnServer(key='onOffState', value=False)
-        self.updateStateImage()
+        self.updateStateOnServer(key='onOffState', value=False)
+        self.refreshStateImage()
 
     def isOn(self):
         """
@@ -582,7 +873,7 @@ class Shelly:
         :return: True if the device is on.
         """
 
-        return self.device.states.get('onOffState', False)
+        return self.getState('onOffState', False)
 
     def isOff(self):
         """
@@ -591,7 +882,7 @@ class Shelly:
         :return: True if the device is off.
         """
 
-        return not self.device.states.get('onOffState', False)
+        return not self.getState('onOffState', False)
 
     def getChannel(self):
         """
@@ -600,7 +891,7 @@ class Shelly:
         :return: The channel of the device. If no channel is found, then 0.
         """
 
-        return self.device.pluginProps.get('channel', 0)
+        return self.getProps().channel
 
     def isAddon(self):
         """
@@ -612,6 +903,19 @@ class Shelly:
 
         return False
 
+    def refreshStateImage(self):
+        """
+        Updates the state image once the current state transaction ends, or at once outside of a transaction.
+
+        :return: None
+        """
+
+        with self.stateLock:
+            if self.stateTransactionDepth > 0:
+                self.stateImagePending = True
+            else:
+                self.updateStateImage()
+
     def updateStateImage(self):
         """
         Sets the state image based on the current device states.
@@ -631,7 +935,7 @@ class Shelly:
         :return: True if the device wants logging muted.
         """
 
-        return self.device.pluginProps.get("muted", False)
+        return self.getProps().muted
 
     def getMutedLoggingMethods(self):
         """
@@ -652,19 +956,17 @@ class Shelly:
         """
 
         # Get the old battery level to determine if there was a change
-        oldBatteryLevel = self.device.states.get('batteryLevel', 0)
+        oldBatteryLevel = self.getState('batteryLevel', 0)
         # Save the current battery level
-        self.device.updateStateOnServer(key="batteryLevel", value=batteryLevel, uiValue='{}%'.format(batteryLevel))
+        self.updateStateOnServer(key="batteryLevel", value=batteryLevel, uiValue='{}%'.format(batteryLevel))
 
         try:
             if int(indigo.activePlugin.lowBatteryThreshold) >= int(batteryLevel) and int(oldBatteryLevel) != int(batteryLevel):
                 # Battery level has changed
                 # Fire all triggers watching for a low battery event
-                for trigger in indigo.activePlugin.triggers.values():
-                    if trigger.pluginTypeId == "low-battery-any":
-                        indigo.trigger.execute(trigger)
-                    elif trigger.pluginTypeId == "low-battery-device" and int(trigger.pluginProps['device-id']) == self.device.id:
-                        indigo.trigger.execute(trigger)
+                triggers = indigo.activePlugin.triggers
+                for trigger in triggers.get("low-battery-any") + triggers.get("low-battery-device", self.device.id):
+                    indigo.trigger.execute(trigger)
         except ValueError:
             pass
 
@@ -677,7 +979,7 @@ class Shelly:
         """
 
         if indigo.activePlugin.pluginPrefs.get('log-device-activity', True):
-            self.logger.info(u"sent \"{}\" {}".format(self.device.name, message))
+            self.logger.info(u"sent \"%s\" %s", self.device.name, message)
 
     def logCommandReceived(self, message):
         """
@@ -688,7 +990,7 @@ class Shelly:
         """
 
         if indigo.activePlugin.pluginPrefs.get('log-device-activity', True):
-            self.logger.info(u"received \"{}\" {}".format(self.device.name, message))
+            self.logger.info(u"received \"%s\" %s", self.device.name, message)
 
     @staticmethod
     def validateConfigUI(valuesDict, typeId, devId):
@@ -730,8 +1032,5 @@ class Shelly:
         if origDev.pluginProps.get('channel', None) != newDev.pluginProps.get('channel', None):
             return True
 
-        # If we are here then the device is not restarting, so we should update the device to pull in any chanegs
-        shelly = indigo.activePlugin.shellyDevices.get(newDev.id)
-        if shelly:
-            shelly.refresh_device()
+        # The device is not restarting, and deviceUpdated refreshes it when its props have changed
         return False
@@ -0,0 +1,96 @@
+# coding=utf-8
+import random
+from collections import deque
+
+
+class ShellyAnnouncer:
+    """
+    Schedules the announce commands that are sent when devices start. The requests for a broker
+    are collected until no device has started for the settle time. If most of the devices on the
+    broker asked to announce, a single announce command is sent to every device on the broker.
+    Otherwise the devices are asked one at a time, at a limited and jittered rate, so that their
+    replies do not all arrive at once.
+    """
+
+    def __init__(self, settleTime, broadcastRatio, interval):
+        # The seconds to wait after the last request on a broker before announcing
+        self.settleTime = settleTime
+        # The share of the addresses on a broker that must ask before the whole broker is asked
+        self.broadcastRatio = broadcastRatio
+        # The average seconds between the announce commands sent to single devices
+        self.interval = interval
+
+        # {
+        #   brokerId: (deadline, {address: None})
+        # }
+        self.requests = {}
+        # The (brokerId, address) pairs waiting to be asked one at a time
+        self.queue = deque()
+        # The pairs in the queue, so that a pair is only queued once
+        self.queued = set()
+        self.nextAnnounce = 0
+
+    def request(self, brokerId, address, now):
+        """
+        Asks for a device to announce itself once the requests on its broker have settled.
+
+        :param brokerId: The device id of the broker.
+        :param address: The address of the device.
+        :param now: The monotonic time of the request.
+        :return: None
+        """
+
+        deadline, addresses = self.requests.get(brokerId, (None, {}))
+        addresses[address] = None
+        self.requests[brokerId] = (now + self.settleTime, addresses)
+
+    def run(self, now, getBrokerAddresses):
+        """
+        Decides how to announce the brokers whose requests have settled, and takes the next device
+        to ask from the queue once its turn has come.
+
+        :param now: The monotonic time.
+        :param getBrokerAddresses: A function that returns the addresses of the running devices on a broker.
+        :return: A tuple of the list of broker ids to ask as a whole and the list of (brokerId, address) pairs to ask.
+        """
+
+        brokers = []
+        for brokerId, (deadline, addresses) in list(self.requests.items()):
+            if deadline > now:
+                continue
+            del self.requests[brokerId]
+
+            running = getBrokerAddresses(brokerId)
+            if len(addresses) > 1 and len(addresses) >= len(running) * self.broadcastRatio:
+                brokers.append(brokerId)
+                # The whole broker is asked, so its devices do not need to be asked again
+                self.queue = deque(item for item in self.queue if item[0] != brokerId)
+                self.queued = set(self.queue)
+            else:
+                for address in addresses:
+                    if (brokerId, address) not in self.queued:
+                        self.queue.append((brokerId, address))
+                        self.queued.add((brokerId, address))
+
+        devices = []
+        if self.queue and now >= self.nextAnnounce:
+            item = self.queue.popleft()
+            self.queued.discard(item)
+            devices.append(item)
+            self.nextAnnounce = now + self.interval * random.uniform(0.5, 1.5)
+        return brokers, devices
+
+    def getNextDeadline(self):
+        """
+        Getter for the time at which the announcer next needs to run.
+
+        :return: The monotonic time, or None if nothing is waiting.
+        """
+
+        deadlines = [deadline for deadline, addresses in self.requests.values()]
+        if self.queue:
+            deadlines.append(self.nextAnnounce)
+        return min(deadlines) if deadlines else None
+
+    def __len__(self):
+        return sum(len(addresses) for deadline, addresses in self.requests.values()) + len(self.queue)
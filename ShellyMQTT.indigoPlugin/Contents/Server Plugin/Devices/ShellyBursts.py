@@ -0,0 +1,70 @@
+# coding=utf-8
+
+
+class ShellyBursts:
+    """
+    The messages of devices that publish a burst of topics when they wake up, held per physical
+    device until the burst has settled so that the burst can be handled in a single pass.
+    """
+
+    def __init__(self):
+        # {
+        #   key: (deadline, [(shelly, topic, payload), ...])
+        # }
+        self.bursts = {}
+
+    def add(self, key, settleTime, now, shelly, topic, payload):
+        """
+        Adds a message to the burst of a physical device, starting the burst if there is none.
+
+        :param key: The key of the physical device, such as its broker and address.
+        :param settleTime: The number of seconds to wait for the rest of the burst.
+        :param now: The monotonic time of the message.
+        :param shelly: The Shelly device handling the message.
+        :param topic: The topic of the message.
+        :param payload: The payload of the message.
+        :return: None
+        """
+
+        burst = self.bursts.get(key, None)
+        if burst is None:
+            burst = self.bursts[key] = (now + settleTime, [])
+        burst[1].append((shelly, topic, payload))
+
+    def pop(self, key):
+        """
+        Takes the messages of the burst of a physical device.
+
+        :param key: The key of the physical device.
+        :return: A list of (shelly, topic, payload) tuples, which is empty if there is no burst.
+        """
+
+        burst = self.bursts.pop(key, None)
+        if burst is None:
+            return []
+        return burst[1]
+
+    def popSettled(self, now):
+        """
+        Takes the messages of every burst that has settled.
+
+        :param now: The monotonic time.
+        :return: A list with the list of (shelly, topic, payload) tuples of each burst.
+        """
+
+        settled = [key for key, (deadline, messages) in self.bursts.items() if deadline <= now]
+        return [self.bursts.pop(key)[1] for key in settled]
+
+    def getNextDeadline(self):
+        """
+        Getter for the time at which the next burst settles.
+
+        :return: The monotonic time, or None if there are no bursts.
+        """
+
+        if not self.bursts:
+            return None
+        return min(deadline for deadline, messages in self.bursts.values())
+
+    def __len__(self):
+        return len(self.bursts)
@@ -0,0 +1,185 @@
+# coding=utf-8
+import importlib
+import threading
+
+# Maps each device type to the module of its python class and to the device types that can be
+# used as a template for it. The class of a device type has the same name as its module, and the
+# module is only imported the first time the class is needed, so that the plugin only loads the
+# device types that are in use.
+kDeviceTypes = {
+    # Relay devices
+    "shelly-1": {
+        "module": "Devices.Relays.Shelly_1",
+        "relations": []
+    },
+    "shelly-1pm": {
+        "module": "Devices.Relays.Shelly_1PM",
+        "relations": []
+    },
+    "shelly-2-5-relay": {
+        "module": "Devices.Relays.Shelly_2_5_Relay",
+        "relations": ["shelly-2-5-relay"]
+    },
+    "shelly-4-pro": {
+        "module": "Devices.Relays.Shelly_4_Pro",
+        "relations": ["shelly-4-pro"]
+    },
+    "shelly-em-relay": {
+        "module": "Devices.Relays.Shelly_EM_Relay",
+        "relations": ["shelly-em-meter", "shelly-3em-meter"]
+    },
+
+    # RGBW2 devices
+    "shelly-rgbw2-white": {
+        "module": "Devices.RGBW2.Shelly_RGBW2_White",
+        "relations": ["shelly-rgbw2-white"]
+    },
+    "shelly-rgbw2-color": {
+        "module": "Devices.RGBW2.Shelly_RGBW2_Color",
+        "relations": []
+    },
+
+    # Sensor devices
+    "shelly-ht": {
+        "module": "Devices.Sensors.Shelly_HT",
+        "relations": []
+    },
+    "shelly-flood": {
+        "module": "Devices.Sensors.Shelly_Flood",
+        "relations": []
+    },
+    "shelly-door-window": {
+        "module": "Devices.Sensors.Shelly_Door_Window",
+        "relations": []
+    },
+    "shelly-em-meter": {
+        "module": "Devices.Sensors.Shelly_EM_Meter",
+        "relations": ["shelly-em-meter", "shelly-em-relay"]
+    },
+    "shelly-3em-meter": {
+        "module": "Devices.Sensors.Shelly_3EM_Meter",
+        "relations": ["shelly-3em-meter", "shelly-em-relay"]
+    },
+    "shelly-i3": {
+        "module": "Devices.Sensors.Shelly_i3",
+        "relations": ["shelly-i3"]
+    },
+    "shelly-button1": {
+        "module": "Devices.Sensors.Shelly_Button1",
+        "relations": []
+    },
+    "shelly-gas": {
+        "module": "Devices.Sensors.Shelly_Gas",
+        "relations": []
+    },
+    "shelly-motion": {
+        "module": "Devices.Sensors.Shelly_Motion",
+        "relations": []
+    },
+    "shelly-motion-2": {
+        "module": "Devices.Sensors.Shelly_Motion_2",
+        "relations": []
+    },
+
+    # Bulb devices
+    "shelly-bulb": {
+        "module": "Devices.Bulbs.Shelly_Bulb",
+        "relations": []
+    },
+    "shelly-bulb-vintage": {
+        "module": "Devices.Bulbs.Shelly_Bulb_Vintage",
+        "relations": []
+    },
+    "shelly-bulb-duo": {
+        "module": "Devices.Bulbs.Shelly_Bulb_Duo",
+        "relations": []
+    },
+
+    # Plug devices
+    "shelly-plug": {
+        "module": "Devices.Plugs.Shelly_Plug",
+        "relations": []
+    },
+    "shelly-plug-s": {
+        "module": "Devices.Plugs.Shelly_Plug_S",
+        "relations": []
+    },
+
+    # Add-on devices
+    "shelly-addon-ds1820": {
+        "module": "Devices.Addons.Shelly_Addon_DS1820",
+        "relations": []
+    },
+    "shelly-addon-dht22": {
+        "module": "Devices.Addons.Shelly_Addon_DHT22",
+        "relations": []
+    },
+    "shelly-addon-detached-switch": {
+        "module": "Devices.Addons.Shelly_Addon_Detached_Switch",
+        "relations": []
+    },
+
+    # Shelly Dimmer
+    "shelly-dimmer-sl": {
+        "module": "Devices.Shelly_Dimmer_SL",
+        "relations": []
+    },
+
+    # Shelly TRV
+    "shelly-trv": {
+        "module": "Devices.Shelly_TRV",
+        "relations": []
+    },
+
+    # Shelly Uni
+    "shelly-uni-relay": {
+        "module": "Devices.Relays.Shelly_Uni_Relay",
+        "relations": ["shelly-uni-relay", "shelly-uni-input"]
+    },
+    "shelly-uni-input": {
+        "module": "Devices.Sensors.Shelly_Uni_Input",
+        "relations": ["shelly-uni-input", "shelly-uni-relay"]
+    }
+}
+
+# The classes that have been imported, by device type
+loadedDeviceClasses = {}
+loadLock = threading.Lock()
+
+
+def getDeviceClass(typeId):
+    """
+    Getter for the python class of a device type. The module of the class is imported the first
+    time that the class is needed.
+
+    :param typeId: The device type.
+    :return: The class, or None if the device type is unknown.
+    """
+
+    deviceClass = loadedDeviceClasses.get(typeId, None)
+    if deviceClass is not None:
+        return deviceClass
+
+    info = kDeviceTypes.get(typeId, None)
+    if info is None:
+        return None
+
+    with loadLock:
+        if typeId not in loadedDeviceClasses:
+            module = importlib.import_module(info['module'])
+            loadedDeviceClasses[typeId] = getattr(module, info['module'].rsplit(".", 1)[-1])
+    return loadedDeviceClasses[typeId]
+
+
+def getRelatedDeviceTypes(typeId):
+    """
+    Getter for the device types that can be used as a template for a device type.
+
+    :param typeId: The device type.
+    :return: A list of device types.
+    """
+
+    info = kDeviceTypes.get(typeId, None)
+    if info is None:
+        return []
+    return list(info['relations'])
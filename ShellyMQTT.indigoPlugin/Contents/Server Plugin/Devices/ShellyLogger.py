@@ -7,19 +7,48 @@ class ShellyLogger:
     """
     A wrapper for the logger class.
     This is ued to mute info and debug logging when a device has been marked as muted.
+    Whether a method is muted is resolved the first time the method is used, and the method is
+    then cached on the wrapper, so that logging does not read the device props on every call.
     """
 
     def __init__(self, shelly):
         self.logger = logging.getLogger("Plugin.ShellyMQTT")
         self.shelly = shelly
+        # The names of the logging methods that have been resolved and cached. Two threads can
+        # resolve the same method at once, so the names are kept in a set.
+        self.resolved = set()
 
     def __getattr__(self, method):
-        def handler(*args, **kwargs):
-            # Only allow the device to log if:
-            # a) The device is not muted
-            # or
-            # b) The method is not in the list of logging methods that should be muted
-            if not self.shelly.isMuted() or method not in self.shelly.getMutedLoggingMethods():
-                getattr(self.logger, method)(*args, **kwargs)
+        # Only allow the device to log if:
+        # a) The device is not muted
+        # or
+        # b) The method is not in the list of logging methods that should be muted
+        if not self.shelly.isMuted() or method not in self.shelly.getMutedLoggingMethods():
+            handler = getattr(self.logger, method)
+        else:
+            handler = self.mutedHandler
 
+        setattr(self, method, handler)
+        self.resolved.add(method)
         return handler
+
+    @staticmethod
+    def mutedHandler(*args, **kwargs):
+        """
+        Stands in for a logging method that the device has muted.
+
+        :return: None
+        """
+
+        pass
+
+    def refresh(self):
+        """
+        Clears the cached logging methods, so that muting is resolved again from the device props.
+
+        :return: None
+        """
+
+        for method in list(self.resolved):
+            self.__dict__.pop(method, None)
+        self.resolved = set()
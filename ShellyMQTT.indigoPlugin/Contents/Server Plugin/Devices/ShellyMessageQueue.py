@@ -0,0 +1,64 @@
+# coding=utf-8
+from collections import deque, OrderedDict
+
+
+class ShellyMessageQueue:
+    """
+    The messages waiting to be dispatched to devices, in two tiers. Control messages, such as relay
+    changes and input events, are dispatched first and in order. Telemetry messages are dispatched
+    when no control message is waiting, and a newer telemetry message replaces the waiting one on
+    the same topic. A telemetry message is let through after a run of control messages so that
+    readings are never starved.
+    """
+
+    def __init__(self, starvationLimit):
+        # The number of control messages dispatched in a row before a waiting telemetry message
+        self.starvationLimit = starvationLimit
+        self.control = deque()
+        # {
+        #   key: message
+        # }
+        self.telemetry = OrderedDict()
+        self.controlRun = 0
+
+    def putControl(self, message):
+        """
+        Queues a control message.
+
+        :param message: The message.
+        :return: None
+        """
+
+        self.control.append(message)
+
+    def putTelemetry(self, key, message):
+        """
+        Queues a telemetry message, replacing the message waiting with the same key.
+
+        :param key: The key of the message, such as its broker and topic.
+        :param message: The message.
+        :return: True if a waiting message was replaced.
+        """
+
+        replaced = key in self.telemetry
+        self.telemetry[key] = message
+        return replaced
+
+    def get(self):
+        """
+        Takes the next message to dispatch.
+
+        :return: The message, or None if no message is waiting.
+        """
+
+        if self.telemetry and (not self.control or self.controlRun >= self.starvationLimit):
+            self.controlRun = 0
+            return self.telemetry.popitem(last=False)[1]
+        if self.control:
+            self.controlRun += 1
+            return self.control.popleft()
+        self.controlRun = 0
+        return None
+
+    def __len__(self):
+        return len(self.control) + len(self.telemetry)
@@ -0,0 +1,64 @@
+# coding=utf-8
+import indigo
+
+
+def reloadDeviceType(device):
+    """
+    Reloads the device from its device type, so that the states and the display state that were
+    added to Devices.xml after the device was created are picked up.
+
+    :param device: The indigo device.
+    :return: The reloaded indigo device.
+    """
+
+    device = indigo.device.changeDeviceTypeId(device, device.deviceTypeId)
+    device.replaceOnServer()
+    device.stateListOrDisplayStateIdChanged()
+    return device
+
+
+# The steps that bring a device up to date, in order of version. Each step takes the indigo device
+# and returns the device to continue with. A device stores the version of the last step applied
+# to it in its devVersCount prop, so a step only runs once on each device. When the devices need
+# to change, add a step with the next version rather than changing an existing step.
+kDeviceMigrations = [
+    (1, reloadDeviceType),
+]
+
+kCurDevVersion = kDeviceMigrations[-1][0]  # current version of plugin devices
+
+
+def getDeviceVersion(device):
+    """
+    Getter for the version of the last migration applied to a device.
+
+    :param device: The indigo device.
+    :return: The version, which is 0 for a device that has never been migrated.
+    """
+
+    try:
+        return int(device.pluginProps.get('devVersCount', 0) or 0)
+    except ValueError:
+        return 0
+
+
+def migrateDevice(device):
+    """
+    Applies the migrations that a device is behind on and then records its new version.
+
+    :param device: The indigo device.
+    :return: A tuple of the indigo device to continue with and the list of versions that were applied.
+    """
+
+    version = getDeviceVersion(device)
+    applied = []
+    for stepVersion, migration in kDeviceMigrations:
+        if stepVersion > version:
+            device = migration(device)
+            applied.append(stepVersion)
+
+    if applied:
+        props = device.pluginProps
+        props['devVersCount'] = kCurDevVersion
+        device.replacePluginPropsOnServer(props)
+    return device, applied
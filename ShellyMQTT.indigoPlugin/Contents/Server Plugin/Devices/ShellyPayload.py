@@ -0,0 +1,84 @@
+# coding=utf-8
+import json
+
+
+class ShellyPayload(str):
+    """
+    The payload of a message, which keeps its decoded json so that a payload that is passed to
+    several devices, such as the sensor readings shared by a host and its add-ons, is only decoded once.
+    The decoded objects are shared between the devices and must not be modified.
+    """
+
+    def decode(self):
+        """
+        Decodes the payload as json on first use.
+
+        :return: The decoded object.
+        """
+
+        decoded = self.__dict__.get('_decoded', None)
+        if decoded is None:
+            try:
+                decoded = json.loads(self)
+            except ValueError as e:
+                decoded = e
+            self._decoded = decoded
+
+        if isinstance(decoded, ValueError):
+            raise decoded
+        return decoded
+
+    def sensors(self):
+        """
+        Indexes the sensors reported by the payload by their hardware id on first use. The payload
+        is expected to be of the form:
+        {
+            "0":{"hwID":"XXXXXXXX","tC":20.5},
+            "1":{"hwID":"YYYYYYYY","tC":21.5}
+        }
+
+        :return: A dictionary of hardware ids and sensors.
+        """
+
+        sensors = self.__dict__.get('_sensors', None)
+        if sensors is None:
+            sensors = self._sensors = indexSensors(self.decode())
+        return sensors
+
+
+def indexSensors(data):
+    """
+    Indexes the sensors in a decoded sensor payload by their hardware id.
+
+    :param data: The decoded payload.
+    :return: A dictionary of hardware ids and sensors.
+    """
+
+    return {sensor['hwID']: sensor for sensor in data.values() if 'hwID' in sensor}
+
+
+def decodePayload(payload):
+    """
+    Decodes a json payload, using the decoded json kept by the payload when there is one.
+
+    :param payload: The payload.
+    :return: The decoded object.
+    """
+
+    if isinstance(payload, ShellyPayload):
+        return payload.decode()
+    return json.loads(payload)
+
+
+def decodeSensors(payload):
+    """
+    Decodes a sensor payload into a dictionary of hardware ids and sensors, using the index kept by
+    the payload when there is one.
+
+    :param payload: The payload.
+    :return: A dictionary of hardware ids and sensors.
+    """
+
+    if isinstance(payload, ShellyPayload):
+        return payload.sensors()
+    return indexSensors(json.loads(payload))
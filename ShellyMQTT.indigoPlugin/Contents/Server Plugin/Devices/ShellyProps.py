@@ -0,0 +1,62 @@
+# coding=utf-8
+from Devices.ShellySampling import kSampleAggregations
+
+
+class ShellyProps:
+    """
+    The properties that are used to route messages to, and log messages from, a device.
+    These are parsed from the device's pluginProps once, rather than on every message.
+    """
+
+    __slots__ = ('address', 'channel', 'brokerId', 'messageType', 'announceMessageType', 'messageTypes', 'muted', 'deadbands', 'sampling')
+
+    def __init__(self, pluginProps, stateDeadbands=None, stateSampling=None):
+        address = pluginProps.get('address', None)
+        if not address:
+            address = None
+        elif address.endswith('/'):
+            address = address[:-1]
+        self.address = address
+
+        self.channel = pluginProps.get('channel', 0)
+
+        brokerId = pluginProps.get('broker-id', None)
+        if brokerId is None or brokerId == '':
+            self.brokerId = None
+        else:
+            self.brokerId = int(brokerId)
+
+        self.messageType = pluginProps.get('message-type', "")
+        if not pluginProps.get('announce-message-type-same-as-message-type', True):
+            self.announceMessageType = pluginProps.get('announce-message-type', "")
+        else:
+            self.announceMessageType = None
+
+        self.messageTypes = []
+        if self.messageType != "":
+            self.messageTypes.append(self.messageType)
+        if self.announceMessageType:
+            self.messageTypes.append(self.announceMessageType)
+
+        self.muted = pluginProps.get('muted', False)
+
+        self.deadbands = {}
+        for state, propId in (stateDeadbands or {}).items():
+            try:
+                deadband = float(pluginProps.get(propId, 0) or 0)
+            except ValueError:
+                continue
+            if deadband > 0:
+                self.deadbands[state] = deadband
+
+        self.sampling = {}
+        for state, (prefix, uiFormat) in (stateSampling or {}).items():
+            try:
+                interval = float(pluginProps.get("{}-sample-interval".format(prefix), 0) or 0)
+            except ValueError:
+                continue
+            aggregation = pluginProps.get("{}-sample-aggregation".format(prefix), "last")
+            if aggregation not in kSampleAggregations:
+                aggregation = "last"
+            if interval > 0:
+                self.sampling[state] = (interval, aggregation, uiFormat)
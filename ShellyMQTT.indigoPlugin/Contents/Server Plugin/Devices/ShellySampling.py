@@ -0,0 +1,86 @@
+# coding=utf-8
+
+kSampleAggregations = ("last", "mean", "max")
+
+
+class ShellySampling:
+    """
+    The readings of a state that arrived during a sampling window. Only one value is written
+    for the window once it is over, which is either the last, the mean, or the max reading.
+    """
+
+    __slots__ = ('interval', 'aggregation', 'uiFormat', 'startedAt', 'count', 'total', 'last', 'max')
+
+    def __init__(self, interval, aggregation, uiFormat):
+        self.interval = interval
+        self.aggregation = aggregation
+        self.uiFormat = uiFormat
+        self.startedAt = None
+        self.count = 0
+        self.total = 0.0
+        self.last = None
+        self.max = None
+
+    def add(self, value, uiValue, decimalPlaces, now):
+        """
+        Adds a reading to the window, starting the window if it is empty.
+
+        :param value: The value of the reading.
+        :param uiValue: The value to display for the reading.
+        :param decimalPlaces: The number of decimal places to display.
+        :param now: The monotonic time of the reading.
+        :return: True if the window is over and should be written.
+        """
+
+        reading = (value, uiValue, decimalPlaces)
+        if self.aggregation != "last":
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                number = None
+            if number is not None:
+                self.count += 1
+                self.total += number
+                if self.max is None or number > self.max[0]:
+                    self.max = (number, uiValue, decimalPlaces)
+
+        if self.startedAt is None:
+            self.startedAt = now
+        self.last = reading
+        return self.isOver(now)
+
+    def isOver(self, now):
+        """
+        Determines if the window has lasted for the sampling interval.
+
+        :param now: The monotonic time.
+        :return: True if the window holds readings and is over.
+        """
+
+        return self.startedAt is not None and now - self.startedAt >= self.interval
+
+    def take(self):
+        """
+        Takes the value to write for the window and empties the window.
+
+        :return: A tuple of the value, the value to display and the decimal places, or None if the window is empty.
+        """
+
+        if self.startedAt is None:
+            return None
+
+        if self.aggregation == "max" and self.max is not None:
+            reading = self.max
+        elif self.aggregation == "mean" and self.count > 0:
+            mean = self.total / self.count
+            decimalPlaces = self.last[2]
+            reading = (mean, self.uiFormat.format(mean), decimalPlaces)
+        else:
+            reading = self.last
+
+        self.startedAt = None
+        self.count = 0
+        self.total = 0.0
+        self.last = None
+        self.max = None
+        return reading
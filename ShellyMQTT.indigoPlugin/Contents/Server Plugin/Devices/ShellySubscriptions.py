@@ -0,0 +1,219 @@
+# coding=utf-8
+import threading
+
+
+class ShellySubscriptions:
+    """
+    The topics that the running devices listen to on each broker, along with the devices that
+    listen to each topic. A topic is subscribed to on the broker when its first device is added.
+    When its last device is removed, the topic is only unsubscribed from on the next flush, so a
+    device that restarts does not unsubscribe and subscribe again. The telemetry topics of the
+    devices are kept as well, so that backed up readings on those topics can be coalesced.
+    Devices are added and removed by Indigo threads while the plugin thread flushes, so the changes
+    are made under a lock.
+    """
+
+    def __init__(self, mqttPlugin=None):
+        # The MQTT Connector plugin, or None if the broker subscriptions are only tracked
+        self.mqttPlugin = mqttPlugin
+        # Band-aid for bug in MQTT-Connector (Issue #10 on MQTT-Connector GitHub)
+        self.connectorFix = False
+        self.lock = threading.RLock()
+
+        # {
+        #   brokerId: {
+        #       'some/topic': {devId: None, anotherDevId: None}
+        #   }
+        # }
+        # The devices of a topic are kept in a dict so that they are dispatched to in the order they started.
+        self.topics = {}
+
+        # {
+        #   devId: (brokerId, ['some/topic', 'another/topic'], ['some/topic'])
+        # }
+        self.deviceTopics = {}
+
+        # {
+        #   brokerId: {'some/topic': <number of devices>}
+        # }
+        # Topics that report continuous readings, where only the newest message matters.
+        self.telemetry = {}
+
+        # {
+        #   brokerId: {'some/topic', 'another/topic'}
+        # }
+        # Topics that no device listens to anymore, waiting to be unsubscribed from.
+        self.unused = {}
+
+    @staticmethod
+    def executeSubscriptionAction(mqtt, action, brokerId, topics, connectorFix=False):
+        """
+        Sends a subscription action to MQTT Connector for each topic.
+
+        :param mqtt: The MQTT Connector plugin.
+        :param action: Either "add_subscription" or "del_subscription".
+        :param brokerId: The device id of the broker.
+        :param topics: The topics to subscribe to or unsubscribe from.
+        :param connectorFix: True to prefix the topics for MQTT Connector.
+        :return: None
+        """
+
+        for topic in topics:
+            if connectorFix:
+                topic = "0:%s" % topic
+
+            props = {
+                'topic': topic
+            }
+            if action == "add_subscription":
+                props['qos'] = 0
+            mqtt.executeAction(action, deviceId=brokerId, props=props)
+
+    def add(self, brokerId, deviceId, topics, telemetryTopics=()):
+        """
+        Adds a device to the topics it listens to, replacing any previous topics of the device.
+
+        :param brokerId: The device id of the broker.
+        :param deviceId: The id of the device.
+        :param topics: The topics the device listens to.
+        :param telemetryTopics: The topics that report continuous readings to the device.
+        :return: A list of the topics that the broker was subscribed to.
+        """
+
+        with self.lock:
+            self.remove(deviceId)
+            brokerTopics = self.topics.setdefault(brokerId, {})
+            unused = self.unused.get(brokerId, set())
+            added = []
+            for topic in topics:
+                devices = brokerTopics.get(topic, None)
+                if devices is None:
+                    devices = brokerTopics[topic] = {}
+                    if topic in unused:
+                        # The broker is still subscribed to the topic
+                        unused.discard(topic)
+                    else:
+                        added.append(topic)
+                devices[deviceId] = None
+            self.deviceTopics[deviceId] = (brokerId, list(topics), list(telemetryTopics))
+
+            if telemetryTopics:
+                brokerTelemetry = self.telemetry.setdefault(brokerId, {})
+                for topic in telemetryTopics:
+                    brokerTelemetry[topic] = brokerTelemetry.get(topic, 0) + 1
+
+            if added:
+                self.sendSubscriptionAction("add_subscription", brokerId, added)
+            return added
+
+    def remove(self, deviceId):
+        """
+        Removes a device from the topics it listens to.
+
+        :param deviceId: The id of the device.
+        :return: A list of the topics that no device listens to anymore.
+        """
+
+        with self.lock:
+            brokerId, topics, telemetryTopics = self.deviceTopics.pop(deviceId, (None, [], []))
+
+            if telemetryTopics:
+                brokerTelemetry = self.telemetry[brokerId]
+                for topic in telemetryTopics:
+                    brokerTelemetry[topic] -= 1
+                    if brokerTelemetry[topic] <= 0:
+                        del brokerTelemetry[topic]
+                if not brokerTelemetry:
+                    del self.telemetry[brokerId]
+
+            brokerTopics = self.topics.get(brokerId, None)
+            if brokerTopics is None:
+                return []
+
+            removed = []
+            for topic in topics:
+                devices = brokerTopics.get(topic, None)
+                if devices is None:
+                    continue
+                devices.pop(deviceId, None)
+                if not devices:
+                    del brokerTopics[topic]
+                    removed.append(topic)
+
+            if not brokerTopics:
+                del self.topics[brokerId]
+            if removed:
+                self.unused.setdefault(brokerId, set()).update(removed)
+            return removed
+
+    def flush(self):
+        """
+        Unsubscribes the brokers from the topics that no device listens to anymore. The lock is held
+        until the topics are unsubscribed from, so a device that starts in the meantime either takes
+        its topic back before the flush or subscribes to it again after.
+
+        :return: A dictionary of broker ids and the topics that were unsubscribed from.
+        """
+
+        with self.lock:
+            unused = {brokerId: sorted(topics) for brokerId, topics in self.unused.items() if topics}
+            self.unused = {}
+            for brokerId, topics in unused.items():
+                self.sendSubscriptionAction("del_subscription", brokerId, topics)
+            return unused
+
+    def sendSubscriptionAction(self, action, brokerId, topics):
+        """
+        Sends a subscription action to MQTT Connector if the broker subscriptions are managed.
+
+        :param action: Either "add_subscription" or "del_subscription".
+        :param brokerId: The device id of the broker.
+        :param topics: The topics to subscribe to or unsubscribe from.
+        :return: None
+        """
+
+        if self.mqttPlugin is not None and self.mqttPlugin.isEnabled():
+            self.executeSubscriptionAction(self.mqttPlugin, action, brokerId, topics, self.connectorFix)
+
+    def get(self, brokerId, topic):
+        """
+        Getter for the devices listening to a topic.
+
+        :param brokerId: The device id of the broker.
+        :param topic: The topic.
+        :return: A list of device ids.
+        """
+
+        devices = self.topics.get(brokerId, {}).get(topic, None)
+        if devices is None:
+            return []
+        return list(devices)
+
+    def isTelemetry(self, brokerId, topic):
+        """
+        Determines if a topic reports continuous readings, where only the newest message matters.
+
+        :param brokerId: The device id of the broker.
+        :param topic: The topic.
+        :return: True if the topic is a telemetry topic of a device.
+        """
+
+        brokerTelemetry = self.telemetry.get(brokerId, None)
+        return brokerTelemetry is not None and topic in brokerTelemetry
+
+    def getTopics(self, brokerId):
+        """
+        Getter for the topics listened to on a broker.
+
+        :param brokerId: The device id of the broker.
+        :return: A dictionary of topics and the number of devices listening to each.
+        """
+
+        with self.lock:
+            return {topic: len(devices) for topic, devices in self.topics.get(brokerId, {}).items()}
+
+    def __contains__(self, deviceId):
+        return deviceId in self.deviceTopics
+
+    def __len__(self):
+        return len(self.deviceTopics)
@@ -0,0 +1,84 @@
+# coding=utf-8
+
+
+class ShellyTriggers:
+    """
+    The ShellyMQTT triggers that are being processed, indexed by their event type and the device
+    they watch. Triggers without a device, such as the "any device" events, are kept under None.
+    """
+
+    def __init__(self):
+        # {
+        #   triggerId: (pluginTypeId, deviceId)
+        # }
+        self.keys = {}
+
+        # {
+        #   (pluginTypeId, deviceId): {triggerId: trigger}
+        # }
+        self.index = {}
+
+    @staticmethod
+    def getKey(trigger):
+        """
+        Builds the index key for a trigger.
+
+        :param trigger: The trigger.
+        :return: A tuple of the event type and the id of the device the trigger watches.
+        """
+
+        try:
+            deviceId = int(trigger.pluginProps.get('device-id', None))
+        except (TypeError, ValueError):
+            deviceId = None
+        return trigger.pluginTypeId, deviceId
+
+    def add(self, trigger):
+        """
+        Adds a trigger to the index, replacing any trigger with the same id.
+
+        :param trigger: The trigger to add.
+        :return: None
+        """
+
+        self.remove(trigger.id)
+        key = self.getKey(trigger)
+        self.keys[trigger.id] = key
+        self.index.setdefault(key, {})[trigger.id] = trigger
+
+    def remove(self, triggerId):
+        """
+        Removes a trigger from the index.
+
+        :param triggerId: The id of the trigger to remove.
+        :return: None
+        """
+
+        key = self.keys.pop(triggerId, None)
+        if key is None:
+            return
+
+        triggers = self.index[key]
+        del triggers[triggerId]
+        if not triggers:
+            del self.index[key]
+
+    def get(self, pluginTypeId, deviceId=None):
+        """
+        Getter for the triggers of an event type.
+
+        :param pluginTypeId: The event type.
+        :param deviceId: The id of the device the triggers watch, or None for the triggers without a device.
+        :return: A list of triggers.
+        """
+
+        triggers = self.index.get((pluginTypeId, deviceId), None)
+        if triggers is None:
+            return []
+        return list(triggers.values())
+
+    def __contains__(self, triggerId):
+        return triggerId in self.keys
+
+    def __len__(self):
+        return len(self.keys)
@@ -0,0 +1,77 @@
+# coding=utf-8
+import threading
+from queue import Queue
+
+
+class ShellyWorkers:
+    """
+    A pool of threads that handle device messages. Work is sharded by a key, such as the address of
+    the physical device, so the work for a key is always done in order by the same thread while the
+    work for other keys is done in parallel.
+    """
+
+    def __init__(self, size, logger):
+        self.size = size
+        self.logger = logger
+        self.queues = [Queue() for _ in range(size)]
+        self.threads = []
+        for i, queue in enumerate(self.queues):
+            thread = threading.Thread(target=self.run, args=(queue,), name="ShellyMQTT worker {}".format(i))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, key, function, *args):
+        """
+        Queues work on the thread that handles the key.
+
+        :param key: The key to shard the work by.
+        :param function: The function to call.
+        :param args: The arguments to call the function with.
+        :return: None
+        """
+
+        self.queues[hash(key) % self.size].put((function, args))
+
+    def run(self, queue):
+        """
+        The work loop of a thread, which runs until it is stopped.
+
+        :param queue: The queue of work for the thread.
+        :return: None
+        """
+
+        while True:
+            work = queue.get()
+            try:
+                if work is None:
+                    return
+                function, args = work
+                function(*args)
+            except Exception:
+                self.logger.exception(u"Unable to handle a device message")
+            finally:
+                queue.task_done()
+
+    def join(self):
+        """
+        Waits until all of the queued work has been done.
+
+        :return: None
+        """
+
+        for queue in self.queues:
+            queue.join()
+
+    def stop(self, timeout=5):
+        """
+        Stops the threads once they have done the work queued before the call.
+
+        :param timeout: The number of seconds to wait for each thread to stop.
+        :return: None
+        """
+
+        for queue in self.queues:
+            queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
@@ -5,6 +5,17 @@ from .Relays.Shelly_1PM import Shelly_1PM
 
 
 class Shelly_Dimmer_SL(Shelly_1PM):
+
+    # The light topics are handled the same way the 1PM handles its relay topics
+    topicHandlers = {
+        "{address}/light/{channel}": "handleRelay",
+        "{address}/light/{channel}/status": "handleLightStatus",
+        "{address}/light/{channel}/power": "handlePower",
+        "{address}/light/{channel}/overpower_value": "handleOverpowerValue",
+        "{address}/light/{channel}/energy": "handleEnergy",
+        "{address}/overload": "handleOverload"
+    }
+
     def __init__(self, device):
         Shelly_1PM.__init__(self, device)
 
@@ -31,45 +42,48 @@ class Shelly_Dimmer_SL(Shelly_1PM):
                 "{}/input_event/{}".format(address, self.getChannel())
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleLightStatus(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the status of the light.
 
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        :param payload: The json status in the form: {"ison": true/false, "mode": "white", "brightness": x}
         :return: None
         """
 
-        if topic == "{}/light/{}/status".format(self.getAddress(), self.getChannel()):
-            # the payload will be json in the form: {"ison": true/false, "mode": "white", "brightness": x}
-            try:
-                payload = json.loads(payload)
-                if payload['ison']:
-                    # we will accept a brightness value and save it
-
-                    if self.isOff():
-                        # self.logger.info(u"\"{}\" on to {}%".format(self.device.name, payload['brightness']))
-                        self.logCommandReceived(u"brightness to {}%".format(payload['brightness']))
-                    elif self.device.states['brightnessLevel'] != payload['brightness']:
-                        # Brightness will change
-                        # self.logger.info(u"\"{}\" set to {}%".format(self.device.name, payload['brightness']))
-                        self.logCommandReceived(u"brightness to {}%".format(payload['brightness']))
-
-                    self.applyBrightness(payload['brightness'])
-                else:
-                    # The light should be off regardless of a reported brightness value
-                    if not self.isOff():
-                        self.logCommandReceived("off")
-                    self.turnOff()
-            except ValueError:
-                self.logger.error(u"Problem parsing JSON: {}".format(payload))
-        elif topic == "{}/overload".format(self.getAddress()):
-            overloaded = (payload == '1')
-            if not self.device.states['overload'] and overloaded:
-                self.logger.error(u"\"{}\" was overloaded!".format(self.device.name))
-            self.device.updateStateOnServer('overload', overloaded)
-        else:
-            Shelly_1PM.handleMessage(self, topic.replace("light", "relay"), payload)
+        try:
+            payload = json.loads(payload)
+            if payload['ison']:
+                # we will accept a brightness value and save it
+
+                if self.isOff():
+                    # self.logger.info(u"\"{}\" on to {}%".format(self.device.name, payload['brightness']))
+                    self.logCommandReceived(u"brightness to {}%".format(payload['brightness']))
+                elif self.getState('brightnessLevel') != payload['brightness']:
+                    # Brightness will change
+                    # self.logger.info(u"\"{}\" set to {}%".format(self.device.name, payload['brightness']))
+                    self.logCommandReceived(u"brightness to {}%".format(payload['brightness']))
+
+                self.applyBrightness(payload['brightness'])
+            else:
+                # The light should be off regardless of a reported brightness value
+                if not self.isOff():
+                    self.logCommandReceived("off")
+                self.turnOff()
+        except ValueError:
+            self.logger.error(u"Problem parsing JSON: {}".format(payload))
+
+    def handleOverload(self, payload):
+        """
+        Handles a message reporting whether the device is overloaded.
+
+        :param payload: "1" if the device is overloaded.
+        :return: None
+        """
+
+        overloaded = (payload == '1')
+        if not self.getState('overload') and overloaded:
+            self.logger.error(u"\"{}\" was overloaded!".format(self.device.name))
+        self.updateStateOnServer('overload', overloaded)
 
     def handleAction(self, action):
         """
@@ -133,7 +147,7 @@ class Shelly_Dimmer_SL(Shelly_1PM):
         """
 
         if brightness > 0:
-            # if self.device.states['brightnessLevel'] != brightness:
+            # if self.getState('brightnessLevel') != brightness:
             #     if self.isOn():
             #         self.logger.info(u"\"{}\" set to {}%".format(self.device.name, brightness))
             #     else:
@@ -142,7 +156,7 @@ class Shelly_Dimmer_SL(Shelly_1PM):
         else:
             self.turnOff()
 
-        self.device.updateStateOnServer("brightnessLevel", brightness)
+        self.updateStateOnServer("brightnessLevel", brightness)
 
     def set(self):
         """
@@ -151,7 +165,7 @@ class Shelly_Dimmer_SL(Shelly_1PM):
         :return: None
         """
 
-        brightness = self.device.states.get('brightnessLevel', 0)
+        brightness = self.getState('brightnessLevel', 0)
         turn = "on" if self.isOn() else "off"
         payload = {
             "turn": turn,
@@ -166,8 +180,8 @@ class Shelly_Dimmer_SL(Shelly_1PM):
         :return: None
         """
 
-        self.device.updateStateOnServer(key='onOffState', value=True)
-        self.updateStateImage()
+        self.updateStateOnServer(key='onOffState', value=True)
+        self.refreshStateImage()
 
     def updateStateImage(self):
         """
@@ -5,11 +5,17 @@ from .Shelly import Shelly
 
 
 class Shelly_TRV(Shelly):
+
+    topicHandlers = {
+        "{address}/info": "handleInfo",
+        "{address}/settings": "handleSettings"
+    }
+
     def __init__(self, device):
         Shelly.__init__(self, device)
-        self.updateStateImage()
-        self.device.updateStateOnServer("hvacOperationMode", value=indigo.kHvacMode.Heat)
-        self.device.updateStateOnServer("hvacHeaterIsOn", value=True)
+        self.refreshStateImage()
+        self.updateStateOnServer("hvacOperationMode", value=indigo.kHvacMode.Heat)
+        self.updateStateOnServer("hvacHeaterIsOn", value=True)
 
         self.schedule_profile_names = []
 
@@ -30,37 +36,42 @@ class Shelly_TRV(Shelly):
                 "{}/settings".format(address)
             ]
 
-    def handleMessage(self, topic, payload):
+    def handleInfo(self, payload):
         """
-        This method is called when a message comes in and matches one of this devices subscriptions.
+        Handles a message reporting the info of the valve.
 
-        :param topic: The topic of the message.
-        :param payload: THe payload of the message.
+        :param payload: The json info of the valve.
         :return: None
         """
-        if topic == "{}/info".format(self.getAddress()):
-            payload = json.loads(payload)
-
-            battery = payload.get("bat", {})
-            charger = payload.get("charger", None)
-            calibrated = payload.get("calibrated", None)
-            thermostats = payload.get("thermostats", [])
-            thermostat = thermostats[self.getChannel()] if len(thermostats) > self.getChannel() else {}
-
-            self.updateBattery(battery)
-            self.updateCharger(charger)
-            self.updateCalibrated(calibrated)
-            self.processThermostat(thermostat)
-
-            self.updateStateImage()
-        elif topic == "{}/settings".format(self.getAddress()):
-            payload = json.loads(payload)
-            thermostats = payload.get("thermostats", [])
-            thermostat = thermostats[self.getChannel()] if len(thermostats) > self.getChannel() else {}
-
-            self.processThermostat(thermostat)
-        else:
-            Shelly.handleMessage(self, topic, payload)
+
+        payload = json.loads(payload)
+
+        battery = payload.get("bat", {})
+        charger = payload.get("charger", None)
+        calibrated = payload.get("calibrated", None)
+        thermostats = payload.get("thermostats", [])
+        thermostat = thermostats[self.getChannel()] if len(thermostats) > self.getChannel() else {}
+
+        self.updateBattery(battery)
+        self.updateCharger(charger)
+        self.updateCalibrated(calibrated)
+        self.processThermostat(thermostat)
+
+        self.refreshStateImage()
+
+    def handleSettings(self, payload):
+        """
+        Handles a message reporting the settings of the valve.
+
+        :param payload: The json settings of the valve.
+        :return: None
+        """
+
+        payload = json.loads(payload)
+        thermostats = payload.get("thermostats", [])
+        thermostat = thermostats[self.getChannel()] if len(thermostats) > self.getChannel() else {}
+
+        self.processThermostat(thermostat)
 
     def updateBattery(self, battery):
         """
@@ -75,7 +86,7 @@ class Shelly_TRV(Shelly):
         if level is not None:
             self.updateBatteryLevel(level)
         if voltage is not None:
-            self.device.updateStateOnServer(
+            self.updateStateOnServer(
                 key="voltage",
                 value=voltage,
                 uiValue='{}V'.format(voltage)
@@ -89,7 +100,7 @@ class Shelly_TRV(Shelly):
         :return: None
         """
         if isinstance(charger, bool):
-            self.device.updateStateOnServer(
+            self.updateStateOnServer(
                 key="charging",
                 value=charger
             )
@@ -102,7 +113,7 @@ class Shelly_TRV(Shelly):
         :return: None
         """
         if isinstance(calibrated, bool):
-            self.device.updateStateOnServer(
+            self.updateStateOnServer(
                 key="calibrated",
                 value=calibrated
             )
@@ -127,30 +138,30 @@ class Shelly_TRV(Shelly):
         if target_temperature is not None:
             if self.device.pluginProps.get("temp-units", "C") == "F":
                 target_temperature = round((target_temperature * 9 / 5) + 32)
-            self.device.updateStateOnServer(key="setpointHeat", value=target_temperature)
+            self.updateStateOnServer(key="setpointHeat", value=target_temperature)
 
         if sensor_temperature is not None:
             if self.device.pluginProps.get("temp-units", "C") == "F":
                 sensor_temperature = round((sensor_temperature * 9 / 5) + 32)
-            self.device.updateStateOnServer(key="temperatureInput1", value=sensor_temperature)
+            self.updateStateOnServer(key="temperatureInput1", value=sensor_temperature)
 
         if isinstance(boost_minutes, int):
-            self.device.updateStateOnServer(
+            self.updateStateOnServer(
                 key="boost-minutes",
                 value=boost_minutes
             )
 
         if valve_position is not None:
-            self.device.updateStateOnServer(
+            self.updateStateOnServer(
                 key="valve-position",
                 value=valve_position,
                 uiValue="{}% open".format(valve_position)
             )
 
         if schedule:
-            self.device.updateStateOnServer(key="schedule-profile", value=schedule_profile)
+            self.updateStateOnServer(key="schedule-profile", value=schedule_profile)
         else:
-            self.device.updateStateOnServer(key="schedule-profile", value=None)
+            self.updateStateOnServer(key="schedule-profile", value=None)
 
     def handleAction(self, action):
         """
@@ -162,10 +173,10 @@ class Shelly_TRV(Shelly):
         if action.thermostatAction == indigo.kThermostatAction.SetHeatSetpoint:
             self.commandHeatSetpoint(action.actionValue)
         elif action.thermostatAction == indigo.kThermostatAction.DecreaseHeatSetpoint:
-            target = self.device.states["setpointHeat"] - action.actionValue
+            target = self.getState("setpointHeat") - action.actionValue
             self.commandHeatSetpoint(target)
         elif action.thermostatAction == indigo.kThermostatAction.IncreaseHeatSetpoint:
-            target = self.device.states["setpointHeat"] + action.actionValue
+            target = self.getState("setpointHeat") + action.actionValue
             self.commandHeatSetpoint(target)
         else:
             Shelly.handleAction(self, action)
@@ -323,7 +334,7 @@ class Shelly_TRV(Shelly):
             if threshold is None:
                 return
 
-            if self.device.states['valve-position'] > int(threshold):
+            if self.getState('valve-position') > int(threshold):
                 self.device.updateStateImageOnServer(indigo.kStateImageSel.HvacHeating)
             else:
                 self.device.updateStateImageOnServer(indigo.kStateImageSel.HvacHeatMode)
@@ -332,7 +343,7 @@ class Shelly_TRV(Shelly):
             if threshold is None:
                 return
 
-            if self.device.states['temperatureInput1'] < (self.device.states["setpointHeat"] - float(threshold)):
+            if self.getState('temperatureInput1') < (self.getState("setpointHeat") - float(threshold)):
                 self.device.updateStateImageOnServer(indigo.kStateImageSel.HvacHeating)
             else:
                 self.device.updateStateImageOnServer(indigo.kStateImageSel.HvacHeatMode)
\ No newline at end of file
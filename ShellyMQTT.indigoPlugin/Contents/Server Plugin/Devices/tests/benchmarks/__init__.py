@@ -0,0 +1,6 @@
+import os
+import unittest
+
+# The benchmarks that assert on wall clock times are only run when asked for, since their timings
+# depend on the load of the machine running them. The benchmarks that count calls always run.
+timedBenchmark = unittest.skipUnless(os.environ.get('SHELLY_BENCHMARKS'), "set SHELLY_BENCHMARKS=1 to run the timed benchmarks")
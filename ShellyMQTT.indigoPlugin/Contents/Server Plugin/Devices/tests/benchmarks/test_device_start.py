@@ -0,0 +1,101 @@
+# coding=utf-8
+"""
+Times a restart of the plugin with 200 devices when every device is migrated on every start and
+when only the devices that are behind the current device version are migrated.
+
+Run with `SHELLY_BENCHMARKS=1 pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import logging
+import sys
+import time
+from unittest.mock import patch
+
+from Devices.tests.benchmarks import timedBenchmark
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+DEVICES = 200
+ROUND_TRIP = 0.0005
+
+
+class SlowDevice(IndigoDevice):
+    """
+    A device whose writes to the server block like a call to the Indigo server.
+    """
+
+    def replaceOnServer(self):
+        time.sleep(ROUND_TRIP)
+
+    def replacePluginPropsOnServer(self, pluginProps):
+        time.sleep(ROUND_TRIP)
+        IndigoDevice.replacePluginPropsOnServer(self, pluginProps)
+
+    def stateListOrDisplayStateIdChanged(self):
+        time.sleep(ROUND_TRIP)
+
+
+def changeDeviceTypeId(device, deviceTypeId):
+    time.sleep(ROUND_TRIP)
+    return device
+
+
+@timedBenchmark
+class Test_Device_Start(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+        patcher = patch.object(indigo.device, 'changeDeviceTypeId', changeDeviceTypeId)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.broker = IndigoDevice(id=1000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+
+        self.devices = []
+        for i in range(1, DEVICES + 1):
+            device = SlowDevice(id=i, name="Relay {}".format(i), deviceTypeId="shelly-1")
+            device.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/relay-{}".format(i), 'message-type': "shellies"})
+            indigo.devices[device.id] = device
+            self.devices.append(device)
+
+    def start(self):
+        """
+        Starts a new instance of the plugin and all of the devices.
+
+        :return: The plugin and the seconds taken to start the devices.
+        """
+
+        shellyPlugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {})
+        indigo.activePlugin = shellyPlugin
+        start = time.perf_counter()
+        for device in self.devices:
+            shellyPlugin.deviceStartComm(device)
+        return shellyPlugin, time.perf_counter() - start
+
+    def test_restart(self):
+        # The first start migrates every device
+        shellyPlugin, first = self.start()
+        self.assertEqual(DEVICES, shellyPlugin.deviceVersionCounts['migrated'])
+
+        # Every device looked out of date to the old version check
+        with patch.object(self.plugin_module, 'getDeviceVersion', return_value=0), patch.object(sys.modules['Devices.ShellyMigrations'], 'getDeviceVersion', return_value=0):
+            shellyPlugin, before = self.start()
+        self.assertEqual(DEVICES, shellyPlugin.deviceVersionCounts['migrated'])
+
+        shellyPlugin, after = self.start()
+        self.assertEqual(DEVICES, shellyPlugin.deviceVersionCounts['current'])
+
+        print("")
+        print("Device start time for {} devices with {:.1f}ms server round trips".format(DEVICES, ROUND_TRIP * 1000))
+        print("    {:<24} {:>8.1f}ms".format("first start", first * 1000))
+        print("    {:<24} {:>8.1f}ms".format("restart, every device", before * 1000))
+        print("    {:<24} {:>8.1f}ms".format("restart, version gated", after * 1000))
+
+        self.assertLess(after * 5, before)
@@ -0,0 +1,145 @@
+# coding=utf-8
+"""
+Counts the calls into the Indigo server made for each inbound power message, with Indigo calling
+deviceUpdated after every state write as it does in the plugin host. Like Indigo, the base
+deviceUpdated asks didDeviceCommPropertyChange whether the device must restart. The deviceUpdated that
+refreshed the device and scanned for add-ons on every call is compared to the one that skips
+both for state-only changes.
+
+Run with `pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import logging
+
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+DEVICES = 50
+MESSAGES = 200
+
+
+class CountingDevices(dict):
+    """
+    indigo.devices, counting every lookup as a call to the server.
+    """
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.lookups = 0
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return dict.__getitem__(self, key)
+
+
+class ServerDevice(IndigoDevice):
+    """
+    A device that tells the plugin about each update, like Indigo does, and counts its refreshes.
+    """
+
+    def __init__(self, id, name, deviceTypeId=None):
+        IndigoDevice.__init__(self, id, name, deviceTypeId)
+        self.deviceUpdated = None
+        self.refreshes = 0
+
+    def snapshot(self):
+        origDev = IndigoDevice(self.id, self.name, self.deviceTypeId)
+        origDev.pluginProps = dict(self.pluginProps)
+        origDev.states = dict(self.states)
+        return origDev
+
+    def updateStatesOnServer(self, states):
+        origDev = self.snapshot()
+        IndigoDevice.updateStatesOnServer(self, states)
+        self.deviceUpdated(origDev, self)
+
+    def updateStateImageOnServer(self, image):
+        origDev = self.snapshot()
+        IndigoDevice.updateStateImageOnServer(self, image)
+        self.deviceUpdated(origDev, self)
+
+    def refreshFromServer(self):
+        self.refreshes += 1
+
+
+def legacyDeviceUpdated(shellyPlugin, origDev, newDev):
+    """
+    deviceUpdated as it was before state-only changes were skipped.
+    """
+
+    shelly = shellyPlugin.shellyDevices.get(origDev.id, None)
+    if shelly:
+        shelly.refresh_device()
+        if dict(origDev.pluginProps) != dict(newDev.pluginProps):
+            shelly.compileTopicHandlers()
+            if shelly.device.id in shellyPlugin.deviceIdentifierKeys:
+                shellyPlugin.addDeviceIdentifier(shelly)
+
+    for dev in shellyPlugin.shellyDevices.values():
+        if dev.isAddon() and dev.getHostDevice() == shelly:
+            dev.refreshAddressColumn()
+
+
+class Test_Device_Updated(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+
+        indigo.devices = CountingDevices()
+        self.broker = IndigoDevice(id=1000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+
+    def measure(self, deviceUpdated):
+        """
+        Publishes power messages to every device and counts the server calls they cause.
+
+        :param deviceUpdated: The deviceUpdated implementation Indigo calls after each update.
+        :return: The server calls per message.
+        """
+
+        shellyPlugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {})
+        devices = []
+        for i in range(1, DEVICES + 1):
+            device = ServerDevice(id=i, name="Relay {}".format(i), deviceTypeId="shelly-1pm")
+            device.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/relay-{}".format(i), 'message-type': "shellies"})
+            device.states.update({'onOffState': False, 'curEnergyLevel': 0.0})
+            device.deviceUpdated = lambda origDev, newDev: deviceUpdated(shellyPlugin, origDev, newDev)
+            indigo.devices[device.id] = device
+            shellyPlugin.deviceStartComm(device)
+            devices.append(device)
+
+        indigo.devices.lookups = 0
+        for device in devices:
+            device.server_round_trips = 0
+            device.refreshes = 0
+
+        for i in range(MESSAGES):
+            address = "shellies/relay-{}".format(i % DEVICES + 1)
+            # Change the power each time so that the write is never skipped
+            shellyPlugin.mqttPlugin.queueMessage(self.broker.id, "shellies", "{}/relay/0/power".format(address), str(10 + i))
+            shellyPlugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+            shellyPlugin.processMessages()
+
+        writes = sum(device.server_round_trips for device in devices)
+        refreshes = sum(device.refreshes for device in devices)
+        self.assertEqual(MESSAGES, writes)
+        return (writes + refreshes + indigo.devices.lookups) / float(MESSAGES)
+
+    def test_server_calls_per_message(self):
+        before = self.measure(legacyDeviceUpdated)
+        after = self.measure(lambda shellyPlugin, origDev, newDev: shellyPlugin.deviceUpdated(origDev, newDev))
+
+        print("")
+        print("Indigo server calls per power message with {} devices".format(DEVICES))
+        print("    {:<24} {:>6.2f}".format("refresh on every update", before))
+        print("    {:<24} {:>6.2f}".format("skip state-only updates", after))
+
+        # Only the state write
+        self.assertEqual(1, after)
+        self.assertLess(after, before)
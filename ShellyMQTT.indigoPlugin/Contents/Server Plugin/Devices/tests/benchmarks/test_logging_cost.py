@@ -0,0 +1,126 @@
+# coding=utf-8
+"""
+Times the logging done for each message with debug logging off and on. The message handler is
+timed with the broker name looked up for every message, like it used to be, and with the lookup
+only done for a debug message that will be shown. A muted device logging an info message is timed
+with a logger that resolves muting on every call and with one that caches its methods.
+
+Run with `SHELLY_BENCHMARKS=1 pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import logging
+import time
+import timeit
+
+from Devices.tests.benchmarks import timedBenchmark
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+MESSAGES = 200
+ROUND_TRIP = 0.0005
+
+
+class SlowBroker(IndigoDevice):
+    """
+    A broker whose name is fetched from the Indigo server each time it is read.
+    """
+
+    @property
+    def name(self):
+        time.sleep(ROUND_TRIP)
+        return self.__dict__['_name']
+
+    @name.setter
+    def name(self, value):
+        self.__dict__['_name'] = value
+
+
+class UncachedLogger:
+    """
+    The device logger as it was, which resolves muting and builds a closure on every call.
+    """
+
+    def __init__(self, shelly):
+        self.logger = logging.getLogger("Plugin.ShellyMQTT")
+        self.shelly = shelly
+
+    def __getattr__(self, method):
+        def handler(*args, **kwargs):
+            if not self.shelly.isMuted() or method not in self.shelly.getMutedLoggingMethods():
+                getattr(self.logger, method)(*args, **kwargs)
+
+        return handler
+
+
+@timedBenchmark
+class Test_Logging_Cost(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        for name in ('Plugin', 'Plugin.ShellyMQTT'):
+            logger = logging.getLogger(name)
+            logger.addHandler(logging.NullHandler())
+            self.addCleanup(logger.setLevel, logger.level)
+            # Indigo passes every record to the plugin log handlers, which filter by level
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+            self.addCleanup(setattr, logger, 'propagate', True)
+
+        self.broker = SlowBroker(id=1000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+
+        self.plugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {})
+        indigo.activePlugin = self.plugin
+        device = IndigoDevice(id=1, name="Relay", deviceTypeId="shelly-1")
+        device.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/relay", 'message-type': "shellies", 'muted': True})
+        indigo.devices[device.id] = device
+        self.plugin.deviceStartComm(device)
+        self.shelly = self.plugin.shellyDevices[device.id]
+
+    def uncachedMessageHandler(self, message):
+        """
+        The message handler as it was, which looks up the broker name for every message.
+        """
+
+        self.plugin.acceptedMessageCounts[message['message_type']] += 1
+        self.plugin.logger.debug(u"Queued MQTT message type {} from {}".format(message["message_type"], indigo.devices[int(message["brokerID"])].name))
+        self.plugin.messageQueue.put(message)
+
+    def timeHandler(self, handler):
+        message = {'message_type': "shellies", 'brokerID': str(self.broker.id)}
+        start = time.perf_counter()
+        for _ in range(MESSAGES):
+            handler(message)
+        elapsed = time.perf_counter() - start
+        while not self.plugin.messageQueue.empty():
+            self.plugin.messageQueue.get_nowait()
+        return elapsed / MESSAGES * 1e6
+
+    def timeLogger(self, logger):
+        return min(timeit.repeat(lambda: logger.info(u"received \"%s\" %s", "Relay", "on"), number=10000, repeat=3)) / 10000 * 1e6
+
+    def test_logging_cost(self):
+        results = []
+        for level in ("info", "debug"):
+            self.plugin.setLogLevel(level)
+            results.append((level, self.timeHandler(self.uncachedMessageHandler), self.timeHandler(self.plugin.message_handler)))
+
+        uncached = self.timeLogger(UncachedLogger(self.shelly))
+        cached = self.timeLogger(self.shelly.logger)
+
+        print("")
+        print("message_handler per message with {:.1f}ms server round trips".format(ROUND_TRIP * 1000))
+        print("    {:<12} {:>14} {:>14}".format("log level", "every lookup", "guarded"))
+        for level, before, after in results:
+            print("    {:<12} {:>12.1f}us {:>12.1f}us".format(level, before, after))
+        print("Muted device info call")
+        print("    {:<12} {:>12.2f}us".format("uncached", uncached))
+        print("    {:<12} {:>12.2f}us".format("cached", cached))
+
+        info = results[0]
+        self.assertLess(info[2] * 10, info[1])
+        self.assertLess(cached, uncached)
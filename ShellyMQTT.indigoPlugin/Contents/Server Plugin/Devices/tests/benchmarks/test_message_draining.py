@@ -0,0 +1,63 @@
+# coding=utf-8
+"""
+Counts the fetchQueuedMessage round trips made to the MQTT Connector while a 3EM meter
+publishes a burst of messages, with and without batch message fetching.
+
+Run with `pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import logging
+
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+MESSAGES = 1000
+BURST = 25
+
+
+class Test_Message_Draining(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+
+        self.broker = IndigoDevice(id=1000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+
+    def measure(self, batched):
+        shellyPlugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {'batch-message-fetching': batched})
+        device = IndigoDevice(id=1, name="Meter", deviceTypeId="shelly-3em-meter")
+        device.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/3em", 'message-type': "shellies", 'channel': "0"})
+        indigo.devices[device.id] = device
+        shellyPlugin.deviceStartComm(device)
+
+        mqtt = shellyPlugin.mqttPlugin
+        fetches = mqtt.getActionCount("fetchQueuedMessage")
+        topics = ["power", "pf", "current", "voltage", "energy", "returned_energy", "total", "total_returned"]
+        # The meter publishes in bursts, each message notifying the plugin before the burst is processed
+        for start in range(0, MESSAGES, BURST):
+            for i in range(start, start + BURST):
+                topic = "shellies/3em/emeter/0/{}".format(topics[i % len(topics)])
+                mqtt.queueMessage(self.broker.id, "shellies", topic, str(i))
+                shellyPlugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+            shellyPlugin.processMessages()
+
+        self.assertTrue(shellyPlugin.messageQueue.empty())
+        return mqtt.getActionCount("fetchQueuedMessage") - fetches
+
+    def test_round_trips(self):
+        before = self.measure(False)
+        after = self.measure(True)
+
+        print("")
+        print("fetchQueuedMessage round trips per {} messages (bursts of {})".format(MESSAGES, BURST))
+        print("    {:<20} {:>8}".format("per notification", before))
+        print("    {:<20} {:>8}".format("batched", after))
+
+        self.assertEqual(2 * MESSAGES, before)
+        self.assertEqual(MESSAGES + MESSAGES // BURST, after)
@@ -0,0 +1,122 @@
+# coding=utf-8
+"""
+Measures the time from the start of processMessages until a button click executes its trigger
+while a flood of 3EM readings is waiting, with the messages dispatched in the order they were
+fetched and with control messages dispatched ahead of telemetry.
+
+Run with `SHELLY_BENCHMARKS=1 pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import logging
+import time
+from unittest.mock import patch
+
+from Devices.tests.benchmarks import timedBenchmark
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+METERS = 20
+CHANNELS = 3
+READINGS = 5
+ROUND_TRIP = 0.0002
+TOPICS = ["power", "reactive_power", "voltage", "current", "pf"]
+
+
+class SlowDevice(IndigoDevice):
+    """
+    A device whose state writes block like a call to the Indigo server.
+    """
+
+    def updateStatesOnServer(self, states):
+        time.sleep(ROUND_TRIP)
+        IndigoDevice.updateStatesOnServer(self, states)
+
+
+class TriggerClock:
+    """
+    Records when each trigger is executed.
+    """
+
+    def __init__(self):
+        self.executed = {}
+
+    def execute(self, trigger):
+        self.executed.setdefault(trigger.id, time.perf_counter())
+
+
+@timedBenchmark
+class Test_Message_Priority(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+
+        self.broker = IndigoDevice(id=1000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+
+    def measure(self, prioritized):
+        """
+        Queues a flood of meter readings followed by a click and times processMessages.
+
+        :param prioritized: False to dispatch every message in the order it was fetched.
+        :return: The seconds until the click trigger was executed.
+        """
+
+        shellyPlugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {})
+        indigo.activePlugin = shellyPlugin
+        indigo.trigger = TriggerClock()
+
+        for meter in range(METERS):
+            for channel in range(CHANNELS):
+                device = SlowDevice(id=meter * CHANNELS + channel + 1, name="Meter {} {}".format(meter, channel), deviceTypeId="shelly-3em-meter")
+                device.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/3em-{}".format(meter), 'message-type': "shellies", 'channel': str(channel)})
+                indigo.devices[device.id] = device
+                shellyPlugin.deviceStartComm(device)
+
+        button = SlowDevice(id=500, name="Button", deviceTypeId="shelly-1")
+        button.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/button", 'message-type': "shellies"})
+        indigo.devices[button.id] = button
+        shellyPlugin.deviceStartComm(button)
+
+        trigger = indigo.PluginEventTrigger()
+        trigger.id = 1
+        trigger.pluginId = "com.lionsheeptechnology.ShellyMQTT"
+        trigger.pluginTypeId = "input-event-s"
+        trigger.pluginProps = {'device-id': str(button.id)}
+        shellyPlugin.triggerStartProcessing(trigger)
+
+        mqtt = shellyPlugin.mqttPlugin
+        for reading in range(READINGS):
+            for meter in range(METERS):
+                for channel in range(CHANNELS):
+                    for topic in TOPICS:
+                        mqtt.queueMessage(self.broker.id, "shellies", "shellies/3em-{}/emeter/{}/{}".format(meter, channel, topic), str(reading))
+        mqtt.queueMessage(self.broker.id, "shellies", "shellies/button/input_event/0", '{"event": "S", "event_cnt": 1}')
+        shellyPlugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+
+        if not prioritized:
+            patcher = patch.object(shellyPlugin.subscriptions, 'isTelemetry', return_value=False)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        start = time.perf_counter()
+        shellyPlugin.processMessages()
+
+        self.assertIn(trigger.id, indigo.trigger.executed)
+        return indigo.trigger.executed[trigger.id] - start
+
+    def test_click_latency(self):
+        before = self.measure(False)
+        after = self.measure(True)
+
+        print("")
+        print("Click to trigger latency behind {} 3EM readings with {:.1f}ms server round trips".format(METERS * CHANNELS * READINGS * len(TOPICS), ROUND_TRIP * 1000))
+        print("    {:<20} {:>8.1f}ms".format("fetch order", before * 1000))
+        print("    {:<20} {:>8.1f}ms".format("control first", after * 1000))
+
+        self.assertLess(after * 10, before)
@@ -0,0 +1,104 @@
+# coding=utf-8
+"""
+Measures the latency between message_handler queueing a message and the device's handleMessage
+being called, for the legacy 100 ms polling loop and for the blocking message pump.
+
+Run with `SHELLY_BENCHMARKS=1 pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import logging
+import statistics
+import threading
+import time
+
+from Devices.tests.benchmarks import timedBenchmark
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+SAMPLES = 40
+
+
+def pollingConcurrentThread(shellyPlugin):
+    """
+    The concurrent thread as it was before the message pump: poll the queue every 100 ms.
+    """
+
+    try:
+        while True:
+            shellyPlugin.processMessages()
+            shellyPlugin.sleep(0.1)
+    except shellyPlugin.StopThread:
+        pass
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@timedBenchmark
+class Test_Message_Pump_Latency(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+
+        self.broker = IndigoDevice(id=1000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+
+    def measure(self, target):
+        shellyPlugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {})
+        device = IndigoDevice(id=1, name="Relay", deviceTypeId="shelly-1")
+        device.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/relay", 'message-type': "shellies"})
+        device.states['onOffState'] = False
+        indigo.devices[device.id] = device
+        shellyPlugin.deviceStartComm(device)
+        shelly = shellyPlugin.shellyDevices[device.id]
+
+        handled = threading.Event()
+        handledAt = []
+        handleMessage = shelly.handleMessage
+
+        def timedHandleMessage(topic, payload):
+            handleMessage(topic, payload)
+            handledAt.append(time.perf_counter())
+            handled.set()
+
+        shelly.handleMessage = timedHandleMessage
+
+        thread = threading.Thread(target=target, args=(shellyPlugin,))
+        thread.start()
+
+        latencies = []
+        for i in range(SAMPLES):
+            handled.clear()
+            # Spread the messages out so that they land at different points in the polling interval
+            time.sleep(0.005 + (i % 7) * 0.003)
+            shellyPlugin.mqttPlugin.queueMessage(self.broker.id, "shellies", "shellies/relay/relay/0", "on" if i % 2 else "off")
+            queuedAt = time.perf_counter()
+            shellyPlugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+            handled.wait(1)
+            latencies.append((handledAt[-1] - queuedAt) * 1000)
+
+        shellyPlugin.stopConcurrentThread()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        return latencies
+
+    def test_latency(self):
+        before = self.measure(pollingConcurrentThread)
+        after = self.measure(lambda p: p.runConcurrentThread())
+
+        print("")
+        print("Enqueue -> handleMessage latency over {} messages".format(SAMPLES))
+        print("    {:<16} {:>10} {:>10}".format("", "median", "p99"))
+        print("    {:<16} {:>8.2f}ms {:>8.2f}ms".format("polling (100ms)", statistics.median(before), percentile(before, 99)))
+        print("    {:<16} {:>8.2f}ms {:>8.2f}ms".format("message pump", statistics.median(after), percentile(after, 99)))
+
+        self.assertLess(statistics.median(after), statistics.median(before))
@@ -0,0 +1,111 @@
+# coding=utf-8
+"""
+Measures how long the messages of fast devices wait behind a slow device when the messages are
+handled by workers. A batch of messages for a slow device, whose state writes take a long time, is
+followed by a batch of messages for fast devices. The fast devices that are not handled by the same
+worker as the slow device should not wait for the slow device to catch up.
+
+Run with `SHELLY_BENCHMARKS=1 pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import logging
+import time
+
+from Devices.tests.benchmarks import timedBenchmark
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+WORKERS = 4
+FAST_DEVICES = 16
+SLOW_MESSAGES = 10
+SLOW_WRITE = 0.05
+
+
+class TimedDevice(IndigoDevice):
+    """
+    A device that records when its state writes happen, and whose state writes can be made slow.
+    """
+
+    def __init__(self, id, name, deviceTypeId=None):
+        IndigoDevice.__init__(self, id, name, deviceTypeId)
+        self.delay = 0
+        self.handled = []
+
+    def updateStatesOnServer(self, states):
+        time.sleep(self.delay)
+        IndigoDevice.updateStatesOnServer(self, states)
+        self.handled.append(time.perf_counter())
+
+
+@timedBenchmark
+class Test_Message_Workers(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+
+        self.broker = IndigoDevice(id=1000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+
+        self.shellyPlugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {})
+        self.shellyPlugin.messageWorkerCount = WORKERS
+        self.addCleanup(self.shellyPlugin.shutdown)
+
+    def createDevice(self, id):
+        device = TimedDevice(id=id, name="Relay {}".format(id), deviceTypeId="shelly-1")
+        device.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/relay-{}".format(id), 'message-type': "shellies"})
+        device.states['onOffState'] = False
+        indigo.devices[device.id] = device
+        self.shellyPlugin.deviceStartComm(device)
+        return device
+
+    def publish(self, device, payload):
+        topic = "shellies/relay-{}/relay/0".format(device.id)
+        self.shellyPlugin.mqttPlugin.queueMessage(self.broker.id, "shellies", topic, payload)
+        self.shellyPlugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+
+    def shard(self, device):
+        shelly = self.shellyPlugin.shellyDevices[device.id]
+        return hash((shelly.getBrokerId(), shelly.getAddress())) % WORKERS
+
+    def test_fast_devices_do_not_wait_behind_slow_device(self):
+        slow = self.createDevice(1)
+        slow.delay = SLOW_WRITE
+        fast = [self.createDevice(i) for i in range(2, FAST_DEVICES + 2)]
+
+        # The slow device falls behind
+        for m in range(SLOW_MESSAGES):
+            self.publish(slow, "on" if m % 2 == 0 else "off")
+        start = time.perf_counter()
+        self.shellyPlugin.processMessages()
+        returned = time.perf_counter() - start
+
+        # The fast devices report while the slow device is still being handled
+        for device in fast:
+            self.publish(device, "on")
+        published = time.perf_counter()
+        self.shellyPlugin.processMessages()
+        self.shellyPlugin.messageWorkers.join()
+
+        slowShard = self.shard(slow)
+        isolated = [device.handled[0] - published for device in fast if self.shard(device) != slowShard]
+        shared = [device.handled[0] - published for device in fast if self.shard(device) == slowShard]
+        backlog = SLOW_MESSAGES * SLOW_WRITE
+
+        print("")
+        print("Wait of fast devices behind a slow device with a {:.0f}ms backlog and {} workers".format(backlog * 1000, WORKERS))
+        print("    processMessages returned after {:>8.2f}ms".format(returned * 1000))
+        print("    other workers ({:>2} devices) {:>8.2f}ms max wait".format(len(isolated), max(isolated) * 1000))
+        if shared:
+            print("    same worker   ({:>2} devices) {:>8.2f}ms max wait".format(len(shared), max(shared) * 1000))
+
+        # Neither the plugin thread nor the devices handled by the other workers wait for the backlog
+        self.assertLess(returned, backlog / 4)
+        self.assertTrue(isolated)
+        self.assertLess(max(isolated), backlog / 4)
+        self.assertEqual(SLOW_MESSAGES, len(slow.handled))
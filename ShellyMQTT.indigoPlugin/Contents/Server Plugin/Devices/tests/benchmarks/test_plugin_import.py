@@ -0,0 +1,90 @@
+# coding=utf-8
+"""
+Times the import of plugin.py and the start of four devices of different types in a fresh
+interpreter, with every device module imported up front like plugin.py used to do and with the
+device modules imported when a device of their type first starts.
+
+Run with `SHELLY_BENCHMARKS=1 pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import json
+import os
+import subprocess
+import sys
+
+from Devices.tests.benchmarks import timedBenchmark
+
+RUNS = 5
+DEVICE_TYPES = ["shelly-1", "shelly-ht", "shelly-plug-s", "shelly-dimmer-sl"]
+
+SCRIPT = """
+import json
+import sys
+import time
+
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+
+indigo = Indigo()
+sys.modules['indigo'] = indigo
+from Devices.ShellyDeviceTypes import kDeviceTypes
+
+start = time.perf_counter()
+if {eager}:
+    for info in kDeviceTypes.values():
+        __import__(info['module'])
+import plugin
+imported = time.perf_counter() - start
+
+broker = IndigoDevice(id=1000, name="Broker")
+indigo.devices[broker.id] = broker
+shellyPlugin = plugin.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {{}})
+indigo.activePlugin = shellyPlugin
+for id, deviceTypeId in enumerate({deviceTypes}, start=1):
+    device = IndigoDevice(id=id, name=deviceTypeId, deviceTypeId=deviceTypeId)
+    device.pluginProps.update({{'broker-id': str(broker.id), 'address': "shellies/" + deviceTypeId, 'message-type': "shellies"}})
+    indigo.devices[device.id] = device
+    shellyPlugin.deviceStartComm(device)
+started = time.perf_counter() - start
+
+modules = len([info for info in kDeviceTypes.values() if info['module'] in sys.modules])
+print(json.dumps({{'imported': imported, 'started': started, 'modules': modules}}))
+"""
+
+
+@timedBenchmark
+class Test_Plugin_Import(unittest.TestCase):
+
+    def run_plugin(self, eager):
+        """
+        Imports the plugin and starts the devices in a new interpreter.
+
+        :param eager: True to import every device module before the plugin.
+        :return: A dict with the seconds to import, the seconds to import and start, and the number of device modules loaded.
+        """
+
+        pluginDir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        script = SCRIPT.format(eager=eager, deviceTypes=DEVICE_TYPES)
+        results = []
+        for _ in range(RUNS):
+            output = subprocess.check_output([sys.executable, "-c", script], cwd=pluginDir)
+            results.append(json.loads(output.decode().strip().splitlines()[-1]))
+        return {
+            'imported': min(result['imported'] for result in results),
+            'started': min(result['started'] for result in results),
+            'modules': results[0]['modules']
+        }
+
+    def test_import(self):
+        before = self.run_plugin(eager=True)
+        after = self.run_plugin(eager=False)
+
+        print("")
+        print("Plugin import and start of {} device types, best of {} runs".format(len(DEVICE_TYPES), RUNS))
+        print("    {:<16} {:>12} {:>14} {:>14}".format("", "import", "import+start", "device modules"))
+        for name, result in (("eager", before), ("lazy", after)):
+            print("    {:<16} {:>10.1f}ms {:>12.1f}ms {:>14}".format(name, result['imported'] * 1000, result['started'] * 1000, result['modules']))
+
+        # A device module may import the modules of the device types it is built on
+        self.assertLess(after['modules'], before['modules'] / 2)
+        self.assertLess(after['imported'], before['imported'])
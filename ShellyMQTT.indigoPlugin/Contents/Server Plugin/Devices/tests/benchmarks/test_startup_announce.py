@@ -0,0 +1,123 @@
+# coding=utf-8
+"""
+Counts the announce commands published when devices start, and the peak number of announcement
+replies waiting in the MQTT Connector queue, with every device announcing as it starts and with
+the announce scheduler. The devices reply as soon as they are asked, and the plugin processes its
+messages every 50ms of simulated time.
+
+Run with `pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import logging
+import json
+from unittest.mock import patch
+
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+DEVICES = 200
+OTHER_DEVICES = 20  # devices on the broker that are not in Indigo
+RESTARTED = 20
+TICK = 0.05
+SECONDS = 60
+
+
+class Test_Startup_Announce(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+
+        self.broker = IndigoDevice(id=1000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+        self.now = 1000.0
+
+    def measure(self, scheduled, restarted):
+        """
+        Starts the devices and then runs the plugin loop until every reply has been processed.
+
+        :param scheduled: False to publish an announce command for each device as it starts.
+        :param restarted: The number of devices that restart, or None to start the plugin with every device.
+        :return: A tuple of the announce commands published, the replies, and the peak queue depth.
+        """
+
+        shellyPlugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {})
+        indigo.activePlugin = shellyPlugin
+        mqtt = shellyPlugin.mqttPlugin
+        queue = mqtt.messages_in.setdefault((self.broker.id, "shellies"), [])
+        stats = {'publishes': 0, 'replies': 0, 'peak': 0}
+
+        def reply(identifier):
+            payload = json.dumps({'id': identifier, 'mac': "AA", 'ip': "10.0.0.1", 'fw_ver': "1.0", 'new_fw': False})
+            mqtt.queueMessage(self.broker.id, "shellies", "shellies/announce", payload)
+            shellyPlugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+            stats['replies'] += 1
+            stats['peak'] = max(stats['peak'], len(queue))
+
+        def publishAnnounce(brokerId, topic):
+            stats['publishes'] += 1
+            if topic == "shellies/command":
+                for i in range(1, DEVICES + OTHER_DEVICES + 1):
+                    reply("shelly-{}".format(i))
+            else:
+                reply(topic.split("/")[1])
+
+        devices = []
+        for i in range(1, DEVICES + 1):
+            device = IndigoDevice(id=i, name="Relay {}".format(i), deviceTypeId="shelly-1")
+            device.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/shelly-{}".format(i), 'message-type': "shellies", 'devVersCount': 1})
+            indigo.devices[device.id] = device
+            devices.append(device)
+
+        with patch.object(self.plugin_module.time, 'monotonic', side_effect=lambda: self.now), patch.object(shellyPlugin, 'publishAnnounce', side_effect=publishAnnounce):
+            if not scheduled:
+                def request(brokerId, address, now):
+                    publishAnnounce(brokerId, "{}/command".format(address))
+                shellyPlugin.announcer.request = request
+
+            for device in devices:
+                shellyPlugin.deviceStartComm(device)
+            if restarted is not None:
+                # Settle the plugin start, then restart some of the devices
+                for _ in range(int(SECONDS / TICK)):
+                    self.now += TICK
+                    shellyPlugin.runAnnouncer()
+                    shellyPlugin.processMessages()
+                stats.update(publishes=0, replies=0, peak=0)
+                for device in devices[:restarted]:
+                    shellyPlugin.deviceStopComm(device)
+                    shellyPlugin.deviceStartComm(device)
+
+            for _ in range(int(SECONDS / TICK)):
+                self.now += TICK
+                shellyPlugin.runAnnouncer()
+                shellyPlugin.processMessages()
+
+        self.assertEqual(0, len(queue))
+        self.assertEqual(0, len(shellyPlugin.announcer))
+        return stats['publishes'], stats['replies'], stats['peak']
+
+    def test_startup_announce(self):
+        results = [
+            ("start, per device", self.measure(False, None)),
+            ("start, scheduled", self.measure(True, None)),
+            ("{} restart, per device".format(RESTARTED), self.measure(False, RESTARTED)),
+            ("{} restart, scheduled".format(RESTARTED), self.measure(True, RESTARTED))
+        ]
+
+        print("")
+        print("Announce commands for {} devices ({} more on the broker are not in Indigo)".format(DEVICES, OTHER_DEVICES))
+        print("    {:<24} {:>10} {:>10} {:>10}".format("", "Publishes", "Replies", "Peak Queue"))
+        for name, (publishes, replies, peak) in results:
+            print("    {:<24} {:>10} {:>10} {:>10}".format(name, publishes, replies, peak))
+
+        results = dict(results)
+        self.assertEqual(DEVICES, results["start, per device"][0])
+        self.assertEqual(1, results["start, scheduled"][0])
+        self.assertEqual(1, results["{} restart, scheduled".format(RESTARTED)][2])
+        self.assertLess(results["{} restart, scheduled".format(RESTARTED)][2], results["{} restart, per device".format(RESTARTED)][2])
@@ -0,0 +1,107 @@
+# coding=utf-8
+"""
+Times how long Indigo is held up in deviceStartComm when 50 hosts with two add-ons each are started,
+with the add-on starts and address column refreshes done inline and when they are left to the
+startup queue of the plugin thread.
+
+Run with `SHELLY_BENCHMARKS=1 pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import gc
+import logging
+import time
+
+from Devices.tests.benchmarks import timedBenchmark
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+HOSTS = 50
+ADDONS_PER_HOST = 2
+ROUND_TRIP = 0.0005
+
+
+class SlowDevice(IndigoDevice):
+    """
+    A device whose writes to the server block like a call to the Indigo server.
+    """
+
+    def replacePluginPropsOnServer(self, pluginProps):
+        time.sleep(ROUND_TRIP)
+        IndigoDevice.replacePluginPropsOnServer(self, pluginProps)
+
+
+@timedBenchmark
+class Test_Startup_Queue(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+
+        self.broker = IndigoDevice(id=10000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+
+        # Indigo starts the devices in the order they were created, so some add-ons start before their host
+        self.devices = []
+        for i in range(1, HOSTS + 1):
+            host = SlowDevice(id=i, name="Relay {}".format(i), deviceTypeId="shelly-1")
+            host.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/relay-{}".format(i), 'message-type': "shellies", 'devVersCount': self.plugin_module.kCurDevVersion})
+            indigo.devices[host.id] = host
+            for probe in range(1, ADDONS_PER_HOST + 1):
+                addon = SlowDevice(id=i * 100 + probe, name="Probe {}-{}".format(i, probe), deviceTypeId="shelly-addon-ds1820")
+                addon.pluginProps.update({'host-id': str(host.id), 'probe-number': str(probe), 'devVersCount': self.plugin_module.kCurDevVersion})
+                indigo.devices[addon.id] = addon
+                if probe == 1:
+                    self.devices.append(addon)
+                else:
+                    self.devices.append(host)
+                    self.devices.append(addon)
+
+    def start(self, inline):
+        """
+        Starts a new instance of the plugin and all of the devices.
+
+        :param inline: True to do the startup work before deviceStartComm returns.
+        :return: The plugin, the seconds Indigo was held up and the seconds of startup work left.
+        """
+
+        shellyPlugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {})
+        shellyPlugin.pluginPrefs['addon-address-format'] = "host_name"
+        indigo.activePlugin = shellyPlugin
+        # Like timeit, keep a garbage collection of the rest of the test run out of the timings
+        gc.collect()
+        gc.disable()
+        try:
+            held = 0.0
+            for device in self.devices:
+                start = time.perf_counter()
+                shellyPlugin.deviceStartComm(device)
+                if inline:
+                    shellyPlugin.runStartupTasks()
+                held += time.perf_counter() - start
+
+            start = time.perf_counter()
+            shellyPlugin.runStartupTasks()
+            deferred = time.perf_counter() - start
+        finally:
+            gc.enable()
+        self.assertEqual(HOSTS * (ADDONS_PER_HOST + 1), len(shellyPlugin.shellyDevices))
+        return shellyPlugin, held, deferred
+
+    def test_start(self):
+        shellyPlugin, beforeHeld, beforeDeferred = self.start(inline=True)
+        shellyPlugin, afterHeld, afterDeferred = self.start(inline=False)
+
+        print("")
+        print("Start of {} hosts with {} add-ons each and {:.1f}ms server round trips".format(HOSTS, ADDONS_PER_HOST, ROUND_TRIP * 1000))
+        print("    {:<24} {:>12} {:>12}".format("", "held up", "deferred"))
+        print("    {:<24} {:>10.1f}ms {:>10.1f}ms".format("inline", beforeHeld * 1000, beforeDeferred * 1000))
+        print("    {:<24} {:>10.1f}ms {:>10.1f}ms".format("startup queue", afterHeld * 1000, afterDeferred * 1000))
+        for phase in self.plugin_module.kStartupPhases:
+            print("    {:<24} {:>8} {:>10.1f}ms".format(phase, shellyPlugin.startupPhaseCounts[phase], shellyPlugin.startupPhaseTimes[phase] * 1000))
+
+        self.assertLess(afterHeld * 2, beforeHeld)
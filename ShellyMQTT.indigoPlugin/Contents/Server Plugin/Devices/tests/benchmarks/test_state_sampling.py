@@ -0,0 +1,76 @@
+# coding=utf-8
+"""
+Counts the state writes sent to the Indigo server while a 3EM meter reports every second for
+ten minutes, with every reading written and with a 30 second sampling interval.
+
+Run with `pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import logging
+from unittest.mock import patch
+
+from Devices.ShellyDeviceTypes import getDeviceClass
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+SECONDS = 600
+TOPICS = ["power", "reactive_power", "voltage", "current"]
+
+
+class CountingDevice(IndigoDevice):
+    """
+    A device that counts the calls made to write its states.
+    """
+
+    def __init__(self, id, name, deviceTypeId=None):
+        IndigoDevice.__init__(self, id, name, deviceTypeId)
+        self.writes = 0
+
+    def updateStatesOnServer(self, states):
+        self.writes += 1
+        IndigoDevice.updateStatesOnServer(self, states)
+
+
+class Test_State_Sampling(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+
+    def measure(self, interval):
+        """
+        Feeds the meter a reading on each topic every second.
+
+        :param interval: The sampling interval of the power, voltage and current states.
+        :return: The number of state writes.
+        """
+
+        device = CountingDevice(id=1, name="Meter", deviceTypeId="shelly-3em-meter")
+        device.pluginProps.update({'address': "shellies/3em", 'channel': "0"})
+        for prefix in ("power", "voltage", "current"):
+            device.pluginProps["{}-sample-interval".format(prefix)] = str(interval)
+            device.pluginProps["{}-sample-aggregation".format(prefix)] = "mean"
+        shelly = getDeviceClass("shelly-3em-meter")(device)
+
+        for second in range(SECONDS):
+            with patch('Devices.Shelly.time.monotonic', return_value=1000 + second):
+                for i, topic in enumerate(TOPICS):
+                    # The readings wander so that every one of them is a change
+                    shelly.handleMessage("shellies/3em/emeter/0/{}".format(topic), str(100 + i + (second % 7) * 0.37))
+        return device.writes
+
+    def test_state_writes(self):
+        before = self.measure(0)
+        after = self.measure(30)
+
+        print("")
+        print("State writes for a 3EM meter reporting {} topics every second for {} minutes".format(len(TOPICS), SECONDS // 60))
+        print("    {:<20} {:>8}".format("every reading", before))
+        print("    {:<20} {:>8}".format("30s mean", after))
+
+        self.assertLessEqual(after * 10, before)
@@ -0,0 +1,65 @@
+# coding=utf-8
+"""
+Measures the cost of finding the handler for a message in the topic handlers compiled when the
+device starts, for every device type in kDeviceTypes, and checks that every compiled topic is
+handled by a method of the device.
+
+Run with `pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import logging
+import timeit
+
+from Devices.ShellyDeviceTypes import kDeviceTypes
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+ROUNDS = 100
+
+
+class Test_Topic_Dispatch(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+
+        self.broker = IndigoDevice(id=1000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+        self.plugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {})
+        indigo.activePlugin = self.plugin
+
+    def createDevice(self, id, deviceTypeId, **props):
+        device = IndigoDevice(id=id, name=deviceTypeId, deviceTypeId=deviceTypeId)
+        device.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/{}".format(deviceTypeId), 'message-type': "shellies", 'channel': "0"})
+        device.pluginProps.update(props)
+        device.states.update({'onOffState': False, 'brightnessLevel': 0, 'temperature': 0, 'humidity': 0})
+        indigo.devices[device.id] = device
+        self.plugin.deviceStartComm(device)
+        return self.plugin.shellyDevices[device.id]
+
+    def test_dispatch(self):
+        host = self.createDevice(1, "shelly-1")
+        results = []
+        for id, deviceTypeId in enumerate(sorted(kDeviceTypes), start=2):
+            shelly = self.createDevice(id, deviceTypeId, **{'host-id': str(host.device.id), 'probe-number': "0"})
+            topics = list(shelly.compiledTopicHandlers.keys())
+            for topic, handler in shelly.compiledTopicHandlers.items():
+                self.assertIs(shelly, handler.__self__, "{} {}".format(deviceTypeId, topic))
+
+            def compiled():
+                for topic in topics:
+                    shelly.compiledTopicHandlers.get(topic)
+
+            lookup = min(timeit.repeat(compiled, number=ROUNDS, repeat=3)) / (ROUNDS * len(topics)) * 1e6
+            results.append((deviceTypeId, len(topics), lookup))
+
+        print("")
+        print("Handler lookup per message")
+        print("    {:<30} {:>6} {:>12}".format("device type", "topics", "compiled"))
+        for deviceTypeId, count, lookup in results:
+            print("    {:<30} {:>6} {:>10.3f}us".format(deviceTypeId, count, lookup))
@@ -0,0 +1,88 @@
+# coding=utf-8
+"""
+Measures the cost of finding the triggers to fire for an event with 500 ShellyMQTT triggers.
+Scanning every trigger and parsing its device-id, as the devices used to, is compared to a
+lookup in the ShellyTriggers index.
+
+Run with `SHELLY_BENCHMARKS=1 pytest -s Devices/tests/benchmarks` to see the report.
+"""
+import unittest
+import timeit
+
+from Devices.tests.benchmarks import timedBenchmark
+from Devices.ShellyTriggers import ShellyTriggers
+from Devices.tests.mocking.IndigoTrigger import IndigoTrigger
+
+DEVICES = 100
+ROUNDS = 200
+
+# Each device has one trigger of each of these event types, plus 100 "any device" triggers
+DEVICE_EVENTS = ["input-event-s", "input-event-l", "low-battery-device", "overpower-device"]
+ANY_EVENTS = ["low-battery-any", "overpower-any"]
+
+
+def scan(triggers, deviceId):
+    """
+    The trigger lookup for an input event and a low battery event as it was before the index.
+    """
+
+    fired = []
+    for trigger in triggers.values():
+        if trigger.pluginTypeId == "input-event-s" and int(trigger.pluginProps.get('device-id', -1)) == deviceId:
+            fired.append(trigger)
+    for trigger in triggers.values():
+        if trigger.pluginTypeId == "low-battery-any":
+            fired.append(trigger)
+        elif trigger.pluginTypeId == "low-battery-device" and int(trigger.pluginProps['device-id']) == deviceId:
+            fired.append(trigger)
+    return fired
+
+
+def indexed(triggers, deviceId):
+    """
+    The trigger lookup for an input event and a low battery event using the index.
+    """
+
+    fired = triggers.get("input-event-s", deviceId)
+    fired += triggers.get("low-battery-any") + triggers.get("low-battery-device", deviceId)
+    return fired
+
+
+@timedBenchmark
+class Test_Trigger_Lookup(unittest.TestCase):
+
+    def setUp(self):
+        self.triggers = {}
+        self.index = ShellyTriggers()
+
+        for deviceId in range(DEVICES):
+            for event in DEVICE_EVENTS:
+                self.add(IndigoTrigger(event, {'device-id': str(deviceId)}))
+            self.add(IndigoTrigger(ANY_EVENTS[deviceId % len(ANY_EVENTS)], {}))
+
+    def add(self, trigger):
+        self.triggers[trigger.id] = trigger
+        self.index.add(trigger)
+
+    def test_lookup(self):
+        self.assertEqual(500, len(self.index))
+        for deviceId in range(DEVICES):
+            self.assertListEqual(sorted(t.id for t in scan(self.triggers, deviceId)), sorted(t.id for t in indexed(self.index, deviceId)))
+
+        def scanned():
+            for deviceId in range(DEVICES):
+                scan(self.triggers, deviceId)
+
+        def looked_up():
+            for deviceId in range(DEVICES):
+                indexed(self.index, deviceId)
+
+        before = min(timeit.repeat(scanned, number=ROUNDS // 10, repeat=3)) / (ROUNDS // 10 * DEVICES) * 1e6
+        after = min(timeit.repeat(looked_up, number=ROUNDS, repeat=3)) / (ROUNDS * DEVICES) * 1e6
+
+        print("")
+        print("Trigger lookup per event with {} triggers".format(len(self.index)))
+        print("    {:<10} {:>10.2f}us".format("scan", before))
+        print("    {:<10} {:>10.2f}us".format("index", after))
+
+        self.assertLess(after * 10, before)
@@ -1,15 +1,27 @@
 class IndigoDevice:
 
-    def __init__(self, id, name):
+    def __init__(self, id, name, deviceTypeId=None):
         self.id = id
         self.name = name
+        self.deviceTypeId = deviceTypeId
+        self.enabled = True
         self.states = {}
         self.states_meta = {}
         self.pluginProps = {}
         self.image = None
         self.brightness = 0
+        self.server_round_trips = 0
 
     def updateStateOnServer(self, key, value, uiValue=None, decimalPlaces=0):
+        self.server_round_trips += 1
+        self.setState(key, value, uiValue, decimalPlaces)
+
+    def updateStatesOnServer(self, states):
+        self.server_round_trips += 1
+        for state in states:
+            self.setState(state['key'], state['value'], state.get('uiValue', None), state.get('decimalPlaces', 0))
+
+    def setState(self, key, value, uiValue=None, decimalPlaces=0):
         self.states[key] = value
         self.states_meta[key] = {'value': value, 'uiValue': uiValue, 'decimalPlaces': decimalPlaces}
 
@@ -18,10 +30,19 @@ class IndigoDevice:
             self.brightness = value
 
     def replacePluginPropsOnServer(self, pluginProps):
+        self.server_round_trips += 1
         self.pluginProps = pluginProps
 
     def updateStateImageOnServer(self, image):
+        self.server_round_trips += 1
         self.image = image
 
     def refreshFromServer(self):
         pass
+
+    def replaceOnServer(self):
+        pass
+
+    def stateListOrDisplayStateIdChanged(self):
+        pass
+
@@ -1,3 +1,6 @@
+from Devices.ShellyTriggers import ShellyTriggers
+
+
 class IndigoPlugin:
 
     def __init__(self):
@@ -9,5 +12,6 @@ class ShellyPlugin(IndigoPlugin):
     def __init__(self):
         IndigoPlugin.__init__(self)
         self.shellyDevices = {}
-        self.triggers = {}
+        self.triggers = ShellyTriggers()
         self.lowBatteryThreshold = 20
+        self.stateRefreshInterval = 600
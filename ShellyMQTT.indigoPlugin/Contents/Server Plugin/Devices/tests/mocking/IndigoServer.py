@@ -1,5 +1,6 @@
 from Devices.tests.mocking.MQTTConnector import MQTTConnector
 from Devices.tests.mocking.IndigoPlugin import ShellyPlugin
+from Devices.tests.mocking.PluginBase import PluginBase
 
 
 class Indigo:
@@ -13,7 +14,11 @@ class Indigo:
         self.kHvacMode = HVACMode()
         self.activePlugin = ShellyPlugin()
         self.device = IndigoDevice()
+        self.devices = {}
         self.trigger = TriggerExecutor()
+        self.triggers = Triggers()
+        self.PluginBase = PluginBase
+        self.PluginEventTrigger = PluginEventTrigger
 
     def Dict(self):
         return {}
@@ -29,6 +34,9 @@ class IndigoServer:
     def getPlugin(self, identifier):
         return self.plugins.get(identifier, None)
 
+    def subscribeToBroadcast(self, pluginId, broadcastKey, callbackMethod):
+        pass
+
 
 class IndigoDevice:
 
@@ -38,6 +46,10 @@ class IndigoDevice:
     def turnOff(self, deviceId):
         pass
 
+    @staticmethod
+    def changeDeviceTypeId(device, deviceTypeId):
+        return device
+
 
 class StateImages:
 
@@ -124,3 +136,16 @@ class TriggerExecutor:
     def execute(trigger):
         trigger.executed = True
         trigger.execution_count += 1
+
+
+class Triggers:
+
+    def subscribeToChanges(self):
+        pass
+
+    def iter(self, filter=None):
+        return iter([])
+
+
+class PluginEventTrigger:
+    pass
@@ -1,8 +1,13 @@
+import itertools
+
+
 class IndigoTrigger:
 
-    def __init__(self, pluginTypeId, pluginProps={}):
+    ids = itertools.count(1)
+
+    def __init__(self, pluginTypeId, pluginProps={}, id=None):
+        self.id = id if id is not None else next(IndigoTrigger.ids)
         self.pluginTypeId = pluginTypeId
         self.pluginProps = pluginProps
         self.executed = False
         self.execution_count = 0
-
@@ -1,3 +1,4 @@
+
 class MQTTConnector:
 
     def __init__(self):
@@ -5,21 +6,45 @@ class MQTTConnector:
         self.messages_in = {}
         self.messages_out = {}
         self.enabled = True
+        self.action_counts = {}
 
     def isEnabled(self):
         return self.enabled
 
     def executeAction(self, action, deviceId=None, props={}, waitUntilDone=False):
+        self.action_counts[action] = self.action_counts.get(action, 0) + 1
+
         if action == "add_subscription":
             if deviceId not in self.subscriptions.keys():
                 self.subscriptions[deviceId] = []
 
             self.subscriptions[deviceId].append(props)
+        elif action == "del_subscription":
+            self.subscriptions[deviceId] = [s for s in self.subscriptions.get(deviceId, []) if s['topic'] != props['topic']]
         elif action == "publish":
             if deviceId not in self.messages_out.keys():
                 self.messages_out[deviceId] = []
 
             self.messages_out[deviceId].append(props)
+        elif action == "fetchQueuedMessage":
+            messages = self.messages_in.get((deviceId, props.get('message_type')), [])
+            if messages:
+                return messages.pop(0)
+            return None
+
+    def queueMessage(self, deviceId, message_type, topic, payload):
+        key = (deviceId, message_type)
+        if key not in self.messages_in.keys():
+            self.messages_in[key] = []
+
+        self.messages_in[key].append({
+            'topic_parts': topic.split("/"),
+            'payload': payload,
+            'message_type': message_type
+        })
+
+    def getActionCount(self, action):
+        return self.action_counts.get(action, 0)
 
     def getBrokerSubscriptions(self, deviceId):
         return self.subscriptions.get(deviceId, [])
@@ -0,0 +1,45 @@
+import logging
+import time
+
+
+class PluginBase:
+
+    class StopThread(Exception):
+        pass
+
+    def __init__(self, pluginId, pluginDisplayName, pluginVersion, pluginPrefs):
+        self.pluginId = pluginId
+        self.pluginDisplayName = pluginDisplayName
+        self.pluginVersion = pluginVersion
+        self.pluginPrefs = pluginPrefs
+        self.logger = logging.getLogger("Plugin")
+        self.indigo_log_handler = logging.NullHandler()
+        self.stopThread = False
+
+    def sleep(self, seconds):
+        if self.stopThread:
+            raise self.StopThread()
+        time.sleep(seconds)
+        if self.stopThread:
+            raise self.StopThread()
+
+    def stopConcurrentThread(self):
+        self.stopThread = True
+
+    def didDeviceCommPropertyChange(self, origDev, newDev):
+        return dict(origDev.pluginProps) != dict(newDev.pluginProps)
+
+    def deviceUpdated(self, origDev, newDev):
+        # Like Indigo, restart a device whose communication properties changed
+        if self.didDeviceCommPropertyChange(origDev, newDev):
+            self.deviceStopComm(origDev)
+            self.deviceStartComm(newDev)
+
+    def triggerCreated(self, trigger):
+        pass
+
+    def triggerDeleted(self, trigger):
+        pass
+
+    def triggerUpdated(self, origTrigger, newTrigger):
+        pass
@@ -0,0 +1,25 @@
+import importlib
+import sys
+from unittest.mock import patch
+
+
+def loadPlugin(testCase, indigo):
+    """
+    Imports plugin.py and points it, and every device module, at the given mock indigo for the
+    duration of the test. The device tests each install their own mock when they are collected,
+    so plugin.py must not be imported until the tests run.
+
+    :param testCase: The running test case.
+    :param indigo: The mock indigo to use.
+    :return: The plugin module.
+    """
+
+    sys.modules['indigo'] = indigo
+    module = importlib.import_module('plugin')
+    for name, loaded in list(sys.modules.items()):
+        if name == 'plugin' or (name.startswith('Devices.') and not name.startswith('Devices.tests')):
+            if hasattr(loaded, 'indigo'):
+                patcher = patch.object(loaded, 'indigo', indigo)
+                patcher.start()
+                testCase.addCleanup(patcher.stop)
+    return module
@@ -2,6 +2,8 @@
 import unittest
 import sys
 import logging
+import time
+import threading
 import pytest
 from unittest.mock import patch
 
@@ -19,6 +21,7 @@ class Test_Shelly(unittest.TestCase):
     def setUp(self):
         indigo.__init__()
         self.device = IndigoDevice(id=123456, name="New Device")
+        indigo.devices[self.device.id] = self.device
         self.shelly = Devices.Shelly.Shelly(self.device)
         logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
 
@@ -71,6 +74,50 @@ class Test_Shelly(unittest.TestCase):
         self.device.pluginProps['address'] = "some/address"
         self.assertEqual("some/address", self.shelly.getAddress())
 
+    def test_getAddress_removes_trailing_slash(self):
+        self.device.pluginProps['address'] = "some/address/"
+        self.assertEqual("some/address", self.shelly.getAddress())
+
+    def test_getAddress_empty(self):
+        self.device.pluginProps['address'] = ""
+        self.assertIsNone(self.shelly.getAddress())
+
+    def test_getProps_cached(self):
+        props = self.shelly.getProps()
+        self.assertIs(props, self.shelly.getProps())
+
+    def test_refresh_device_rebuilds_address(self):
+        self.assertEqual("shellies/test-shelly", self.shelly.getAddress())
+
+        self.device.pluginProps['address'] = "shellies/edited"
+        self.assertEqual("shellies/test-shelly", self.shelly.getAddress())
+
+        self.shelly.refresh_device()
+        self.assertEqual("shellies/edited", self.shelly.getAddress())
+
+    def test_refresh_device_rebuilds_channel(self):
+        self.assertEqual(0, self.shelly.getChannel())
+
+        self.device.pluginProps['channel'] = "2"
+        self.shelly.refresh_device()
+        self.assertEqual("2", self.shelly.getChannel())
+
+    def test_didCommPropertyChange_does_not_refresh_device(self):
+        indigo.activePlugin.shellyDevices = {self.device.id: self.shelly}
+        origDev = IndigoDevice(id=self.device.id, name="New Device")
+        origDev.pluginProps.update(self.device.pluginProps)
+        self.device.pluginProps['muted'] = True
+
+        with patch.object(self.shelly, 'refresh_device') as refresh_device:
+            self.assertFalse(Devices.Shelly.Shelly.didCommPropertyChange(origDev, self.device))
+        refresh_device.assert_not_called()
+
+    def test_didCommPropertyChange_address_changed(self):
+        origDev = IndigoDevice(id=self.device.id, name="New Device")
+        origDev.pluginProps.update(self.device.pluginProps)
+        self.device.pluginProps['address'] = "shellies/other-shelly"
+        self.assertTrue(Devices.Shelly.Shelly.didCommPropertyChange(origDev, self.device))
+
     def test_updateAvailable_has_update(self):
         self.device.states['has-firmware-update'] = True
         self.assertTrue(self.shelly.updateAvailable())
@@ -134,12 +181,15 @@ class Test_Shelly(unittest.TestCase):
 
         self.device.pluginProps['announce-message-type'] = "some-other-type"
         self.device.pluginProps['announce-message-type-same-as-message-type'] = True
+        self.shelly.refresh_device()
         self.assertListEqual(["some-type"], self.shelly.getMessageTypes())
 
         self.device.pluginProps['announce-message-type-same-as-message-type'] = False
+        self.shelly.refresh_device()
         self.assertListEqual(["some-type", "some-other-type"], self.shelly.getMessageTypes())
 
         del self.device.pluginProps['message-type']
+        self.shelly.refresh_device()
         self.assertListEqual(["some-other-type"], self.shelly.getMessageTypes())
 
     @patch('Devices.Shelly.Shelly.publish')
@@ -355,6 +405,15 @@ class Test_Shelly(unittest.TestCase):
         self.shelly.turnOff()
         self.assertFalse(self.device.states['onOffState'])
 
+    def test_turnOn_in_transaction_updates_image_after_states(self):
+        """Test that turning on in a transaction sends the state image once its states are sent."""
+        self.device.states['onOffState'] = False
+        with self.shelly.stateTransaction():
+            self.shelly.turnOn()
+            self.assertEqual(0, self.device.server_round_trips)
+        self.assertEqual(2, self.device.server_round_trips)
+        self.assertEqual(indigo.kStateImageSel.PowerOn, self.device.image)
+
     def test_isOn(self):
         """Test determining if the device is on."""
         self.device.states['onOffState'] = True
@@ -400,6 +459,7 @@ class Test_Shelly(unittest.TestCase):
         """Test getting whether the device is set to be muted."""
         self.assertFalse(self.shelly.isMuted())
         self.device.pluginProps['muted'] = True
+        self.shelly.refresh_device()
         self.assertTrue(self.shelly.isMuted())
 
     def test_getMutedLoggingMethods(self):
@@ -410,6 +470,7 @@ class Test_Shelly(unittest.TestCase):
         """Test getting the last input event id"""
         self.assertEqual(-1, self.shelly.getLastInputEventId())
         self.device.pluginProps['last-input-event-id'] = "5"
+        self.shelly.refresh_device()
         self.assertEqual(5, self.shelly.getLastInputEventId())
 
     def test_get_last_input_event_id_default_to_negative_one(self):
@@ -418,6 +479,37 @@ class Test_Shelly(unittest.TestCase):
         self.assertFalse('last-input-event-id' in self.device.pluginProps.keys())
         self.assertEqual(-1, self.shelly.getLastInputEventId())
 
+    def test_set_last_input_event_id_does_not_write_props(self):
+        """Test that setting the last input event id keeps it in memory"""
+        self.shelly.setLastInputEventId(4)
+
+        self.assertEqual(4, self.shelly.getLastInputEventId())
+        self.assertEqual(-1, self.device.pluginProps['last-input-event-id'])
+        self.assertEqual(0, self.device.server_round_trips)
+
+    def test_save_last_input_event_id(self):
+        """Test that saving the last input event id writes it to the props once"""
+        self.shelly.setLastInputEventId(4)
+        self.shelly.saveLastInputEventId()
+        self.shelly.saveLastInputEventId()
+
+        self.assertEqual(4, self.device.pluginProps['last-input-event-id'])
+        self.assertEqual(1, self.device.server_round_trips)
+
+    def test_save_last_input_event_id_unchanged(self):
+        """Test that an unchanged last input event id is not written"""
+        self.shelly.setLastInputEventId(-1)
+        self.shelly.saveLastInputEventId()
+
+        self.assertEqual(0, self.device.server_round_trips)
+
+    def test_refresh_device_keeps_unsaved_last_input_event_id(self):
+        """Test that refreshing the device does not lose a last input event id that has not been saved"""
+        self.shelly.setLastInputEventId(4)
+        self.shelly.refresh_device()
+
+        self.assertEqual(4, self.shelly.getLastInputEventId())
+
     def test_process_input_event_invalid_event_type_returns_None(self):
         """Test processing an event message with an invalid event type"""
         message = '{"event": null, "event_cnt": 0}'
@@ -447,15 +539,28 @@ class Test_Shelly(unittest.TestCase):
         self.shelly.processInputEvent(message)
         self.assertEqual(1, self.shelly.getLastInputEventId())
 
+    def test_process_input_event_duplicate_event_after_restart_not_processed(self):
+        """Test that an event processed before the device was restarted is not reprocessed"""
+        trigger = IndigoTrigger("input-event-s", {'device-id': self.device.id})
+        indigo.activePlugin.triggers.add(trigger)
+
+        self.shelly.processInputEvent('{"event": "S", "event_cnt": 1}')
+        self.shelly.saveLastInputEventId()
+        trigger.executed = False
+
+        self.shelly = Devices.Shelly.Shelly(self.device)
+        self.shelly.processInputEvent('{"event": "S", "event_cnt": 1}')
+        self.assertFalse(trigger.executed)
+
     def test_process_input_event_trigger_executed(self):
         """Test processing an event message and a trigger was executed"""
         trigger_S = IndigoTrigger("input-event-s", {'device-id': self.device.id})
         trigger_S_other = IndigoTrigger("input-event-s", {'device-id': self.device.id + 1})
         trigger_L = IndigoTrigger("input-event-l", {'device-id': self.device.id})
 
-        indigo.activePlugin.triggers['1'] = trigger_S
-        indigo.activePlugin.triggers['2'] = trigger_L
-        indigo.activePlugin.triggers['3'] = trigger_S_other
+        indigo.activePlugin.triggers.add(trigger_S)
+        indigo.activePlugin.triggers.add(trigger_L)
+        indigo.activePlugin.triggers.add(trigger_S_other)
 
         message = '{"event": "S", "event_cnt": 1}'
 
@@ -467,7 +572,7 @@ class Test_Shelly(unittest.TestCase):
     def test_process_temperature_status_normal_event_trigger_executed(self):
         """Test that a normal temperature status fires executes a trigger"""
         trigger = IndigoTrigger("abnormal-temperature-status-any", {})
-        indigo.activePlugin.triggers['1'] = trigger
+        indigo.activePlugin.triggers.add(trigger)
 
         self.shelly.processTemperatureStatus("Normal")
         self.assertFalse(trigger.executed)
@@ -475,7 +580,7 @@ class Test_Shelly(unittest.TestCase):
     def test_process_temperature_status_abnormal_event_trigger_executed(self):
         """Test that an abnormal temperature status fires executes a trigger"""
         trigger = IndigoTrigger("abnormal-temperature-status-any", {})
-        indigo.activePlugin.triggers['1'] = trigger
+        indigo.activePlugin.triggers.add(trigger)
 
         self.shelly.processTemperatureStatus("High")
         self.assertTrue(trigger.executed)
@@ -572,6 +677,188 @@ class Test_Shelly(unittest.TestCase):
         ]
         self.assertListEqual(expected, self.shelly.humidity_sensors)
 
+    def test_compileTopicHandlers_formats_topics(self):
+        """Test that the topic handlers are formatted with the address and channel."""
+        self.device.pluginProps['channel'] = 1
+        handlers = self.shelly.compileTopicHandlers()
+
+        self.assertEqual(self.shelly.handleOnline, handlers['shellies/test-shelly/online'])
+        self.assertEqual(self.shelly.processInputEvent, handlers['shellies/test-shelly/input_event/1'])
+        self.assertEqual(self.shelly.parseAnnouncement, handlers['shellies/announce'])
+
+    def test_compileTopicHandlers_merges_subclass_handlers(self):
+        """Test that subclasses can add, replace, and remove topic handlers."""
+        class Subclass(Devices.Shelly.Shelly):
+            topicHandlers = {
+                "{address}/extra": "handleExtra",
+                "{address}/online": "handleExtra",
+                "{address}/temperature_status": None
+            }
+
+            def handleExtra(self, payload):
+                pass
+
+        shelly = Subclass(self.device)
+        handlers = shelly.compileTopicHandlers()
+
+        self.assertEqual(shelly.handleExtra, handlers['shellies/test-shelly/extra'])
+        self.assertEqual(shelly.handleExtra, handlers['shellies/test-shelly/online'])
+        self.assertNotIn('shellies/test-shelly/temperature_status', handlers)
+        self.assertEqual(shelly.processInputEvent, handlers['shellies/test-shelly/input_event/0'])
+
+    def test_handleMessage_compiles_topic_handlers_once(self):
+        """Test that the topic handlers are only compiled on the first message."""
+        with patch.object(self.shelly, 'compileTopicHandlers', wraps=self.shelly.compileTopicHandlers) as compileTopicHandlers:
+            self.shelly.handleMessage('shellies/test-shelly/online', "true")
+            self.shelly.handleMessage('shellies/test-shelly/online', "false")
+
+        compileTopicHandlers.assert_called_once()
+        self.assertFalse(self.shelly.device.states['online'])
+
+    def test_handleMessage_ignores_unknown_topics(self):
+        """Test that messages on topics without a handler are ignored."""
+        self.shelly.handleMessage('shellies/test-shelly/unknown', "true")
+        self.assertNotIn('online', self.shelly.device.states)
+
+    def test_updateStateOnServer_outside_transaction_is_sent_immediately(self):
+        """Test that a state update outside of a transaction is sent to the server right away."""
+        self.shelly.updateStateOnServer('power', 12.5, uiValue="12.5 W", decimalPlaces=1)
+
+        self.assertEqual(1, self.device.server_round_trips)
+        self.assertEqual(12.5, self.device.states['power'])
+        self.assertEqual("12.5 W", self.device.states_meta['power']['uiValue'])
+        self.assertEqual(1, self.device.states_meta['power']['decimalPlaces'])
+
+    def test_stateTransaction_sends_updates_together(self):
+        """Test that the updates in a transaction are sent in one batch when it ends."""
+        with self.shelly.stateTransaction():
+            self.shelly.updateStateOnServer('power', 12.5)
+            self.shelly.updateStateOnServer('voltage', 120)
+            self.assertNotIn('power', self.device.states)
+
+        self.assertEqual(1, self.device.server_round_trips)
+        self.assertEqual(12.5, self.device.states['power'])
+        self.assertEqual(120, self.device.states['voltage'])
+
+    def test_stateTransaction_keeps_last_update_of_a_state(self):
+        """Test that only the last value written to a state in a transaction is sent."""
+        with self.shelly.stateTransaction():
+            self.shelly.updateStateOnServer('power', 12.5)
+            self.shelly.updateStateOnServer('power', 13.5)
+
+        self.assertEqual(1, self.device.server_round_trips)
+        self.assertEqual(13.5, self.device.states['power'])
+
+    def test_stateTransaction_nested(self):
+        """Test that nested transactions are sent when the outermost one ends."""
+        with self.shelly.stateTransaction():
+            with self.shelly.stateTransaction():
+                self.shelly.updateStateOnServer('power', 12.5)
+            self.assertEqual(0, self.device.server_round_trips)
+            self.shelly.updateStateOnServer('voltage', 120)
+
+        self.assertEqual(1, self.device.server_round_trips)
+        self.assertEqual(12.5, self.device.states['power'])
+
+    def test_stateTransaction_sends_updates_after_error(self):
+        """Test that the updates made before an error are still sent."""
+        with self.assertRaises(ValueError):
+            with self.shelly.stateTransaction():
+                self.shelly.updateStateOnServer('power', 12.5)
+                raise ValueError()
+
+        self.assertEqual(12.5, self.device.states['power'])
+        self.assertEqual({}, self.shelly.pendingStates)
+
+    def test_stateTransaction_blocks_updates_from_other_threads(self):
+        """Test that an update from another thread waits for the transaction and is not lost."""
+        thread = threading.Thread(target=self.shelly.updateStateOnServer, args=('voltage', 120))
+        with self.shelly.stateTransaction():
+            self.shelly.updateStateOnServer('power', 12.5)
+            thread.start()
+            thread.join(0.05)
+            self.assertTrue(thread.is_alive())
+            self.assertNotIn('voltage', self.shelly.pendingStates)
+        thread.join()
+
+        self.assertEqual(2, self.device.server_round_trips)
+        self.assertEqual(12.5, self.device.states['power'])
+        self.assertEqual(120, self.device.states['voltage'])
+        self.assertEqual({}, self.shelly.pendingStates)
+
+    def test_getState_includes_pending_updates(self):
+        """Test that a state read inside of a transaction sees the pending updates."""
+        self.device.states['power'] = 10
+        with self.shelly.stateTransaction():
+            self.assertEqual(10, self.shelly.getState('power'))
+            self.shelly.updateStateOnServer('power', 12.5)
+            self.assertEqual(12.5, self.shelly.getState('power'))
+        self.assertIsNone(self.shelly.getState('voltage'))
+        self.assertEqual(0, self.shelly.getState('voltage', 0))
+
+    def test_handleMessage_sends_states_in_one_round_trip(self):
+        """Test that the states updated by a message are sent to the server together."""
+        announcement = '{"id": "test-shelly", "mac": "aa:bb:cc:ee", "ip": "192.168.1.101", "fw_ver": "0.0.0", "new_fw": false}'
+        self.shelly.handleMessage("shellies/announce", announcement)
+
+        # One for the states and one for the version in pluginProps
+        self.assertEqual(2, self.device.server_round_trips)
+        self.assertEqual("192.168.1.101", self.device.states['ip-address'])
+        self.assertEqual("0.0.0", self.device.states['firmware-version'])
+
+    def test_updateStateOnServer_skips_unchanged_state(self):
+        """Test that writing the last written value again is skipped."""
+        self.shelly.updateStateOnServer('power', 12.5, uiValue="12.5 W")
+        self.shelly.updateStateOnServer('power', 12.5, uiValue="12.5 W")
+
+        self.assertEqual(1, self.device.server_round_trips)
+        self.assertEqual(1, self.shelly.writtenStateCount)
+        self.assertEqual(1, self.shelly.suppressedStateCount)
+
+    def test_updateStateOnServer_writes_changed_ui_value(self):
+        """Test that a state is written when only its display value changes."""
+        self.shelly.updateStateOnServer('temperature', 20.0, uiValue="20.0 °C")
+        self.shelly.updateStateOnServer('temperature', 20.0, uiValue="68.0 °F")
+
+        self.assertEqual(2, self.device.server_round_trips)
+        self.assertEqual("68.0 °F", self.device.states_meta['temperature']['uiValue'])
+
+    def test_updateStateOnServer_writes_state_changed_elsewhere(self):
+        """Test that a state is written if it no longer has the last written value."""
+        self.shelly.updateStateOnServer('onOffState', True)
+        self.device.states['onOffState'] = False
+        self.shelly.updateStateOnServer('onOffState', True)
+
+        self.assertTrue(self.device.states['onOffState'])
+        self.assertEqual(0, self.shelly.suppressedStateCount)
+
+    def test_updateStateOnServer_writes_unchanged_state_after_refresh_interval(self):
+        """Test that an unchanged state is written again once the refresh interval has passed."""
+        self.shelly.updateStateOnServer('online', True)
+        with patch('Devices.Shelly.time.monotonic', return_value=time.monotonic() + 601):
+            self.shelly.updateStateOnServer('online', True)
+
+        self.assertEqual(2, self.device.server_round_trips)
+        self.assertEqual(0, self.shelly.suppressedStateCount)
+
+    def test_updateStateOnServer_refresh_interval_disabled(self):
+        """Test that every update is written when the refresh interval is 0."""
+        indigo.activePlugin.stateRefreshInterval = 0
+        self.shelly.updateStateOnServer('online', True)
+        self.shelly.updateStateOnServer('online', True)
+
+        self.assertEqual(2, self.device.server_round_trips)
+
+    def test_stateTransaction_skips_unchanged_state(self):
+        """Test that unchanged states are left out of the batch sent for a transaction."""
+        self.shelly.updateStateOnServer('online', True)
+        with self.shelly.stateTransaction():
+            self.shelly.updateStateOnServer('online', True)
+            self.shelly.updateStateOnServer('power', 12.5)
+
+        self.assertEqual(2, self.device.server_round_trips)
+        self.assertEqual(1, self.shelly.suppressedStateCount)
+
     def test_updateBatteryLevel(self):
         """Test updating the battery level sets the state."""
         self.shelly.updateBatteryLevel(52)
@@ -584,8 +871,8 @@ class Test_Shelly(unittest.TestCase):
         trigger_any = IndigoTrigger("low-battery-any", {})
         trigger_device = IndigoTrigger("low-battery-device", {'device-id': self.device.id})
 
-        indigo.activePlugin.triggers['1'] = trigger_any
-        indigo.activePlugin.triggers['2'] = trigger_device
+        indigo.activePlugin.triggers.add(trigger_any)
+        indigo.activePlugin.triggers.add(trigger_device)
 
         self.shelly.updateBatteryLevel(10)
 
@@ -598,8 +885,8 @@ class Test_Shelly(unittest.TestCase):
         trigger_device = IndigoTrigger("low-battery-device", {'device-id': self.device.id})
 
         indigo.activePlugin.lowBatteryThreshold = "20"
-        indigo.activePlugin.triggers['1'] = trigger_any
-        indigo.activePlugin.triggers['2'] = trigger_device
+        indigo.activePlugin.triggers.add(trigger_any)
+        indigo.activePlugin.triggers.add(trigger_device)
 
         self.shelly.updateBatteryLevel(10)
 
@@ -612,8 +899,8 @@ class Test_Shelly(unittest.TestCase):
         trigger_any = IndigoTrigger("low-battery-any", {})
         trigger_device = IndigoTrigger("low-battery-device", {'device-id': self.device.id})
 
-        indigo.activePlugin.triggers['1'] = trigger_any
-        indigo.activePlugin.triggers['2'] = trigger_device
+        indigo.activePlugin.triggers.add(trigger_any)
+        indigo.activePlugin.triggers.add(trigger_device)
 
         self.shelly.updateBatteryLevel(10)
         self.shelly.updateBatteryLevel(10)
@@ -0,0 +1,65 @@
+# coding=utf-8
+import unittest
+
+from Devices.ShellyAnnouncer import ShellyAnnouncer
+
+
+class Test_ShellyAnnouncer(unittest.TestCase):
+
+    def setUp(self):
+        self.announcer = ShellyAnnouncer(2, 0.5, 1)
+        self.running = {1: {"a", "b", "c", "d"}, 2: {"e", "f"}}
+
+    def run_at(self, now):
+        return self.announcer.run(now, lambda brokerId: self.running.get(brokerId, set()))
+
+    def test_requests_wait_to_settle(self):
+        self.announcer.request(1, "a", 100)
+        self.announcer.request(1, "b", 101)
+        self.assertEqual(103, self.announcer.getNextDeadline())
+        self.assertTupleEqual(([], []), self.run_at(102.9))
+        self.assertEqual(2, len(self.announcer))
+
+    def test_most_devices_starting_asks_broker(self):
+        for address in ("a", "b", "c"):
+            self.announcer.request(1, address, 100)
+        self.assertTupleEqual(([1], []), self.run_at(102))
+        self.assertEqual(0, len(self.announcer))
+        self.assertIsNone(self.announcer.getNextDeadline())
+
+    def test_few_devices_starting_are_asked_one_at_a_time(self):
+        self.announcer.request(1, "a", 100)
+        self.announcer.request(2, "e", 100)
+        self.assertTupleEqual(([], [(1, "a")]), self.run_at(102))
+        self.assertEqual(1, len(self.announcer))
+
+        # The next device waits for a jittered interval
+        self.assertTupleEqual(([], []), self.run_at(102.4))
+        self.assertTrue(102.5 <= self.announcer.getNextDeadline() <= 103.5)
+        self.assertTupleEqual(([], [(2, "e")]), self.run_at(103.5))
+
+    def test_single_device_is_not_broadcast(self):
+        self.running[3] = {"g"}
+        self.announcer.request(3, "g", 100)
+        self.assertTupleEqual(([], [(3, "g")]), self.run_at(102))
+
+    def test_shared_address_is_asked_once(self):
+        self.announcer.request(1, "a", 100)
+        self.announcer.request(1, "a", 100)
+        self.assertTupleEqual(([], [(1, "a")]), self.run_at(102))
+        self.assertTupleEqual(([], []), self.run_at(110))
+
+    def test_device_can_be_queued_again_once_asked(self):
+        self.announcer.request(1, "a", 100)
+        self.assertTupleEqual(([], [(1, "a")]), self.run_at(102))
+        self.announcer.request(1, "a", 110)
+        self.assertTupleEqual(([], [(1, "a")]), self.run_at(112))
+
+    def test_broadcast_clears_queued_devices(self):
+        self.announcer.request(1, "a", 100)
+        self.run_at(102)
+        self.announcer.request(1, "b", 102)
+        self.announcer.request(1, "c", 102)
+        self.announcer.request(1, "d", 102)
+        self.assertTupleEqual(([1], []), self.run_at(104))
+        self.assertEqual(0, len(self.announcer))
@@ -0,0 +1,34 @@
+# coding=utf-8
+import unittest
+
+from Devices.ShellyBursts import ShellyBursts
+
+
+class Test_ShellyBursts(unittest.TestCase):
+
+    def setUp(self):
+        self.bursts = ShellyBursts()
+
+    def test_empty(self):
+        self.assertIsNone(self.bursts.getNextDeadline())
+        self.assertListEqual([], self.bursts.pop("a"))
+        self.assertListEqual([], self.bursts.popSettled(100))
+        self.assertEqual(0, len(self.bursts))
+
+    def test_burst_settles_after_first_message(self):
+        self.bursts.add("a", 0.5, 100, "shelly", "a/lux", "1")
+        self.bursts.add("a", 0.5, 100.3, "shelly", "a/tilt", "2")
+        self.assertEqual(100.5, self.bursts.getNextDeadline())
+
+        self.assertListEqual([], self.bursts.popSettled(100.4))
+        self.assertListEqual([[("shelly", "a/lux", "1"), ("shelly", "a/tilt", "2")]], self.bursts.popSettled(100.5))
+        self.assertEqual(0, len(self.bursts))
+
+    def test_bursts_are_kept_per_key(self):
+        self.bursts.add("a", 0.5, 100, "first", "a/lux", "1")
+        self.bursts.add("b", 0.5, 100.2, "second", "b/lux", "2")
+        self.assertEqual(2, len(self.bursts))
+
+        self.assertListEqual([[("first", "a/lux", "1")]], self.bursts.popSettled(100.6))
+        self.assertListEqual([("second", "b/lux", "2")], self.bursts.pop("b"))
+        self.assertIsNone(self.bursts.getNextDeadline())
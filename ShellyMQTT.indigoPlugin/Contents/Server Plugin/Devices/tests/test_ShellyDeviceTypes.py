@@ -0,0 +1,35 @@
+# coding=utf-8
+import unittest
+import sys
+
+from Devices.tests.mocking.IndigoServer import Indigo
+
+indigo = Indigo()
+sys.modules['indigo'] = indigo
+from Devices.Shelly import Shelly
+from Devices.ShellyDeviceTypes import kDeviceTypes, getDeviceClass, getRelatedDeviceTypes
+
+
+class Test_ShellyDeviceTypes(unittest.TestCase):
+
+    def test_getDeviceClass(self):
+        for typeId, info in kDeviceTypes.items():
+            deviceClass = getDeviceClass(typeId)
+            self.assertTrue(issubclass(deviceClass, Shelly), typeId)
+            self.assertEqual(info['module'], deviceClass.__module__)
+
+    def test_getDeviceClass_returns_the_same_class(self):
+        self.assertIs(getDeviceClass("shelly-1"), getDeviceClass("shelly-1"))
+
+    def test_getDeviceClass_unknown_type(self):
+        self.assertIsNone(getDeviceClass("shelly-unknown"))
+
+    def test_getRelatedDeviceTypes(self):
+        self.assertListEqual(["shelly-em-meter", "shelly-3em-meter"], getRelatedDeviceTypes("shelly-em-relay"))
+        self.assertListEqual([], getRelatedDeviceTypes("shelly-1"))
+        self.assertListEqual([], getRelatedDeviceTypes("shelly-unknown"))
+
+    def test_relations_are_known_types(self):
+        for typeId, info in kDeviceTypes.items():
+            for related in info['relations']:
+                self.assertIn(related, kDeviceTypes, typeId)
@@ -0,0 +1,57 @@
+# coding=utf-8
+import unittest
+import sys
+import logging
+from unittest.mock import patch
+
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+
+indigo = Indigo()
+sys.modules['indigo'] = indigo
+import Devices.Shelly
+
+
+class Test_ShellyLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.device = IndigoDevice(id=123456, name="New Device")
+        self.shelly = Devices.Shelly.Shelly(self.device)
+        self.logger = self.shelly.logger
+
+    def test_logs_when_not_muted(self):
+        with self.assertLogs('Plugin.ShellyMQTT', level='DEBUG') as logs:
+            self.logger.debug(u"debug %s", "message")
+            self.logger.info(u"info")
+        self.assertListEqual(["DEBUG:Plugin.ShellyMQTT:debug message", "INFO:Plugin.ShellyMQTT:info"], logs.output)
+
+    def test_muted_device_only_logs_errors(self):
+        self.device.pluginProps['muted'] = True
+        with self.assertLogs('Plugin.ShellyMQTT', level='DEBUG') as logs:
+            self.logger.debug(u"debug")
+            self.logger.info(u"info")
+            self.logger.error(u"error")
+        self.assertListEqual(["ERROR:Plugin.ShellyMQTT:error"], logs.output)
+
+    def test_muting_is_resolved_once(self):
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+        with patch.object(self.shelly, 'isMuted', return_value=False) as isMuted:
+            for _ in range(10):
+                self.logger.info(u"info")
+        self.assertEqual(1, isMuted.call_count)
+
+    def test_refresh_resolves_muting_again(self):
+        self.logger.info(u"info")
+        self.device.pluginProps['muted'] = True
+        self.shelly.props = None
+        self.logger.refresh()
+        with self.assertNoLogs('Plugin.ShellyMQTT', level='DEBUG'):
+            self.logger.info(u"info")
+
+    def test_refresh_after_method_resolved_twice(self):
+        # Two threads can miss the same method before either has cached it
+        self.logger.__getattr__('debug')
+        self.logger.__getattr__('debug')
+        self.logger.refresh()
+        self.assertNotIn('debug', self.logger.__dict__)
+        self.assertEqual(set(), self.logger.resolved)
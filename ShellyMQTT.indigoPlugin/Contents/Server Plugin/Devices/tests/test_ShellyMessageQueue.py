@@ -0,0 +1,45 @@
+# coding=utf-8
+import unittest
+
+from Devices.ShellyMessageQueue import ShellyMessageQueue
+
+
+class Test_ShellyMessageQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = ShellyMessageQueue(3)
+
+    def drain(self):
+        messages = []
+        while True:
+            message = self.queue.get()
+            if message is None:
+                return messages
+            messages.append(message)
+
+    def test_empty_queue(self):
+        self.assertIsNone(self.queue.get())
+        self.assertEqual(0, len(self.queue))
+
+    def test_control_messages_are_dispatched_first(self):
+        self.queue.putTelemetry("power", "power 1")
+        self.queue.putControl("relay on")
+        self.queue.putControl("relay off")
+        self.assertEqual(3, len(self.queue))
+
+        self.assertListEqual(["relay on", "relay off", "power 1"], self.drain())
+
+    def test_telemetry_is_coalesced_in_order(self):
+        self.assertFalse(self.queue.putTelemetry("power", "power 1"))
+        self.assertFalse(self.queue.putTelemetry("voltage", "voltage 1"))
+        self.assertTrue(self.queue.putTelemetry("power", "power 2"))
+
+        self.assertListEqual(["power 2", "voltage 1"], self.drain())
+
+    def test_telemetry_is_not_starved(self):
+        self.queue.putTelemetry("power", "power 1")
+        self.queue.putTelemetry("voltage", "voltage 1")
+        for i in range(7):
+            self.queue.putControl(i)
+
+        self.assertListEqual([0, 1, 2, "power 1", 3, 4, 5, "voltage 1", 6], self.drain())
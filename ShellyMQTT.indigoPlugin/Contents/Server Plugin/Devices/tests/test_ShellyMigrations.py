@@ -0,0 +1,54 @@
+# coding=utf-8
+import unittest
+import sys
+from unittest.mock import patch
+
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+
+indigo = Indigo()
+sys.modules['indigo'] = indigo
+from Devices import ShellyMigrations
+from Devices.ShellyMigrations import getDeviceVersion, migrateDevice, kCurDevVersion
+
+
+class Test_ShellyMigrations(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        patcher = patch.object(ShellyMigrations, 'indigo', indigo)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.device = IndigoDevice(id=123456, name="New Device", deviceTypeId="shelly-1")
+
+    def test_getDeviceVersion(self):
+        self.assertEqual(0, getDeviceVersion(self.device))
+        self.device.pluginProps['devVersCount'] = "3"
+        self.assertEqual(3, getDeviceVersion(self.device))
+        self.device.pluginProps['devVersCount'] = "unknown"
+        self.assertEqual(0, getDeviceVersion(self.device))
+
+    def test_migrateDevice_applies_missing_steps(self):
+        applied = []
+        steps = [(1, lambda d: applied.append(1) or d), (2, lambda d: applied.append(2) or d), (3, lambda d: applied.append(3) or d)]
+        self.device.pluginProps['devVersCount'] = 1
+        with patch.object(ShellyMigrations, 'kDeviceMigrations', steps), patch.object(ShellyMigrations, 'kCurDevVersion', 3):
+            device, versions = migrateDevice(self.device)
+
+        self.assertListEqual([2, 3], applied)
+        self.assertListEqual([2, 3], versions)
+        self.assertEqual(3, device.pluginProps['devVersCount'])
+
+    def test_migrateDevice_reloads_device_type(self):
+        with patch.object(indigo.device, 'changeDeviceTypeId', return_value=self.device) as changeDeviceTypeId:
+            device, versions = migrateDevice(self.device)
+
+        changeDeviceTypeId.assert_called_once_with(self.device, "shelly-1")
+        self.assertListEqual([1], versions)
+        self.assertEqual(kCurDevVersion, device.pluginProps['devVersCount'])
+
+    def test_migrateDevice_skips_current_device(self):
+        self.device.pluginProps['devVersCount'] = kCurDevVersion
+        device, versions = migrateDevice(self.device)
+        self.assertListEqual([], versions)
+        self.assertEqual(0, self.device.server_round_trips)
@@ -0,0 +1,42 @@
+# coding=utf-8
+import unittest
+import json
+from unittest.mock import patch
+
+from Devices.ShellyPayload import ShellyPayload, decodePayload, decodeSensors
+
+SENSORS = '{"0":{"hwID":"AAAAAAAA","tC":20.5},"1":{"hwID":"BBBBBBBB","tC":21.5}}'
+
+
+class Test_ShellyPayload(unittest.TestCase):
+
+    def test_payload_is_a_string(self):
+        payload = ShellyPayload("on")
+        self.assertEqual("on", payload)
+        self.assertIsInstance(payload, str)
+
+    def test_decode_is_cached(self):
+        payload = ShellyPayload('{"event": "S", "event_cnt": 1}')
+        with patch('json.loads', wraps=json.loads) as loads:
+            self.assertDictEqual({"event": "S", "event_cnt": 1}, payload.decode())
+            self.assertIs(payload.decode(), payload.decode())
+        loads.assert_called_once()
+
+    def test_decode_invalid_json_is_cached(self):
+        payload = ShellyPayload('{"event": ')
+        with patch('json.loads', wraps=json.loads) as loads:
+            self.assertRaises(ValueError, payload.decode)
+            self.assertRaises(ValueError, payload.decode)
+        loads.assert_called_once()
+
+    def test_sensors_are_indexed_by_hardware_id(self):
+        payload = ShellyPayload(SENSORS)
+        sensors = payload.sensors()
+        self.assertEqual(20.5, sensors["AAAAAAAA"]['tC'])
+        self.assertEqual(21.5, sensors["BBBBBBBB"]['tC'])
+        self.assertIs(sensors, payload.sensors())
+
+    def test_decode_plain_strings(self):
+        self.assertDictEqual({"a": 1}, decodePayload('{"a": 1}'))
+        self.assertEqual(21.5, decodeSensors(SENSORS)["BBBBBBBB"]['tC'])
+        self.assertRaises(ValueError, decodeSensors, "not json")
@@ -0,0 +1,47 @@
+# coding=utf-8
+import unittest
+
+from Devices.ShellySampling import ShellySampling
+
+
+class Test_ShellySampling(unittest.TestCase):
+
+    def sample(self, aggregation, readings):
+        sampling = ShellySampling(30, aggregation, "{:.1f} W")
+        for value, uiValue, now in readings:
+            self.assertFalse(sampling.add(value, uiValue, 1, now))
+        return sampling
+
+    def test_empty_window(self):
+        sampling = ShellySampling(30, "last", "{:.1f} W")
+        self.assertFalse(sampling.isOver(100))
+        self.assertIsNone(sampling.take())
+
+    def test_window_is_over_after_interval(self):
+        sampling = ShellySampling(30, "last", "{:.1f} W")
+        self.assertFalse(sampling.add(1.0, "1.0 W", 1, 100))
+        self.assertFalse(sampling.isOver(129))
+        self.assertTrue(sampling.add(2.0, "2.0 W", 1, 130))
+
+    def test_last(self):
+        sampling = self.sample("last", [(1.0, "1.0 W", 100), (3.0, "3.0 W", 110), (2.0, "2.0 W", 120)])
+        self.assertTupleEqual((2.0, "2.0 W", 1), sampling.take())
+        self.assertIsNone(sampling.take())
+
+    def test_mean(self):
+        sampling = self.sample("mean", [(1.0, "1.0 W", 100), (3.0, "3.0 W", 110), (2.5, "2.5 W", 120)])
+        self.assertTupleEqual((2.1666666666666665, "2.2 W", 1), sampling.take())
+
+    def test_max(self):
+        sampling = self.sample("max", [(1.0, "1.0 W", 100), (3.0, "3.0 W", 110), (2.0, "2.0 W", 120)])
+        self.assertTupleEqual((3.0, "3.0 W", 1), sampling.take())
+
+    def test_string_readings_are_aggregated(self):
+        sampling = self.sample("mean", [("10", "10 W", 100), ("20", "20 W", 110)])
+        self.assertTupleEqual((15.0, "15.0 W", 1), sampling.take())
+
+    def test_window_restarts_after_take(self):
+        sampling = self.sample("max", [(5.0, "5.0 W", 100)])
+        sampling.take()
+        self.assertFalse(sampling.add(1.0, "1.0 W", 1, 200))
+        self.assertTupleEqual((1.0, "1.0 W", 1), sampling.take())
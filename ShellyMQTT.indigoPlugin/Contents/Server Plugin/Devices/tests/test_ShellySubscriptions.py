@@ -0,0 +1,129 @@
+# coding=utf-8
+import unittest
+import threading
+
+from Devices.ShellySubscriptions import ShellySubscriptions
+from Devices.tests.mocking.MQTTConnector import MQTTConnector
+
+
+class Test_ShellySubscriptions(unittest.TestCase):
+
+    def setUp(self):
+        self.mqtt = MQTTConnector()
+        self.subscriptions = ShellySubscriptions(self.mqtt)
+
+    def topics(self, brokerId):
+        return [props['topic'] for props in self.mqtt.getBrokerSubscriptions(brokerId)]
+
+    def test_add_subscribes_to_new_topics(self):
+        self.assertListEqual(["a", "b"], self.subscriptions.add(1, 100, ["a", "b"]))
+        self.assertListEqual(["c"], self.subscriptions.add(1, 101, ["b", "c"]))
+
+        self.assertListEqual(["a", "b", "c"], self.topics(1))
+        self.assertListEqual([100, 101], self.subscriptions.get(1, "b"))
+        self.assertDictEqual({"a": 1, "b": 2, "c": 1}, self.subscriptions.getTopics(1))
+
+    def test_topics_are_kept_per_broker(self):
+        self.subscriptions.add(1, 100, ["a"])
+        self.assertListEqual(["a"], self.subscriptions.add(2, 101, ["a"]))
+
+        self.assertListEqual([100], self.subscriptions.get(1, "a"))
+        self.assertListEqual([101], self.subscriptions.get(2, "a"))
+        self.assertListEqual([], self.subscriptions.get(3, "a"))
+
+    def test_remove_returns_unused_topics(self):
+        self.subscriptions.add(1, 100, ["a", "b"])
+        self.subscriptions.add(1, 101, ["b"])
+
+        self.assertListEqual(["a"], self.subscriptions.remove(100))
+        self.assertListEqual([101], self.subscriptions.get(1, "b"))
+        self.assertListEqual([], self.subscriptions.get(1, "a"))
+        self.assertNotIn(100, self.subscriptions)
+
+        self.assertListEqual(["b"], self.subscriptions.remove(101))
+        self.assertEqual({}, self.subscriptions.topics)
+        self.assertListEqual([], self.subscriptions.remove(101))
+
+    def test_flush_unsubscribes_from_unused_topics(self):
+        self.subscriptions.add(1, 100, ["a", "b"])
+        self.subscriptions.add(1, 101, ["b"])
+        self.subscriptions.remove(100)
+        self.assertEqual(0, self.mqtt.getActionCount("del_subscription"))
+
+        self.assertDictEqual({1: ["a"]}, self.subscriptions.flush())
+        self.assertListEqual(["b"], self.topics(1))
+        self.assertDictEqual({}, self.subscriptions.flush())
+
+    def test_restarted_device_is_not_resubscribed(self):
+        self.subscriptions.add(1, 100, ["a", "b"])
+        self.subscriptions.remove(100)
+        self.assertListEqual([], self.subscriptions.add(1, 100, ["a", "b"]))
+        self.subscriptions.flush()
+
+        self.assertEqual(2, self.mqtt.getActionCount("add_subscription"))
+        self.assertEqual(0, self.mqtt.getActionCount("del_subscription"))
+        self.assertListEqual([100], self.subscriptions.get(1, "a"))
+
+    def test_device_restarting_during_flush_is_resubscribed(self):
+        self.subscriptions.add(1, 100, ["a"])
+        self.subscriptions.remove(100)
+        restart = threading.Thread(target=self.subscriptions.add, args=(1, 100, ["a"]))
+        executeAction = self.mqtt.executeAction
+
+        def unsubscribe(action, deviceId, props):
+            if action == "del_subscription":
+                # The device restarts while the broker is being unsubscribed
+                restart.start()
+                restart.join(0.05)
+                self.assertTrue(restart.is_alive())
+            executeAction(action, deviceId=deviceId, props=props)
+
+        self.mqtt.executeAction = unsubscribe
+        self.assertDictEqual({1: ["a"]}, self.subscriptions.flush())
+        restart.join()
+
+        self.assertListEqual(["a"], self.topics(1))
+        self.assertEqual(2, self.mqtt.getActionCount("add_subscription"))
+        self.assertDictEqual({}, self.subscriptions.flush())
+
+    def test_add_replaces_device_topics(self):
+        self.subscriptions.add(1, 100, ["a", "b"])
+        self.subscriptions.add(1, 100, ["b", "c"])
+
+        self.assertDictEqual({"b": 1, "c": 1}, self.subscriptions.getTopics(1))
+        self.assertEqual(1, len(self.subscriptions))
+        self.assertDictEqual({1: ["a"]}, self.subscriptions.flush())
+
+    def test_telemetry_topics(self):
+        self.subscriptions.add(1, 100, ["a/power", "a/relay"], ["a/power"])
+        self.subscriptions.add(1, 101, ["a/power"], ["a/power"])
+        self.assertTrue(self.subscriptions.isTelemetry(1, "a/power"))
+        self.assertFalse(self.subscriptions.isTelemetry(1, "a/relay"))
+        self.assertFalse(self.subscriptions.isTelemetry(2, "a/power"))
+
+        self.subscriptions.remove(100)
+        self.assertTrue(self.subscriptions.isTelemetry(1, "a/power"))
+        self.subscriptions.remove(101)
+        self.assertFalse(self.subscriptions.isTelemetry(1, "a/power"))
+        self.assertEqual({}, self.subscriptions.telemetry)
+
+    def test_connector_fix(self):
+        self.subscriptions.connectorFix = True
+        self.subscriptions.add(1, 100, ["a"])
+        self.assertListEqual(["0:a"], self.topics(1))
+
+        self.subscriptions.remove(100)
+        self.subscriptions.flush()
+        self.assertListEqual([], self.topics(1))
+
+    def test_brokers_are_not_updated_without_mqtt(self):
+        subscriptions = ShellySubscriptions()
+        self.assertListEqual(["a"], subscriptions.add(1, 100, ["a"]))
+        subscriptions.remove(100)
+        self.assertDictEqual({1: ["a"]}, subscriptions.flush())
+        self.assertEqual({}, self.mqtt.action_counts)
+
+    def test_brokers_are_not_updated_when_mqtt_is_disabled(self):
+        self.mqtt.enabled = False
+        self.subscriptions.add(1, 100, ["a"])
+        self.assertEqual({}, self.mqtt.action_counts)
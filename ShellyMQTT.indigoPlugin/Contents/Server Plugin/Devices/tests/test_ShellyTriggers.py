@@ -0,0 +1,57 @@
+# coding=utf-8
+import unittest
+
+from Devices.ShellyTriggers import ShellyTriggers
+from Devices.tests.mocking.IndigoTrigger import IndigoTrigger
+
+
+class Test_ShellyTriggers(unittest.TestCase):
+
+    def setUp(self):
+        self.triggers = ShellyTriggers()
+
+    def test_get_device_triggers(self):
+        trigger = IndigoTrigger("input-event-s", {'device-id': "123"})
+        other = IndigoTrigger("input-event-s", {'device-id': "456"})
+        self.triggers.add(trigger)
+        self.triggers.add(other)
+
+        self.assertListEqual([trigger], self.triggers.get("input-event-s", 123))
+        self.assertListEqual([other], self.triggers.get("input-event-s", 456))
+        self.assertListEqual([], self.triggers.get("input-event-l", 123))
+
+    def test_get_any_device_triggers(self):
+        trigger = IndigoTrigger("low-battery-any", {})
+        self.triggers.add(trigger)
+
+        self.assertListEqual([trigger], self.triggers.get("low-battery-any"))
+        self.assertListEqual([], self.triggers.get("low-battery-any", 123))
+
+    def test_invalid_device_id_is_not_matched_to_a_device(self):
+        trigger = IndigoTrigger("input-event-s", {'device-id': ""})
+        self.triggers.add(trigger)
+
+        self.assertListEqual([], self.triggers.get("input-event-s", 123))
+
+    def test_remove(self):
+        trigger = IndigoTrigger("input-event-s", {'device-id': "123"})
+        self.triggers.add(trigger)
+        self.triggers.remove(trigger.id)
+
+        self.assertListEqual([], self.triggers.get("input-event-s", 123))
+        self.assertNotIn(trigger.id, self.triggers)
+        self.assertEqual({}, self.triggers.index)
+
+    def test_remove_unknown_trigger(self):
+        self.triggers.remove(1)
+        self.assertEqual(0, len(self.triggers))
+
+    def test_add_replaces_trigger_with_same_id(self):
+        trigger = IndigoTrigger("input-event-s", {'device-id': "123"}, id=1)
+        updated = IndigoTrigger("input-event-l", {'device-id': "456"}, id=1)
+        self.triggers.add(trigger)
+        self.triggers.add(updated)
+
+        self.assertListEqual([], self.triggers.get("input-event-s", 123))
+        self.assertListEqual([updated], self.triggers.get("input-event-l", 456))
+        self.assertEqual(1, len(self.triggers))
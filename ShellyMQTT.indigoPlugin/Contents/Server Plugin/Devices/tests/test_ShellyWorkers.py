@@ -0,0 +1,56 @@
+# coding=utf-8
+import unittest
+import logging
+import threading
+
+from Devices.ShellyWorkers import ShellyWorkers
+
+
+class Test_ShellyWorkers(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger('Plugin.ShellyMQTT')
+        self.logger.addHandler(logging.NullHandler())
+        self.workers = ShellyWorkers(4, self.logger)
+        self.addCleanup(self.workers.stop)
+
+    def test_work_for_a_key_is_done_in_order(self):
+        done = {}
+
+        def work(key, i):
+            done.setdefault(key, []).append(i)
+
+        for i in range(100):
+            for key in ("a", "b", "c"):
+                self.workers.submit(key, work, key, i)
+        self.workers.join()
+
+        for key in ("a", "b", "c"):
+            self.assertListEqual(list(range(100)), done[key])
+
+    def test_work_for_a_key_is_done_by_one_thread(self):
+        threads = set()
+        for i in range(20):
+            self.workers.submit(("broker", "shellies/device"), lambda: threads.add(threading.current_thread().name))
+        self.workers.join()
+        self.assertEqual(1, len(threads))
+
+    def test_failed_work_is_logged(self):
+        done = []
+
+        def fail():
+            raise ValueError("failed")
+
+        with self.assertLogs('Plugin.ShellyMQTT', level='ERROR'):
+            self.workers.submit("a", fail)
+            self.workers.submit("a", done.append, True)
+            self.workers.join()
+        self.assertListEqual([True], done)
+
+    def test_stop(self):
+        done = []
+        self.workers.submit("a", done.append, True)
+        self.workers.stop()
+        self.assertListEqual([True], done)
+        for thread in self.workers.threads:
+            self.assertFalse(thread.is_alive())
@@ -7,6 +7,7 @@ import logging
 from Devices.tests.mocking.IndigoDevice import IndigoDevice
 from Devices.tests.mocking.IndigoServer import Indigo
 from Devices.tests.mocking.IndigoAction import IndigoAction
+from Devices.tests.mocking.IndigoTrigger import IndigoTrigger
 
 indigo = Indigo()
 sys.modules['indigo'] = indigo
@@ -87,6 +88,20 @@ class Test_Shelly_1PM(unittest.TestCase):
         self.assertEqual("100.12", self.shelly.device.states['overpower-value'])
         self.assertEqual("100.12 W", self.shelly.device.states_meta['overpower-value']['uiValue'])
 
+    def test_handleMessage_relay_overpower_value_fires_triggers(self):
+        """Test that an overpower value fires the overpower triggers for any device and for this device."""
+        trigger_any = IndigoTrigger("overpower-any", {})
+        trigger_device = IndigoTrigger("overpower-device", {'device-id': str(self.device.id)})
+        trigger_other = IndigoTrigger("overpower-device", {'device-id': "654321"})
+        indigo.activePlugin.triggers.add(trigger_any)
+        indigo.activePlugin.triggers.add(trigger_device)
+        indigo.activePlugin.triggers.add(trigger_other)
+
+        self.shelly.handleMessage("shellies/shelly1pm-test/relay/0/overpower_value", "100.12")
+        self.assertTrue(trigger_any.executed)
+        self.assertTrue(trigger_device.executed)
+        self.assertFalse(trigger_other.executed)
+
     def test_handleMessage_switch_on(self):
         """Test getting a switch on message."""
         self.assertFalse(self.shelly.device.states['sw-input'])
@@ -54,6 +54,16 @@ class Test_Shelly_3EM_Meter(unittest.TestCase):
         ]
         self.assertListEqual(topics, self.shelly.getSubscriptions())
 
+    def test_getTelemetryTopics(self):
+        topics = [
+            "shellies/shelly-3em-meter-test/emeter/0/current",
+            "shellies/shelly-3em-meter-test/emeter/0/pf",
+            "shellies/shelly-3em-meter-test/emeter/0/power",
+            "shellies/shelly-3em-meter-test/emeter/0/reactive_power",
+            "shellies/shelly-3em-meter-test/emeter/0/voltage"
+        ]
+        self.assertListEqual(topics, self.shelly.getTelemetryTopics())
+
     def test_handleMessage_power(self):
         self.shelly.handleMessage("shellies/shelly-3em-meter-test/emeter/0/power", "0")
         self.assertEqual(0, self.shelly.device.states['curEnergyLevel'])
@@ -2,12 +2,14 @@
 import unittest
 import sys
 import logging
+from unittest.mock import patch
 
 from Devices.tests.mocking.IndigoDevice import IndigoDevice
 from Devices.tests.mocking.IndigoServer import Indigo
 
 indigo = Indigo()
 sys.modules['indigo'] = indigo
+from Devices.Shelly import Shelly
 from Devices.Addons.Shelly_Addon import Shelly_Addon
 from Devices.Relays.Shelly_1 import Shelly_1
 
@@ -41,6 +43,24 @@ class Test_Shelly_Addon(unittest.TestCase):
     def test_getHostDevice(self):
         self.assertEqual(self.host_shelly, self.shelly.getHostDevice())
 
+    def test_getHostDevice_is_bound_until_refresh(self):
+        self.assertEqual(self.host_shelly, self.shelly.getHostDevice())
+        other_shelly = Shelly_1(IndigoDevice(id=222222, name="Other Host"))
+        indigo.activePlugin.shellyDevices[other_shelly.device.id] = other_shelly
+        self.device.pluginProps['host-id'] = "222222"
+        self.assertEqual(self.host_shelly, self.shelly.getHostDevice())
+
+        with patch.object(Shelly, 'refresh_device'):
+            self.shelly.refresh_device()
+        self.assertEqual(other_shelly, self.shelly.getHostDevice())
+
+    def test_setHostDevice(self):
+        other_shelly = Shelly_1(IndigoDevice(id=222222, name="Other Host"))
+        self.shelly.setHostDevice(other_shelly)
+        self.assertEqual(other_shelly, self.shelly.getHostDevice())
+        self.shelly.setHostDevice(None)
+        self.assertEqual(self.host_shelly, self.shelly.getHostDevice())
+
     def test_getBrokerId_no_host(self):
         self.device.pluginProps['host-id'] = None
         self.assertIsNone(self.shelly.getBrokerId())
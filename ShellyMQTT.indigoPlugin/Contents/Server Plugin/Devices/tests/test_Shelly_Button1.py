@@ -79,11 +79,11 @@ class Test_Shelly_Button1(unittest.TestCase):
         self.device.pluginProps['last-input-event-id'] = 3
         self.device.states['online'] = False
         self.shelly.handleMessage("shellies/shelly-button1-test/online", "true")
-        self.assertEqual(0, self.device.pluginProps['last-input-event-id'])
+        self.assertEqual(0, self.shelly.getLastInputEventId())
 
     def test_input_event_cnt_is_not_reset_on_duplicate_online(self):
         """Test that the device transitioning from offline to online causes the last input event count to be reset to 0"""
         self.device.pluginProps['last-input-event-id'] = 3
         self.device.states['online'] = True
         self.shelly.handleMessage("shellies/shelly-button1-test/online", "true")
-        self.assertEqual(3, self.device.pluginProps['last-input-event-id'])
+        self.assertEqual(3, self.shelly.getLastInputEventId())
@@ -109,6 +109,28 @@ class Test_Shelly_Door_Window(unittest.TestCase):
         self.shelly.handleMessage("shellies/shelly-dw-test/sensor/battery", "94")
         self.assertEqual("94", self.shelly.device.states['batteryLevel'])
 
+    def test_compileTopicHandlers_burst_topics(self):
+        self.shelly.compileTopicHandlers()
+        self.assertIn("shellies/shelly-dw-test/sensor/lux", self.shelly.burstTopics)
+        self.assertIn("shellies/shelly-dw-test/online", self.shelly.burstTopics)
+        self.assertNotIn("shellies/shelly-dw-test/sensor/state", self.shelly.burstTopics)
+        self.assertNotIn("shellies/shelly-dw-test/input_event/0", self.shelly.burstTopics)
+
+    def test_handleMessages_writes_burst_once(self):
+        roundTrips = self.device.server_round_trips
+        self.shelly.handleMessages([
+            ("shellies/shelly-dw-test/online", "true"),
+            ("shellies/shelly-dw-test/sensor/lux", "80"),
+            ("shellies/shelly-dw-test/sensor/state", "close"),
+            ("shellies/shelly-dw-test/sensor/battery", "95")
+        ])
+
+        self.assertTrue(self.shelly.device.states['online'])
+        self.assertTrue(self.shelly.device.states['onOffState'])
+        self.assertEqual("80", self.shelly.device.states['lux'])
+        self.assertEqual(indigo.kStateImageSel.DoorSensorClosed, self.shelly.device.image)
+        self.assertEqual(2, self.device.server_round_trips - roundTrips)
+
     def test_update_state_image_door_open(self):
         self.device.pluginProps['useCase'] = "door"
         self.shelly.device.states['onOffState'] = False
@@ -113,6 +113,91 @@ class Test_Shelly_EM_Meter(unittest.TestCase):
         self.assertAlmostEqual(122.87, self.shelly.device.states['voltage'], 2)
         self.assertEqual("122.9 V", self.shelly.device.states_meta['voltage']['uiValue'])
 
+    def test_handleMessage_power_within_deadband(self):
+        self.device.pluginProps['power-deadband'] = "5"
+        self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "100.0")
+        self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "104.5")
+        self.assertEqual(100.0, self.shelly.device.states['power'])
+        self.assertEqual(100.0, self.shelly.device.states['curEnergyLevel'])
+
+        self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "105.0")
+        self.assertEqual(105.0, self.shelly.device.states['power'])
+        self.assertEqual(105.0, self.shelly.device.states['curEnergyLevel'])
+
+    def test_handleMessage_power_without_deadband(self):
+        self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "100.0")
+        self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "100.1")
+        self.assertEqual(100.1, self.shelly.device.states['power'])
+
+    def test_handleMessage_voltage_within_deadband(self):
+        self.device.pluginProps['voltage-deadband'] = "1.5"
+        self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/voltage", "120.0")
+        self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/voltage", "121.2")
+        self.assertAlmostEqual(120.0, self.shelly.device.states['voltage'], 2)
+        self.assertEqual(1, self.shelly.suppressedStateCount)
+
+    def test_handleMessage_power_sampled_mean(self):
+        self.device.pluginProps['power-sample-interval'] = "30"
+        self.device.pluginProps['power-sample-aggregation'] = "mean"
+        with patch('Devices.Shelly.time.monotonic', return_value=1000):
+            self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "100")
+        with patch('Devices.Shelly.time.monotonic', return_value=1010):
+            self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "200")
+        self.assertEqual(0, self.shelly.device.states['power'])
+
+        with patch('Devices.Shelly.time.monotonic', return_value=1030):
+            self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "300")
+        self.assertEqual(200.0, self.shelly.device.states['power'])
+        self.assertEqual(200.0, self.shelly.device.states['curEnergyLevel'])
+        self.assertEqual("200.00 W", self.shelly.device.states_meta['power']['uiValue'])
+
+    def test_handleMessage_voltage_sampled_max(self):
+        self.device.pluginProps['voltage-sample-interval'] = "60"
+        self.device.pluginProps['voltage-sample-aggregation'] = "max"
+        with patch('Devices.Shelly.time.monotonic', return_value=1000):
+            self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/voltage", "120.2")
+            self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/voltage", "123.4")
+            self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/voltage", "119.0")
+        self.assertIsNone(self.shelly.device.states.get('voltage', None))
+
+        with patch('Devices.Shelly.time.monotonic', return_value=1061):
+            self.shelly.flushSampledStates()
+        self.assertAlmostEqual(123.4, self.shelly.device.states['voltage'], 2)
+        self.assertEqual("123.4 V", self.shelly.device.states_meta['voltage']['uiValue'])
+
+    @patch('Devices.Shelly.indigo', indigo)
+    def test_refresh_device_keeps_sampling_window(self):
+        indigo.devices[self.device.id] = self.device
+        self.device.pluginProps['power-sample-interval'] = "60"
+        with patch('Devices.Shelly.time.monotonic', return_value=1000):
+            self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "100")
+            self.shelly.refresh_device()
+            self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "150")
+        self.assertEqual(0, self.shelly.device.states['power'])
+        self.assertIn('power', self.shelly.sampledStates)
+
+    @patch('Devices.Shelly.indigo', indigo)
+    def test_refresh_device_flushes_when_sampling_changes(self):
+        indigo.devices[self.device.id] = self.device
+        self.device.pluginProps['power-sample-interval'] = "60"
+        with patch('Devices.Shelly.time.monotonic', return_value=1000):
+            self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "100")
+            self.device.pluginProps['power-sample-interval'] = "30"
+            self.shelly.refresh_device()
+        self.assertEqual(100.0, self.shelly.device.states['power'])
+        self.assertEqual({}, self.shelly.sampledStates)
+
+    @patch('Devices.Shelly.Shelly.publish')
+    def test_handleAction_status_request_flushes_sampled_states(self, publish):
+        self.device.pluginProps['power-sample-interval'] = "60"
+        self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "100")
+        self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/power", "150")
+        self.assertEqual(0, self.shelly.device.states['power'])
+
+        self.shelly.handleAction(IndigoAction(indigo.kDeviceAction.RequestStatus))
+        self.assertEqual(150.0, self.shelly.device.states['power'])
+        publish.assert_called_with("shellies/shelly-em-meter-test/command", "update")
+
     def test_handleMessage_voltage_invalid(self):
         self.shelly.handleMessage("shellies/shelly-em-meter-test/emeter/0/voltage", "Aa")
 
@@ -247,3 +332,46 @@ class Test_Shelly_EM_Meter(unittest.TestCase):
         self.assertTrue("address" in errors)
         self.assertTrue("message-type" in errors)
         self.assertTrue("announce-message-type" in errors)
+
+    def test_validateConfigUI_deadbands(self):
+        values = {
+            "broker-id": "12345",
+            "address": "some/address",
+            "message-type": "a-type",
+            "announce-message-type-same-as-message-type": True,
+            "power-deadband": "2.5",
+            "voltage-deadband": "0"
+        }
+
+        isValid, valuesDict, errors = Shelly_EM_Meter.validateConfigUI(values, None, None)
+        self.assertTrue(isValid)
+
+    def test_validateConfigUI_invalid_deadbands(self):
+        values = {
+            "broker-id": "12345",
+            "address": "some/address",
+            "message-type": "a-type",
+            "announce-message-type-same-as-message-type": True,
+            "power-deadband": "a lot",
+            "voltage-deadband": "-1"
+        }
+
+        isValid, valuesDict, errors = Shelly_EM_Meter.validateConfigUI(values, None, None)
+        self.assertFalse(isValid)
+        self.assertTrue("power-deadband" in errors)
+        self.assertTrue("voltage-deadband" in errors)
+
+    def test_validateConfigUI_invalid_sample_intervals(self):
+        values = {
+            "broker-id": "12345",
+            "address": "some/address",
+            "message-type": "a-type",
+            "announce-message-type-same-as-message-type": True,
+            "power-sample-interval": "30",
+            "voltage-sample-interval": "often"
+        }
+
+        isValid, valuesDict, errors = Shelly_EM_Meter.validateConfigUI(values, None, None)
+        self.assertFalse(isValid)
+        self.assertFalse("power-sample-interval" in errors)
+        self.assertTrue("voltage-sample-interval" in errors)
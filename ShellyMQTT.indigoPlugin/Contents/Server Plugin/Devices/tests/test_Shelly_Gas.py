@@ -75,6 +75,13 @@ class Test_Shelly_Button1(unittest.TestCase):
         self.shelly.handleMessage("shellies/shelly-gas-test/sensor/gas", "mild")
         self.assertEqual("mild", self.device.states['gas-detected'])
 
+    def test_handleMessage_gas_updates_image_once_after_states(self):
+        calls = []
+        with patch.object(self.device, 'updateStatesOnServer', side_effect=lambda states: calls.append('states')), \
+                patch.object(self.device, 'updateStateImageOnServer', side_effect=lambda image: calls.append('image')):
+            self.shelly.handleMessage("shellies/shelly-gas-test/sensor/gas", "mild")
+        self.assertListEqual(['states', 'image'], calls)
+
     def test_handleMessage_self_test(self):
         self.shelly.handleMessage("shellies/shelly-gas-test/sensor/self_test", "completed")
         self.assertEqual("completed", self.device.states['self-test'])
@@ -87,6 +87,16 @@ class Test_Shelly_Motion(unittest.TestCase):
         self.assertEqual(68, self.device.states['batteryLevel'])
         self.assertEqual(3.112, self.device.states['voltage'])
 
+    def test_handleMessage_info_single_round_trip(self):
+        self.device.server_round_trips = 0
+        self.shelly.handleMessage("shellies/shelly-motion-2-test/info", '{"sensor": {"motion": true, "vibration": true, "is_valid": true}, "lux": {"value": 88, "is_valid": true}, "bat": {"value": 68, "voltage": 3.112}}')
+
+        # One for the states and one for the state image
+        self.assertEqual(2, self.device.server_round_trips)
+        self.assertTrue(self.device.states['onOffState'])
+        self.assertEqual(88, self.device.states['lux'])
+        self.assertEqual(3.112, self.device.states['voltage'])
+
     def test_handleMessage_invalid_json(self):
         self.shelly.handleMessage("shellies/shelly-motion-2-test/info", '{"bat": 6]')
 
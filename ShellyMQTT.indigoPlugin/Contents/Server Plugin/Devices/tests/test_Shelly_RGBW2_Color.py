@@ -88,6 +88,25 @@ class Test_Shelly_RGBW2_Color(unittest.TestCase):
         self.assertEqual(52, self.shelly.device.states['greenLevel'])
         self.assertEqual(53, self.shelly.device.states['blueLevel'])
 
+    def test_handleMessage_status_single_round_trip(self):
+        """Test that the states from a status message are sent to the server together."""
+        payload = {
+            "ison": True,
+            "mode": "color",
+            "red": 51,
+            "green": 52,
+            "blue": 53,
+            "brightness": 100,
+            "gain": 100,
+            "power": 25,
+            "overpower": False
+        }
+        self.device.server_round_trips = 0
+        self.shelly.handleMessage("shellies/shelly-rgbw2-color-test/color/0/status", json.dumps(payload))
+
+        # One for the states and one for the state image
+        self.assertEqual(2, self.device.server_round_trips)
+
     def test_handleMessage_light_off(self):
         """Test getting a light off message."""
         self.shelly.turnOn()
@@ -105,6 +105,16 @@ class Test_Shelly_TRV(unittest.TestCase):
         self.shelly.handleMessage("shellies/trv/info", '{"thermostats": [{"boost_minutes": 2}]}')
         self.assertEqual(2, self.device.states['boost-minutes'])
 
+    def test_handleMessage_info_single_round_trip(self):
+        self.device.pluginProps['temp-units'] = "C"
+        self.device.server_round_trips = 0
+        self.shelly.handleMessage("shellies/trv/info", '{"thermostats": [{"target_t": {"value": 21.0}, "tmp": {"value": 19.5}, "boost_minutes": 0, "pos": 23}], "bat": {"value": 68, "voltage": 3.9}, "charger": false, "calibrated": true}')
+
+        self.assertEqual(1, self.device.server_round_trips)
+        self.assertEqual(21.0, self.device.states['setpointHeat'])
+        self.assertEqual(19.5, self.device.states['temperatureInput1'])
+        self.assertEqual(23, self.device.states['valve-position'])
+
     def test_handleMessage_updates_position(self):
         self.shelly.handleMessage("shellies/trv/info", '{"thermostats": [{"pos": 23}]}')
         self.assertEqual(23, self.device.states['valve-position'])
@@ -0,0 +1,775 @@
+# coding=utf-8
+import unittest
+import logging
+import threading
+import time
+import json
+from unittest.mock import patch
+
+from Devices.tests.mocking.IndigoDevice import IndigoDevice
+from Devices.tests.mocking.IndigoServer import Indigo
+from Devices.tests.mocking.PluginLoader import loadPlugin
+
+indigo = Indigo()
+
+
+class UnreadableProps(dict):
+    """
+    pluginProps that fail the test if they are read.
+    """
+
+    def get(self, key, default=None):
+        raise AssertionError("pluginProps['{}'] was read".format(key))
+
+    def __getitem__(self, key):
+        raise AssertionError("pluginProps['{}'] was read".format(key))
+
+
+class Test_Plugin(unittest.TestCase):
+
+    def setUp(self):
+        indigo.__init__()
+        self.plugin_module = loadPlugin(self, indigo)
+        logging.getLogger('Plugin').addHandler(logging.NullHandler())
+        logging.getLogger('Plugin.ShellyMQTT').addHandler(logging.NullHandler())
+
+        self.broker = IndigoDevice(id=1000, name="Broker")
+        indigo.devices[self.broker.id] = self.broker
+        self.plugin = self.plugin_module.Plugin("com.lionsheeptechnology.ShellyMQTT", "ShellyMQTT", "1.0.0", {})
+        self.mqtt = self.plugin.mqttPlugin
+
+    def createDevice(self, id, deviceTypeId="shelly-1", address="shellies/test-shelly", message_type="shellies"):
+        device = IndigoDevice(id=id, name="Device {}".format(id), deviceTypeId=deviceTypeId)
+        device.pluginProps['broker-id'] = str(self.broker.id)
+        device.pluginProps['address'] = address
+        device.pluginProps['message-type'] = message_type
+        device.states['onOffState'] = False
+        indigo.devices[device.id] = device
+        self.startDevice(device)
+        return self.plugin.shellyDevices[device.id]
+
+    def createAddon(self, id, hostId, deviceTypeId="shelly-addon-ds1820"):
+        device = IndigoDevice(id=id, name="Addon {}".format(id), deviceTypeId=deviceTypeId)
+        device.pluginProps['host-id'] = str(hostId)
+        device.pluginProps['probe-number'] = "1"
+        indigo.devices[device.id] = device
+        self.startDevice(device)
+        return device
+
+    def startDevice(self, device):
+        self.plugin.deviceStartComm(device)
+        self.plugin.runStartupTasks()
+        # Take the empty messages that woke up the message pump for the startup work
+        while not self.plugin.messageQueue.empty():
+            self.plugin.messageQueue.get_nowait()
+
+    def publish(self, topic, payload, message_type="shellies"):
+        self.mqtt.queueMessage(self.broker.id, message_type, topic, payload)
+        self.plugin.message_handler({'message_type': message_type, 'brokerID': str(self.broker.id)})
+
+    def test_deviceStartComm_compiles_topic_handlers(self):
+        shelly = self.createDevice(1)
+        self.assertIn("shellies/test-shelly/relay/0", shelly.compiledTopicHandlers)
+
+    def test_deviceUpdated_recompiles_topic_handlers_when_props_change(self):
+        shelly = self.createDevice(1)
+        origDev = IndigoDevice(id=1, name="Device 1", deviceTypeId="shelly-1")
+        origDev.pluginProps.update(shelly.device.pluginProps)
+        shelly.device.pluginProps['channel'] = "1"
+        self.plugin.deviceUpdated(origDev, shelly.device)
+
+        # The channel is a communication property, so the device has been restarted
+        shelly = self.plugin.shellyDevices[1]
+        self.assertIn("shellies/test-shelly/relay/1", shelly.compiledTopicHandlers)
+        self.assertNotIn("shellies/test-shelly/relay/0", shelly.compiledTopicHandlers)
+
+    def test_deviceUpdated_skips_refresh_for_state_changes(self):
+        shelly = self.createDevice(1)
+        origDev = IndigoDevice(id=1, name="Device 1", deviceTypeId="shelly-1")
+        origDev.pluginProps.update(shelly.device.pluginProps)
+        newDev = IndigoDevice(id=1, name="Device 1", deviceTypeId="shelly-1")
+        newDev.pluginProps.update(shelly.device.pluginProps)
+        newDev.states['onOffState'] = True
+        with patch.object(shelly, 'refresh_device') as refresh_device:
+            self.plugin.deviceUpdated(origDev, newDev)
+
+        refresh_device.assert_not_called()
+        self.assertIs(newDev, shelly.device)
+
+    def test_deviceUpdated_refreshes_device_when_name_changes(self):
+        shelly = self.createDevice(1)
+        origDev = IndigoDevice(id=1, name="Device 1", deviceTypeId="shelly-1")
+        origDev.pluginProps.update(shelly.device.pluginProps)
+        shelly.device.name = "Renamed"
+        with patch.object(shelly, 'refresh_device') as refresh_device:
+            self.plugin.deviceUpdated(origDev, shelly.device)
+
+        refresh_device.assert_called_once_with()
+
+    def test_addon_started_before_host_starts_with_host(self):
+        indigo.activePlugin = self.plugin
+        device = self.createAddon(2, hostId=1)
+        self.assertNotIn(2, self.plugin.shellyDevices)
+        self.assertIn(2, self.plugin.dependents)
+
+        host = self.createDevice(1)
+        addon = self.plugin.shellyDevices[2]
+        self.assertNotIn(2, self.plugin.dependents)
+        self.assertIs(host, addon.getHostDevice())
+        self.assertListEqual([addon], self.plugin.getAddons(1))
+        self.assertIs(device, addon.device)
+
+    def test_host_restart_restarts_addons(self):
+        indigo.activePlugin = self.plugin
+        host = self.createDevice(1)
+        self.createAddon(2, hostId=1)
+        self.createAddon(3, hostId=1)
+
+        self.plugin.deviceStopComm(host.device)
+        self.assertNotIn(2, self.plugin.shellyDevices)
+        self.assertNotIn(3, self.plugin.shellyDevices)
+        self.assertSetEqual({2, 3}, set(self.plugin.dependents))
+        self.assertSetEqual({2, 3}, set(addon.device.id for addon in self.plugin.getAddons(1)))
+
+        self.startDevice(host.device)
+        restarted = self.plugin.shellyDevices[1]
+        self.assertEqual({}, self.plugin.dependents)
+        for addonId in (2, 3):
+            self.assertIs(restarted, self.plugin.shellyDevices[addonId].getHostDevice())
+        self.assertSetEqual({2, 3}, set(addon.device.id for addon in self.plugin.getAddons(1)))
+
+    def test_addon_reparented_to_another_host(self):
+        indigo.activePlugin = self.plugin
+        host1 = self.createDevice(1, address="shellies/host-1")
+        host2 = self.createDevice(2, address="shellies/host-2")
+        device = self.createAddon(3, hostId=1)
+
+        self.plugin.deviceStopComm(device)
+        device.pluginProps['host-id'] = "2"
+        self.plugin.deviceStartComm(device)
+        addon = self.plugin.shellyDevices[3]
+        self.assertListEqual([], self.plugin.getAddons(1))
+        self.assertListEqual([addon], self.plugin.getAddons(2))
+        self.assertIs(host2, addon.getHostDevice())
+        self.assertEqual("shellies/host-2", addon.getAddress())
+
+        # Only the new host takes the add-on with it when it stops
+        self.plugin.deviceStopComm(host1.device)
+        self.assertIn(3, self.plugin.shellyDevices)
+        self.plugin.deviceStopComm(host2.device)
+        self.assertNotIn(3, self.plugin.shellyDevices)
+
+    def test_deviceStopComm_removes_stopped_addon(self):
+        indigo.activePlugin = self.plugin
+        self.createDevice(1)
+        device = self.createAddon(2, hostId=1)
+        self.plugin.deviceStopComm(device)
+        self.assertListEqual([], self.plugin.getAddons(1))
+        self.assertEqual({}, self.plugin.addonHostIds)
+
+    def test_deviceUpdated_refreshes_address_column_of_hosted_addons(self):
+        indigo.activePlugin = self.plugin
+        self.plugin.pluginPrefs['addon-address-format'] = "host_name"
+        host = self.createDevice(1, address="shellies/host-1")
+        self.createDevice(2, address="shellies/host-2")
+        addon = self.createAddon(3, hostId=1)
+        other = self.createAddon(4, hostId=2)
+
+        origDev = IndigoDevice(id=1, name=host.device.name, deviceTypeId="shelly-1")
+        origDev.pluginProps.update(host.device.pluginProps)
+        host.device.name = "Renamed Host"
+        self.plugin.deviceUpdated(origDev, host.device)
+
+        self.assertEqual("Renamed Host", addon.pluginProps['address'])
+        self.assertEqual("Device 2", other.pluginProps['address'])
+
+    def test_restarted_device_keeps_receiving_messages(self):
+        shelly = self.createDevice(1)
+        self.createDevice(2)
+        self.plugin.deviceStopComm(shelly.device)
+        self.assertListEqual([2], self.plugin.subscriptions.get(self.broker.id, "shellies/test-shelly/relay/0"))
+
+        self.plugin.deviceStartComm(shelly.device)
+        restarted = self.plugin.shellyDevices[1]
+        self.publish("shellies/test-shelly/relay/0", "on")
+        self.plugin.processMessages()
+        self.assertTrue(restarted.device.states['onOffState'])
+        self.assertListEqual([2, 1], self.plugin.subscriptions.get(self.broker.id, "shellies/test-shelly/relay/0"))
+
+    def test_deviceStopComm_removes_subscriptions(self):
+        shelly = self.createDevice(1)
+        self.plugin.deviceStopComm(shelly.device)
+        self.assertEqual({}, self.plugin.subscriptions.topics)
+        self.assertNotIn(1, self.plugin.subscriptions)
+
+    def test_processMessages_with_workers(self):
+        self.plugin.messageWorkerCount = 2
+        shellies = [self.createDevice(i, address="shellies/shelly-{}".format(i)) for i in range(1, 5)]
+        handled = []
+        for shelly in shellies:
+            shelly.handleMessage = lambda topic, payload, shelly=shelly: handled.append((shelly.device.id, payload))
+        for payload in range(10):
+            for shelly in shellies:
+                self.publish("{}/relay/0".format(shelly.getAddress()), str(payload))
+        self.plugin.processMessages()
+        self.addCleanup(self.plugin.shutdown)
+        self.plugin.messageWorkers.join()
+
+        self.assertEqual(2, self.plugin.messageWorkers.size)
+        for shelly in shellies:
+            self.assertListEqual([str(i) for i in range(10)], [payload for devId, payload in handled if devId == shelly.device.id])
+
+    def test_processMessages_resizes_workers(self):
+        shelly = self.createDevice(1)
+        self.plugin.messageWorkerCount = 2
+        self.publish("shellies/test-shelly/relay/0", "on")
+        self.plugin.processMessages()
+        workers = self.plugin.messageWorkers
+        workers.join()
+        self.assertTrue(shelly.device.states['onOffState'])
+
+        self.plugin.closedPrefsConfigUi({'message-workers': "0"}, False)
+        self.publish("shellies/test-shelly/relay/0", "off")
+        self.plugin.processMessages()
+        self.assertIsNone(self.plugin.messageWorkers)
+        self.assertFalse(shelly.device.states['onOffState'])
+        for thread in workers.threads:
+            self.assertFalse(thread.is_alive())
+
+    def test_processMessages_coalesces_telemetry(self):
+        shelly = self.createDevice(1, deviceTypeId="shelly-1pm")
+        handled = []
+        handleMessage = shelly.handleMessage
+        shelly.handleMessage = lambda topic, payload: handled.append((topic, payload)) or handleMessage(topic, payload)
+        for topic, payload in [("relay/0/power", "10"), ("relay/0", "on"), ("relay/0/power", "20"), ("relay/0", "off"), ("relay/0/power", "30")]:
+            self.mqtt.queueMessage(self.broker.id, "shellies", "shellies/test-shelly/" + topic, payload)
+        self.plugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+        self.plugin.processMessages()
+
+        expected = [
+            ("shellies/test-shelly/relay/0", "on"),
+            ("shellies/test-shelly/relay/0", "off"),
+            ("shellies/test-shelly/relay/0/power", "30")
+        ]
+        self.assertListEqual(expected, handled)
+        self.assertEqual("30", shelly.device.states['curEnergyLevel'])
+        self.assertFalse(shelly.device.states['onOffState'])
+        self.assertEqual(2, self.plugin.coalescedMessageCounts["shellies"])
+        self.assertEqual(0, len(self.plugin.pendingMessages))
+
+    def test_processMessages_dispatches_control_before_telemetry(self):
+        meter = self.createDevice(1, deviceTypeId="shelly-1pm", address="shellies/meter")
+        relay = self.createDevice(2, address="shellies/relay")
+        handled = []
+        for shelly in (meter, relay):
+            shelly.handleMessage = lambda topic, payload: handled.append(topic)
+        self.mqtt.queueMessage(self.broker.id, "shellies", "shellies/meter/relay/0/power", "10")
+        self.mqtt.queueMessage(self.broker.id, "shellies", "shellies/relay/input_event/0", '{"event": "S", "event_cnt": 1}')
+        self.plugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+        self.plugin.processMessages()
+
+        self.assertListEqual(["shellies/relay/input_event/0", "shellies/meter/relay/0/power"], handled)
+
+    def test_processMessages_batches_bursts_of_battery_devices(self):
+        shelly = self.createDevice(1, deviceTypeId="shelly-door-window", address="shellies/door")
+        shelly.device.pluginProps['useCase'] = "door"
+        for topic, payload in [("sensor/lux", "80"), ("sensor/tilt", "12"), ("sensor/battery", "95"), ("online", "true")]:
+            self.publish("shellies/door/" + topic, payload)
+        self.plugin.processMessages()
+        self.assertNotIn('lux', shelly.device.states)
+        self.assertEqual(1, len(self.plugin.bursts))
+
+        roundTrips = shelly.device.server_round_trips
+        with patch.object(self.plugin_module.time, 'monotonic', return_value=time.monotonic() + 1):
+            self.plugin.processMessages()
+
+        self.assertEqual("80", shelly.device.states['lux'])
+        self.assertEqual("12", shelly.device.states['tilt'])
+        self.assertEqual("95", shelly.device.states['batteryLevel'])
+        self.assertTrue(shelly.device.states['online'])
+        # A single write of the states and a single write of the state image
+        self.assertEqual(2, shelly.device.server_round_trips - roundTrips)
+        self.assertEqual(0, len(self.plugin.bursts))
+
+    def test_processMessages_alarm_bypasses_burst(self):
+        shelly = self.createDevice(1, deviceTypeId="shelly-door-window", address="shellies/door")
+        shelly.device.pluginProps['useCase'] = "door"
+        self.publish("shellies/door/sensor/lux", "80")
+        self.publish("shellies/door/sensor/state", "open")
+        self.plugin.processMessages()
+
+        self.assertFalse(shelly.device.states['onOffState'])
+        self.assertEqual("80", shelly.device.states['lux'])
+        self.assertEqual(0, len(self.plugin.bursts))
+
+    def test_processMessages_drops_burst_of_stopped_device(self):
+        shelly = self.createDevice(1, deviceTypeId="shelly-door-window", address="shellies/door")
+        shelly.device.pluginProps['useCase'] = "door"
+        self.publish("shellies/door/sensor/lux", "80")
+        self.plugin.processMessages()
+        self.plugin.deviceStopComm(shelly.device)
+
+        with patch.object(self.plugin_module.time, 'monotonic', return_value=time.monotonic() + 1):
+            self.plugin.processMessages()
+        self.assertNotIn('lux', shelly.device.states)
+
+    def test_processMessages_does_not_read_device_props(self):
+        shelly = self.createDevice(1)
+        shelly.device.pluginProps = UnreadableProps(shelly.device.pluginProps)
+        self.publish("shellies/test-shelly/relay/0", "on")
+        self.publish("shellies/test-shelly/input/0", "1")
+        self.plugin.processMessages()
+
+        self.assertTrue(shelly.device.states['onOffState'])
+        self.assertTrue(shelly.device.states['sw-input'])
+
+    def test_deviceStartComm_counts_shared_message_types(self):
+        self.createDevice(1)
+        self.createDevice(2, address="shellies/other-shelly")
+        self.assertEqual(2, self.plugin.messageTypes["shellies"])
+
+    def test_deviceStopComm_keeps_message_type_used_by_another_device(self):
+        first = self.createDevice(1)
+        self.createDevice(2, address="shellies/other-shelly")
+        self.plugin.deviceStopComm(first.device)
+
+        self.assertEqual(1, self.plugin.messageTypes["shellies"])
+        self.plugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+        self.assertFalse(self.plugin.messageQueue.empty())
+
+    def test_deviceStopComm_removes_unused_message_type(self):
+        first = self.createDevice(1)
+        second = self.createDevice(2, address="shellies/other-shelly")
+        self.plugin.deviceStopComm(first.device)
+        self.plugin.deviceStopComm(second.device)
+
+        self.assertNotIn("shellies", self.plugin.messageTypes)
+        self.plugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+        self.assertTrue(self.plugin.messageQueue.empty())
+
+    def test_message_handler_counts_accepted_and_ignored_messages(self):
+        self.createDevice(1)
+        for _ in range(3):
+            self.plugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+        for _ in range(2):
+            self.plugin.message_handler({'message_type': "other", 'brokerID': str(self.broker.id)})
+
+        self.assertEqual(3, self.plugin.acceptedMessageCounts["shellies"])
+        self.assertEqual(0, self.plugin.ignoredMessageCounts["shellies"])
+        self.assertEqual(0, self.plugin.acceptedMessageCounts["other"])
+        self.assertEqual(2, self.plugin.ignoredMessageCounts["other"])
+
+    def test_printMessageTypeStatistics(self):
+        self.createDevice(1)
+        self.plugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+        self.plugin.message_handler({'message_type': "other", 'brokerID': str(self.broker.id)})
+
+        with self.assertLogs('Plugin', level='INFO') as logs:
+            self.plugin.printMessageTypeStatistics()
+        self.assertRegex(logs.output[1], r"other\s+0\s+0\s+1\s+0$")
+        self.assertRegex(logs.output[2], r"shellies\s+1\s+1\s+0\s+0$")
+
+    def test_printStateUpdateStatistics(self):
+        shelly = self.createDevice(1)
+        shelly.updateStateOnServer('online', True)
+        shelly.updateStateOnServer('online', True)
+
+        with self.assertLogs('Plugin', level='INFO') as logs:
+            self.plugin.printStateUpdateStatistics()
+        self.assertRegex(logs.output[1], r"Device 1\s+1\s+1$")
+        self.assertRegex(logs.output[2], r"Total\s+1\s+1$")
+
+    def announces(self):
+        return [props['topic'] for props in self.mqtt.getMessagesOut(self.broker.id) if props['payload'] == "announce"]
+
+    def test_deviceStartComm_asks_broker_to_announce(self):
+        for i in range(1, 4):
+            self.createDevice(i, address="shellies/shelly-{}".format(i))
+        self.assertListEqual([], self.announces())
+
+        with patch.object(self.plugin_module.time, 'monotonic', return_value=time.monotonic() + 10):
+            self.plugin.runAnnouncer()
+        self.assertListEqual(["shellies/command"], self.announces())
+
+    def test_runAnnouncer_holds_device_lock(self):
+        self.createDevice(1)
+        locked = []
+
+        def getBrokerAddresses(brokerId):
+            # Another thread starting a device would have to wait
+            thread = threading.Thread(target=lambda: locked.append(not self.plugin.deviceLock.acquire(blocking=False)))
+            thread.start()
+            thread.join()
+            return set()
+
+        self.plugin.getBrokerAddresses = getBrokerAddresses
+        with patch.object(self.plugin_module.time, 'monotonic', return_value=time.monotonic() + 10):
+            self.plugin.runAnnouncer()
+        self.assertListEqual([True], locked)
+
+    def test_deviceStartComm_asks_restarted_device_to_announce(self):
+        shellies = [self.createDevice(i, address="shellies/shelly-{}".format(i)) for i in range(1, 4)]
+        with patch.object(self.plugin_module.time, 'monotonic', return_value=time.monotonic() + 10):
+            self.plugin.runAnnouncer()
+
+        self.plugin.deviceStopComm(shellies[0].device)
+        self.plugin.deviceStartComm(shellies[0].device)
+        with patch.object(self.plugin_module.time, 'monotonic', return_value=time.monotonic() + 20):
+            self.plugin.runAnnouncer()
+        self.assertListEqual(["shellies/command", "shellies/shelly-1/command"], self.announces())
+
+    def test_deviceStartComm_migrates_device_once(self):
+        shelly = self.createDevice(1)
+        self.assertEqual(self.plugin_module.kCurDevVersion, shelly.device.pluginProps['devVersCount'])
+        self.assertEqual(1, self.plugin.deviceVersionCounts['migrated'])
+
+        self.plugin.deviceStopComm(shelly.device)
+        roundTrips = shelly.device.server_round_trips
+        with patch.object(indigo.device, 'changeDeviceTypeId') as changeDeviceTypeId:
+            self.plugin.deviceStartComm(shelly.device)
+        changeDeviceTypeId.assert_not_called()
+        self.assertEqual(roundTrips, shelly.device.server_round_trips)
+        self.assertEqual(1, self.plugin.deviceVersionCounts['current'])
+
+    def test_deviceStartComm_logs_applied_migrations(self):
+        device = IndigoDevice(id=1, name="Migrated Device", deviceTypeId="shelly-1")
+        device.pluginProps.update({'broker-id': str(self.broker.id), 'address': "shellies/test-shelly", 'message-type': "shellies", 'devVersCount': 0})
+        indigo.devices[device.id] = device
+
+        with self.assertLogs('Plugin', level='DEBUG') as logs:
+            self.plugin.deviceStartComm(device)
+        self.assertIn("Migrated Device: Updated from version 0 to 1, applied migrations: 1", "\n".join(logs.output))
+
+    def test_printDeviceStartStatistics(self):
+        self.createDevice(1)
+        self.createDevice(2, address="shellies/other-shelly")
+
+        with self.assertLogs('Plugin', level='INFO') as logs:
+            self.plugin.printDeviceStartStatistics()
+        self.assertRegex(logs.output[1], r"Devices Started\s+2$")
+        self.assertRegex(logs.output[3], r"Migrated\s+2$")
+        self.assertRegex(logs.output[4], r"Startup Work Waiting\s+0$")
+        self.assertRegex(logs.output[7], r"create\s+2\s+[\d.]+\s+[\d.]+\s+[\d.]+$")
+
+    def test_deviceStartComm_defers_addon_start_to_plugin_thread(self):
+        indigo.activePlugin = self.plugin
+        self.createAddon(2, hostId=1)
+        self.createAddon(3, hostId=1)
+
+        device = IndigoDevice(id=1, name="Device 1", deviceTypeId="shelly-1")
+        device.pluginProps['broker-id'] = str(self.broker.id)
+        device.pluginProps['address'] = "shellies/test-shelly"
+        device.pluginProps['message-type'] = "shellies"
+        indigo.devices[device.id] = device
+        self.plugin.deviceStartComm(device)
+        self.assertIn(1, self.plugin.shellyDevices)
+        self.assertNotIn(2, self.plugin.shellyDevices)
+        self.assertFalse(self.plugin.messageQueue.empty())
+
+        self.plugin.runStartupTasks()
+        self.assertIn(2, self.plugin.shellyDevices)
+        self.assertIn(3, self.plugin.shellyDevices)
+        self.assertEqual(1, self.plugin.startupPhaseCounts['addons'])
+        self.assertEqual(2, self.plugin.startupPhaseCounts['address'])
+
+    def test_runStartupTasks_skips_addons_of_stopped_host(self):
+        indigo.activePlugin = self.plugin
+        host = self.createDevice(1)
+        self.createAddon(2, hostId=1)
+        self.plugin.deviceStopComm(host.device)
+
+        self.plugin.deviceStartComm(host.device)
+        self.plugin.deviceStopComm(host.device)
+        self.plugin.runStartupTasks()
+        self.assertNotIn(2, self.plugin.shellyDevices)
+        self.assertIn(2, self.plugin.dependents)
+
+    def test_reportStartup_reports_once_startup_has_settled(self):
+        self.createDevice(1)
+
+        with self.assertNoLogs('Plugin', level='INFO'):
+            self.plugin.reportStartup()
+        with patch.object(self.plugin_module.time, 'monotonic', return_value=time.monotonic() + 10):
+            with self.assertLogs('Plugin', level='INFO') as logs:
+                self.plugin.reportStartup()
+            self.assertEqual("INFO:Plugin:Started 1 devices", logs.output[0])
+            with self.assertNoLogs('Plugin', level='INFO'):
+                self.plugin.reportStartup()
+
+    def test_closedPrefsConfigUi_sets_state_refresh_interval(self):
+        self.plugin.closedPrefsConfigUi({'state-refresh-interval': "2"}, False)
+        self.assertEqual(120, self.plugin.stateRefreshInterval)
+
+    def test_validatePrefsConfigUi_invalid_state_refresh_interval(self):
+        isValid, valuesDict, errors = self.plugin.validatePrefsConfigUi({'state-refresh-interval': "-1"})
+        self.assertFalse(isValid)
+        self.assertIn('state-refresh-interval', errors)
+
+    def test_deviceStopComm_saves_last_input_event_id(self):
+        shelly = self.createDevice(1)
+        self.publish("shellies/test-shelly/input_event/0", '{"event": "S", "event_cnt": 7}')
+        self.plugin.processMessages()
+        self.assertNotIn('last-input-event-id', shelly.device.pluginProps)
+
+        self.plugin.deviceStopComm(shelly.device)
+        self.assertEqual(7, shelly.device.pluginProps['last-input-event-id'])
+
+    def test_shutdown_saves_last_input_event_id(self):
+        shelly = self.createDevice(1)
+        self.publish("shellies/test-shelly/input_event/0", '{"event": "S", "event_cnt": 7}')
+        self.plugin.processMessages()
+
+        self.plugin.shutdown()
+        self.assertEqual(7, shelly.device.pluginProps['last-input-event-id'])
+
+    def createTrigger(self, id, pluginTypeId, deviceId=None):
+        trigger = indigo.PluginEventTrigger()
+        trigger.id = id
+        trigger.pluginId = "com.lionsheeptechnology.ShellyMQTT"
+        trigger.pluginTypeId = pluginTypeId
+        trigger.pluginProps = {} if deviceId is None else {'device-id': str(deviceId)}
+        return trigger
+
+    def test_triggerStartProcessing_indexes_trigger(self):
+        trigger = self.createTrigger(1, "input-event-s", 10)
+        self.plugin.triggerStartProcessing(trigger)
+
+        self.assertListEqual([trigger], self.plugin.triggers.get("input-event-s", 10))
+
+    def test_triggerStopProcessing_removes_trigger(self):
+        trigger = self.createTrigger(1, "input-event-s", 10)
+        self.plugin.triggerStartProcessing(trigger)
+        self.plugin.triggerStopProcessing(trigger)
+
+        self.assertListEqual([], self.plugin.triggers.get("input-event-s", 10))
+
+    def test_triggerUpdated_moves_trigger_to_new_device(self):
+        origTrigger = self.createTrigger(1, "input-event-s", 10)
+        newTrigger = self.createTrigger(1, "input-event-s", 20)
+        self.plugin.triggerStartProcessing(origTrigger)
+        self.plugin.triggerUpdated(origTrigger, newTrigger)
+
+        self.assertListEqual([], self.plugin.triggers.get("input-event-s", 10))
+        self.assertListEqual([newTrigger], self.plugin.triggers.get("input-event-s", 20))
+
+    def test_deviceStartComm_indexes_device_identifier(self):
+        shelly = self.createDevice(1)
+        self.assertListEqual([shelly], self.plugin.getDevicesByIdentifier(self.broker.id, "test-shelly"))
+        self.assertListEqual([], self.plugin.getDevicesByIdentifier(2000, "test-shelly"))
+
+    def test_deviceStopComm_removes_device_identifier(self):
+        shelly = self.createDevice(1)
+        self.plugin.deviceStopComm(shelly.device)
+        self.assertListEqual([], self.plugin.getDevicesByIdentifier(self.broker.id, "test-shelly"))
+        self.assertEqual({}, self.plugin.deviceIdentifiers)
+
+    def test_getDevicesByIdentifier_matches_part_of_address(self):
+        shelly = self.createDevice(1, address="shellies/shelly1-ABC123-living-room")
+        self.assertListEqual([shelly], self.plugin.getDevicesByIdentifier(self.broker.id, "shelly1-ABC123"))
+        self.assertListEqual([], self.plugin.getDevicesByIdentifier(2000, "shelly1-ABC123"))
+
+    def test_getDevicesByIdentifier_only_searches_unindexed_devices(self):
+        shelly = self.createDevice(1, address="shellies/living-room/shelly1-ABC123")
+        self.createDevice(2, address="shellies/shelly1-DEF456")
+        self.assertListEqual([shelly], self.plugin.getDevicesByIdentifier(self.broker.id, "shelly1-ABC123"))
+        self.assertListEqual([], self.plugin.getDevicesByIdentifier(self.broker.id, "DEF456"))
+        self.assertDictEqual({}, self.plugin.unindexedDevices)
+
+    def test_deviceStopComm_removes_unindexed_device(self):
+        shelly = self.createDevice(1, address="shellies/living-room")
+        self.assertIn(1, self.plugin.unindexedDevices[self.broker.id])
+        self.plugin.deviceStopComm(shelly.device)
+        self.assertDictEqual({}, self.plugin.unindexedDevices)
+
+    def test_deviceUpdated_reindexes_device_identifier(self):
+        shelly = self.createDevice(1)
+        origDev = IndigoDevice(id=1, name="Device 1", deviceTypeId="shelly-1")
+        origDev.pluginProps.update(shelly.device.pluginProps)
+        shelly.device.pluginProps['address'] = "shellies/new-shelly"
+        self.plugin.deviceUpdated(origDev, shelly.device)
+
+        shelly = self.plugin.shellyDevices[1]
+        self.assertNotIn((self.broker.id, "test-shelly"), self.plugin.deviceIdentifiers)
+        self.assertListEqual([shelly], self.plugin.getDevicesByIdentifier(self.broker.id, "new-shelly"))
+
+    def test_processAnnouncement_known_device(self):
+        self.createDevice(1)
+        self.plugin.discoveredDevices[self.broker.id] = {"test-shelly": {}}
+        self.plugin.processAnnouncement(self.broker.id, {"id": "test-shelly", "ip": "192.168.1.100"})
+        self.assertNotIn("test-shelly", self.plugin.discoveredDevices[self.broker.id])
+
+    def test_processAnnouncement_unknown_device(self):
+        self.createDevice(1)
+        self.plugin.processAnnouncement(self.broker.id, {"id": "other-shelly", "ip": "192.168.1.101"})
+        self.assertIn("other-shelly", self.plugin.discoveredDevices[self.broker.id])
+
+    def test_announce_is_only_handled_by_the_announced_device(self):
+        shelly = self.createDevice(1)
+        other = self.createDevice(2, address="shellies/other-shelly")
+        with patch.object(other, 'handleMessage') as otherHandleMessage:
+            self.publish("shellies/announce", '{"id": "test-shelly", "mac": "aa:bb", "ip": "192.168.1.100", "fw_ver": "1.0", "new_fw": false}')
+            self.plugin.processMessages()
+
+        self.assertEqual("192.168.1.100", shelly.device.states['ip-address'])
+        otherHandleMessage.assert_not_called()
+
+    def test_announce_is_decoded_once(self):
+        self.createDevice(1)
+        self.createDevice(2, address="shellies/living-room/test-shelly")
+        self.publish("shellies/announce", '{"id": "test-shelly", "mac": "aa:bb", "ip": "192.168.1.100", "fw_ver": "1.0", "new_fw": false}')
+        with patch('json.loads', wraps=json.loads) as loads:
+            self.plugin.processMessages()
+
+        loads.assert_called_once()
+        for shelly in self.plugin.shellyDevices.values():
+            self.assertEqual("192.168.1.100", shelly.device.states['ip-address'])
+
+    def test_sensor_readings_are_decoded_once_for_host_and_addons(self):
+        indigo.activePlugin = self.plugin
+        host = self.createDevice(1)
+        addons = []
+        for i, hwId in enumerate(["AAAAAAAA", "BBBBBBBB", "CCCCCCCC"]):
+            device = self.createAddon(2 + i, hostId=1)
+            device.pluginProps['probe-number'] = hwId
+            device.pluginProps['temp-units'] = "C->F"
+            self.plugin.shellyDevices[device.id].refresh_device()
+            addons.append(device)
+
+        self.publish("shellies/test-shelly/ext_temperatures", '{"0":{"hwID":"AAAAAAAA","tC":10},"1":{"hwID":"BBBBBBBB","tC":20},"2":{"hwID":"CCCCCCCC","tC":30}}')
+        with patch('json.loads', wraps=json.loads) as loads:
+            self.plugin.processMessages()
+
+        loads.assert_called_once()
+        self.assertEqual(3, len(host.temperature_sensors))
+        self.assertListEqual([50, 68, 86], [device.states['temperature'] for device in addons])
+
+    def test_announce_for_other_message_type_is_not_handled(self):
+        shelly = self.createDevice(1, message_type="other")
+        self.publish("shellies/announce", '{"id": "test-shelly", "ip": "192.168.1.100"}')
+        self.plugin.processMessages()
+
+        self.assertNotIn('ip-address', shelly.device.states)
+
+    def test_announce_invalid_json(self):
+        self.createDevice(1)
+        self.publish("shellies/announce", '{"id": "test-')
+        with self.assertLogs('Plugin', level='ERROR'):
+            self.plugin.processMessages()
+
+    def test_message_handler_ignores_unknown_message_types(self):
+        self.createDevice(1)
+        self.plugin.message_handler({'message_type': "other", 'brokerID': str(self.broker.id)})
+        self.assertTrue(self.plugin.messageQueue.empty())
+
+    def test_message_handler_queues_known_message_types(self):
+        self.createDevice(1)
+        self.plugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+        self.assertFalse(self.plugin.messageQueue.empty())
+
+    def test_message_handler_only_looks_up_broker_when_debugging(self):
+        self.createDevice(1)
+        with patch.object(self.plugin, 'getBrokerName') as getBrokerName:
+            self.plugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+        getBrokerName.assert_not_called()
+
+        self.plugin.setLogLevel("debug")
+        with self.assertLogs('Plugin', level='DEBUG') as logs:
+            self.plugin.message_handler({'message_type': "shellies", 'brokerID': str(self.broker.id)})
+        self.assertIn("Queued MQTT message type shellies from Broker", logs.output[-1])
+
+    def test_getBrokerName_caches_names(self):
+        self.assertEqual("Broker", self.plugin.getBrokerName(self.broker.id))
+        self.broker.name = "Renamed Broker"
+        self.assertEqual("Broker", self.plugin.getBrokerName(self.broker.id))
+        self.plugin.brokerNames.clear()
+        self.assertEqual("Renamed Broker", self.plugin.getBrokerName(self.broker.id))
+
+    def test_processMessages_delivers_to_device(self):
+        shelly = self.createDevice(1)
+        self.publish("shellies/test-shelly/relay/0", "on")
+        self.plugin.processMessages()
+        self.assertTrue(shelly.device.states['onOffState'])
+
+    def test_processMessages_returns_when_queue_is_empty(self):
+        start = time.perf_counter()
+        self.plugin.processMessages()
+        self.assertLess(time.perf_counter() - start, 0.05)
+
+    def test_processMessages_blocks_until_message_is_queued(self):
+        shelly = self.createDevice(1)
+        timer = threading.Timer(0.05, self.publish, args=("shellies/test-shelly/relay/0", "on"))
+        timer.start()
+        self.plugin.processMessages(timeout=5)
+        timer.join()
+        self.assertTrue(shelly.device.states['onOffState'])
+
+    def test_processMessages_times_out(self):
+        start = time.perf_counter()
+        self.plugin.processMessages(timeout=0.05)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    def test_processMessages_coalesces_repeated_notifications(self):
+        shelly = self.createDevice(1)
+        for i in range(10):
+            self.publish("shellies/test-shelly/relay/0", "on" if i % 2 else "off")
+        self.plugin.processMessages()
+
+        self.assertTrue(shelly.device.states['onOffState'])
+        self.assertEqual(11, self.mqtt.getActionCount("fetchQueuedMessage"))
+        self.assertTrue(self.plugin.messageQueue.empty())
+
+    def test_processMessages_fetches_each_broker_and_message_type(self):
+        shelly = self.createDevice(1)
+        other = self.createDevice(2, address="other/test-shelly", message_type="other")
+        self.publish("shellies/test-shelly/relay/0", "on")
+        self.publish("other/test-shelly/relay/0", "on", message_type="other")
+        self.publish("shellies/test-shelly/relay/0", "on")
+        self.plugin.processMessages()
+
+        self.assertTrue(shelly.device.states['onOffState'])
+        self.assertTrue(other.device.states['onOffState'])
+        self.assertEqual(5, self.mqtt.getActionCount("fetchQueuedMessage"))
+
+    def test_processMessages_without_batching_fetches_per_notification(self):
+        self.plugin.pluginPrefs['batch-message-fetching'] = False
+        shelly = self.createDevice(1)
+        for i in range(10):
+            self.publish("shellies/test-shelly/relay/0", "on" if i % 2 else "off")
+        self.plugin.processMessages()
+
+        self.assertTrue(shelly.device.states['onOffState'])
+        self.assertEqual(20, self.mqtt.getActionCount("fetchQueuedMessage"))
+
+    def test_processMessages_leaves_notifications_after_stop_sentinel(self):
+        self.createDevice(1)
+        self.publish("shellies/test-shelly/relay/0", "on")
+        self.plugin.messageQueue.put(None)
+        self.publish("shellies/test-shelly/relay/0", "off")
+        self.plugin.processMessages()
+
+        self.assertFalse(self.plugin.messageQueue.empty())
+
+    def test_stopConcurrentThread_wakes_message_pump(self):
+        thread = threading.Thread(target=self.plugin.runConcurrentThread)
+        thread.start()
+        time.sleep(0.05)
+        self.assertTrue(thread.is_alive())
+
+        self.plugin.stopConcurrentThread()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    def test_runConcurrentThread_processes_messages(self):
+        shelly = self.createDevice(1)
+        thread = threading.Thread(target=self.plugin.runConcurrentThread)
+        thread.start()
+
+        self.publish("shellies/test-shelly/relay/0", "on")
+        for _ in range(100):
+            if shelly.device.states['onOffState']:
+                break
+            time.sleep(0.01)
+
+        self.plugin.stopConcurrentThread()
+        thread.join(1)
+        self.assertTrue(shelly.device.states['onOffState'])
@@ -1,241 +1,35 @@
 import indigo
-import json
 import os
+import re
+import time
 
 from Devices.Shelly import Shelly
-
-# Import the relay devices
-from Devices.Relays.Shelly_1 import Shelly_1
-from Devices.Relays.Shelly_1PM import Shelly_1PM
-from Devices.Relays.Shelly_2_5_Relay import Shelly_2_5_Relay
-from Devices.Relays.Shelly_4_Pro import Shelly_4_Pro
-from Devices.Relays.Shelly_EM_Relay import Shelly_EM_Relay
-from Devices.Relays.Shelly_Uni_Relay import Shelly_Uni_Relay
-
-from Devices.Shelly_Dimmer_SL import Shelly_Dimmer_SL
-from Devices.Shelly_TRV import Shelly_TRV
-
-# Import the RGBW2 devices
-from Devices.RGBW2.Shelly_RGBW2_White import Shelly_RGBW2_White
-from Devices.RGBW2.Shelly_RGBW2_Color import Shelly_RGBW2_Color
-
-# Import the sensor devices
-from Devices.Sensors.Shelly_HT import Shelly_HT
-from Devices.Sensors.Shelly_Flood import Shelly_Flood
-from Devices.Sensors.Shelly_Door_Window import Shelly_Door_Window
-from Devices.Sensors.Shelly_EM_Meter import Shelly_EM_Meter
-from Devices.Sensors.Shelly_3EM_Meter import Shelly_3EM_Meter
-from Devices.Sensors.Shelly_i3 import Shelly_i3
-from Devices.Sensors.Shelly_Button1 import Shelly_Button1
-from Devices.Sensors.Shelly_Gas import Shelly_Gas
-from Devices.Sensors.Shelly_Uni_Input import Shelly_Uni_Input
-from Devices.Sensors.Shelly_Motion import Shelly_Motion
-from Devices.Sensors.Shelly_Motion_2 import Shelly_Motion_2
-
-# Import the bulb devices
-from Devices.Bulbs.Shelly_Bulb import Shelly_Bulb
-from Devices.Bulbs.Shelly_Bulb_Vintage import Shelly_Bulb_Vintage
-from Devices.Bulbs.Shelly_Bulb_Duo import Shelly_Bulb_Duo
-
-# Import the plug devices
-from Devices.Plugs.Shelly_Plug import Shelly_Plug
-from Devices.Plugs.Shelly_Plug_S import Shelly_Plug_S
-
-# Import the add-on devices
-from Devices.Addons.Shelly_Addon_DS1820 import Shelly_Addon_DS1820
-from Devices.Addons.Shelly_Addon_DHT22 import Shelly_Addon_DHT22
-from Devices.Addons.Shelly_Addon_Detached_Switch import Shelly_Addon_Detached_Switch
-
-from queue import Queue
+from Devices.ShellyAnnouncer import ShellyAnnouncer
+from Devices.ShellyBursts import ShellyBursts
+from Devices.ShellyDeviceTypes import getDeviceClass, getRelatedDeviceTypes
+from Devices.ShellyMessageQueue import ShellyMessageQueue
+from Devices.ShellyMigrations import kCurDevVersion, getDeviceVersion, migrateDevice
+from Devices.ShellyPayload import ShellyPayload
+from Devices.ShellySubscriptions import ShellySubscriptions
+from Devices.ShellyTriggers import ShellyTriggers
+from Devices.ShellyWorkers import ShellyWorkers
+
+from queue import Queue, Empty
+from collections import Counter
+from contextlib import contextmanager
+import threading
 import logging
 
-kCurDevVersion = 0  # current version of plugin devices
-
-# Maps each device type to a python class for the device
-deviceClasses = {
-    # Relay devices
-    "shelly-1": Shelly_1,
-    "shelly-1pm": Shelly_1PM,
-    "shelly-2-5-relay": Shelly_2_5_Relay,
-    "shelly-4-pro": Shelly_4_Pro,
-    "shelly-em-relay": Shelly_EM_Relay,
-
-    # RGBW2 devices
-    "shelly-rgbw2-white": Shelly_RGBW2_White,
-    "shelly-rgbw2-color": Shelly_RGBW2_Color,
-
-    # Sensor devices
-    "shelly-ht": Shelly_HT,
-    "shelly-flood": Shelly_Flood,
-    "shelly-door-window": Shelly_Door_Window,
-    "shelly-em-meter": Shelly_EM_Meter,
-    "shelly-3em-meter": Shelly_3EM_Meter,
-    "shelly-i3": Shelly_i3,
-    "shelly-button1": Shelly_Button1,
-    "shelly-gas": Shelly_Gas,
-    "shelly-motion": Shelly_Motion,
-    "shelly-motion-2": Shelly_Motion_2,
-
-    # Bulb devices
-    "shelly-bulb": Shelly_Bulb,
-    "shelly-bulb-vintage": Shelly_Bulb_Vintage,
-    "shelly-bulb-duo": Shelly_Bulb_Duo,
-
-    # Plug devices
-    "shelly-plug": Shelly_Plug,
-    "shelly-plug-s": Shelly_Plug_S,
-
-    # Add-on devices
-    "shelly-addon-ds1820": Shelly_Addon_DS1820,
-    "shelly-addon-dht22": Shelly_Addon_DHT22,
-    "shelly-addon-detached-switch": Shelly_Addon_Detached_Switch,
-
-    # Shelly Dimmer
-    "shelly-dimmer-sl": Shelly_Dimmer_SL,
-
-    # Shelly TRV
-    "shelly-trv": Shelly_TRV,
-
-    # Shelly Uni
-    "shelly-uni-relay": Shelly_Uni_Relay,
-    "shelly-uni-input": Shelly_Uni_Input
-}
-
-deviceModelInformation = {
-    # Relay devices
-    "shelly-1": {
-        "class": Shelly_1,
-        "relations": []
-    },
-    "shelly-1pm": {
-        "class": Shelly_1PM,
-        "relations": []
-    },
-    "shelly-2-5-relay": {
-        "class": Shelly_2_5_Relay,
-        "relations": [Shelly_2_5_Relay]
-    },
-    "shelly-4-pro": {
-        "class": Shelly_4_Pro,
-        "relations": [Shelly_4_Pro]
-    },
-    "shelly-em-relay": {
-        "class": Shelly_EM_Relay,
-        "relations": [Shelly_EM_Meter, Shelly_3EM_Meter]
-    },
-
-    # RGBW2 devices
-    "shelly-rgbw2-white": {
-        "class": Shelly_RGBW2_White,
-        "relations": [Shelly_RGBW2_White]
-    },
-    "shelly-rgbw2-color": {
-        "class": Shelly_RGBW2_Color,
-        "relations": []
-    },
-
-    # Sensor devices
-    "shelly-ht": {
-        "class": Shelly_HT,
-        "relations": []
-    },
-    "shelly-flood": {
-        "class": Shelly_Flood,
-        "relations": []
-    },
-    "shelly-door-window": {
-        "class": Shelly_Door_Window,
-        "relations": []
-    },
-    "shelly-em-meter": {
-        "class": Shelly_EM_Meter,
-        "relations": [Shelly_EM_Meter, Shelly_EM_Relay]
-    },
-    "shelly-3em-meter": {
-        "class": Shelly_3EM_Meter,
-        "relations": [Shelly_3EM_Meter, Shelly_EM_Relay]
-    },
-    "shelly-i3": {
-        "class": Shelly_i3,
-        "relations": [Shelly_i3]
-    },
-    "shelly-button1": {
-        "class": Shelly_Button1,
-        "relations": []
-    },
-    "shelly-gas": {
-        "class": Shelly_Gas,
-        "relations": []
-    },
-    "shelly-motion": {
-        "class": Shelly_Motion,
-        "relations": []
-    },
-    "shelly-motion-2": {
-        "class": Shelly_Motion_2,
-        "relations": []
-    },
-
-    # Bulb devices
-    "shelly-bulb": {
-        "class": Shelly_Bulb,
-        "relations": []
-    },
-    "shelly-bulb-vintage": {
-        "class": Shelly_Bulb_Vintage,
-        "relations": []
-    },
-    "shelly-bulb-duo": {
-        "class": Shelly_Bulb_Duo,
-        "relations": []
-    },
-
-    # Plug devices
-    "shelly-plug": {
-        "class": Shelly_Plug,
-        "relations": []
-    },
-    "shelly-plug-s": {
-        "class": Shelly_Plug_S,
-        "relations": []
-    },
-
-    # Add-on devices
-    "shelly-addon-ds1820": {
-        "class": Shelly_Addon_DS1820,
-        "relations": []
-    },
-    "shelly-addon-dht22": {
-        "class": Shelly_Addon_DHT22,
-        "relations": []
-    },
-    "shelly-addon-detached-switch": {
-        "class": Shelly_Addon_Detached_Switch,
-        "relations": []
-    },
-
-    # Shelly Dimmer
-    "shelly-dimmer-sl": {
-        "class": Shelly_Dimmer_SL,
-        "relations": []
-    },
-
-    # Shelly TRV
-    "shelly-trv": {
-        "class": Shelly_TRV,
-        "relations": []
-    },
-
-    # Shelly Uni
-    "shelly-uni-relay": {
-        "class": Shelly_Uni_Relay,
-        "relations": [Shelly_Uni_Relay, Shelly_Uni_Input]
-    },
-    "shelly-uni-input": {
-        "class": Shelly_Uni_Input,
-        "relations": [Shelly_Uni_Input, Shelly_Uni_Relay]
-    }
-}
+kMessagePumpTimeout = 5  # seconds the message pump waits for a message before checking on the MQTT Connector
+kPropsWriteBehindInterval = 60  # seconds between writes of the device props that are kept in memory
+kSampleFlushInterval = 5  # seconds between writes of the sampled states whose sampling interval has passed
+kStartupPhases = ("migrate", "create", "register", "addons", "address")  # the phases of starting a device, in order
+kStartupReportDelay = 10  # seconds without a device starting before the startup timings are reported
+kAnnounceSettleTime = 2  # seconds without a device starting on a broker before its devices are asked to announce
+kAnnounceBroadcastRatio = 0.5  # share of the devices on a broker that must be starting to ask the whole broker to announce
+kAnnounceInterval = 0.2  # average seconds between the announce commands sent to single devices
+kTelemetryStarvationLimit = 50  # control messages dispatched in a row before a waiting telemetry message
+kShellyIdPattern = re.compile(r"^[A-Za-z0-9]+(-[A-Za-z0-9]+)*-([0-9A-Fa-f]{6}){1,2}$")  # the id that a device announces, such as shelly1-ABC123
 
 
 class Plugin(indigo.PluginBase):
@@ -246,6 +40,8 @@ class Plugin(indigo.PluginBase):
         # self.debug = pluginPrefs.get("debugMode", False)
         self.setLogLevel(pluginPrefs.get('log-level', "info"))
         self.lowBatteryThreshold = pluginPrefs.get("low-battery-threshold", 20)
+        # Unchanged device states are written again after this many seconds
+        self.stateRefreshInterval = int(pluginPrefs.get("state-refresh-interval", 10)) * 60
 
         # {
         #   devId: <Indigo device id>,
@@ -262,16 +58,44 @@ class Plugin(indigo.PluginBase):
         self.dependents = {}
 
         # {
-        #   <brokerId>: {
-        #       'some/topic': [dev1, dev2, dev3],
-        #       'another/topic': [dev1, dev4, dev5]
+        #   hostId: {
+        #       addonId: <Shelly object>
+        #   }
+        # }
+        # This is used to find the add-ons of a host, both running and waiting in dependents for
+        # the host to start.
+        self.hostAddons = {}
+        # {
+        #   addonId: hostId
+        # }
+        self.addonHostIds = {}
+
+        # The devices listening to each topic on each broker
+        # NOTE: Stopped subscribing to individual topics in 0.2.4, so the subscriptions are only
+        # tracked and are not sent to the brokers
+        self.subscriptions = ShellySubscriptions()
+        self.subscriptions.connectorFix = pluginPrefs.get('connector-fix', False)
+
+        # {
+        #   (<brokerId>, 'shelly1-ABC123'): {
+        #       devId: <Shelly object>
         #   }
-        #   <anotherBroker>: {
-        #       'some/topic': [dev6, dev7],
-        #       'another/unique/topic': [dev7, dev8, dev9]
+        # }
+        # This is used to find the devices that an announcement belongs to. The identifier is the
+        # last part of the device address, which is what a device announces as its id.
+        self.deviceIdentifiers = {}
+        # {
+        #   devId: (<brokerId>, 'shelly1-ABC123')
+        # }
+        self.deviceIdentifierKeys = {}
+        # {
+        #   <brokerId>: {
+        #       devId: <Shelly object>
         #   }
         # }
-        self.brokerDeviceSubscriptions = {}
+        # The devices whose address does not end in a device id, such as shellies/living-room. These
+        # are the only devices that an announcement is searched for when its id is not in the index.
+        self.unindexedDevices = {}
 
         # {
         #     <brokerId>: {
@@ -281,11 +105,42 @@ class Plugin(indigo.PluginBase):
         # This is used to store the latest announcement message for each device that
         # has broadcast on a broker
         self.discoveredDevices = {}
-        self.triggers = {}
-        self.messageTypes = []
+        # The running ShellyMQTT triggers, indexed by event type and device
+        self.triggers = ShellyTriggers()
+        # Reference counts of the message types that started devices accept
+        self.messageTypes = Counter()
+        # The number of broadcasts from MQTT Connector that were queued or ignored for each message type
+        self.acceptedMessageCounts = Counter()
+        self.ignoredMessageCounts = Counter()
+        # The number of telemetry messages of each message type that were replaced by a newer message
+        self.coalescedMessageCounts = Counter()
+        # The names of the brokers that have been logged, by device id
+        self.brokerNames = {}
+        # The number of devices that were migrated or were already up to date when they started
+        self.deviceVersionCounts = Counter()
+        # Starting and stopping devices is serialized between the Indigo callbacks and the plugin thread
+        self.deviceLock = threading.RLock()
+        # The startup work that is done by the plugin thread, as (phase, function, args) tuples
+        self.startupTasks = Queue()
+        # The number of times each startup phase ran, and the total and longest seconds it took
+        self.startupPhaseCounts = Counter()
+        self.startupPhaseTimes = Counter()
+        self.startupPhaseMaxTimes = Counter()
+        self.lastDeviceStart = None
+        self.startupReported = False
         self.discoveredMessageTypes = []
         self.messageQueue = Queue()
+        # The fetched messages waiting to be dispatched, with control messages ahead of telemetry
+        self.pendingMessages = ShellyMessageQueue(kTelemetryStarvationLimit)
+        # The bursts of battery devices that are waiting to settle
+        self.bursts = ShellyBursts()
+        # The announce commands waiting to be sent to the devices that started
+        self.announcer = ShellyAnnouncer(kAnnounceSettleTime, kAnnounceBroadcastRatio, kAnnounceInterval)
         self.mqttPlugin = indigo.server.getPlugin("com.flyingdiver.indigoplugin.mqtt")
+        # The threads that handle device messages, or None to handle them on the concurrent thread
+        # The pool is (re)built by processMessages when the configured size changes
+        self.messageWorkerCount = int(pluginPrefs.get('message-workers', 0))
+        self.messageWorkers = None
 
     def startup(self):
         """
@@ -316,27 +171,90 @@ class Plugin(indigo.PluginBase):
         :return: None
         """
 
+        self.saveDeviceProps()
+        if self.messageWorkers:
+            self.messageWorkers.stop()
+            self.messageWorkers = None
         self.logger.info(u"Stopped ShellyMQTT...")
 
     def runConcurrentThread(self):
         """
         Main work thread where messages are continually dequeued and processed.
+        The thread blocks on the message queue, so it only wakes up when message_handler
+        has queued a message or when the plugin is stopping.
 
         :return: None
         """
 
+        nextPropsWrite = time.monotonic() + kPropsWriteBehindInterval
+        nextSampleFlush = time.monotonic() + kSampleFlushInterval
         try:
             while True:
                 if not self.mqttPlugin.isEnabled():
                     self.logger.error(u"MQTT Connector plugin not enabled, aborting.")
                     self.sleep(60)
                 else:
-                    self.processMessages()
-                    self.sleep(0.1)
+                    self.runStartupTasks()
+                    self.reportStartup()
+                    self.runAnnouncer()
+                    timeout = kMessagePumpTimeout
+                    deadline = self.announcer.getNextDeadline()
+                    if deadline is not None:
+                        timeout = max(0, min(timeout, deadline - time.monotonic()))
+                    self.processMessages(timeout=timeout)
+
+                if time.monotonic() >= nextSampleFlush:
+                    self.flushSampledStates()
+                    nextSampleFlush = time.monotonic() + kSampleFlushInterval
+
+                if time.monotonic() >= nextPropsWrite:
+                    self.saveDeviceProps()
+                    self.subscriptions.flush()
+                    # Pick up brokers that have been renamed
+                    self.brokerNames.clear()
+                    nextPropsWrite = time.monotonic() + kPropsWriteBehindInterval
+
+                if self.stopThread:
+                    raise self.StopThread()
 
         except self.StopThread:
             pass
 
+    def saveDeviceProps(self):
+        """
+        Writes the device props that are kept in memory, such as the last input event identifier, to the server.
+
+        :return: None
+        """
+
+        for shelly in list(self.shellyDevices.values()):
+            # Saved after the messages of the device that are still being handled
+            self.submitDeviceWork(shelly, shelly.saveLastInputEventId)
+
+    def flushSampledStates(self):
+        """
+        Writes the sampled states of the devices whose sampling interval has passed, so that the last
+        readings are written even when a device stops reporting.
+
+        :return: None
+        """
+
+        for shelly in list(self.shellyDevices.values()):
+            if shelly.sampledStates:
+                # Flushed after the readings of the device that are still being handled
+                self.submitDeviceWork(shelly, shelly.flushSampledStates)
+
+    def stopConcurrentThread(self):
+        """
+        Called by Indigo when the concurrent thread should stop. An empty message is queued
+        to wake up the message pump so that the thread can exit right away.
+
+        :return: None
+        """
+
+        super(Plugin, self).stopConcurrentThread()
+        self.messageQueue.put(None)
+
     ##########################################################################
     #
     # MARK: Devices
@@ -345,31 +263,42 @@ class Plugin(indigo.PluginBase):
 
     def deviceStartComm(self, device):
         """
-        Handles processes for starting a device. This will check dependencies, validate configurations,
-        subscribe to topics, and add message handlers.
+        Handles processes for starting a device. Only the work that is needed to pass messages to
+        the device is done here, and the rest is queued for the plugin thread, so that Indigo can
+        move on to starting the next device.
 
         :param device: The device that is starting
         :return: True or false to indicate if the device was started.
         """
 
-        instance_vers = int(device.pluginProps.get('devVersCount', 0))
-        if instance_vers < kCurDevVersion or kCurDevVersion == 0:
-            device = indigo.device.changeDeviceTypeId(device, device.deviceTypeId)
-            device.replaceOnServer()
-            new_props = device.pluginProps
-            new_props["devVersCount"] = kCurDevVersion
-            device.replacePluginPropsOnServer(new_props)
-            device.stateListOrDisplayStateIdChanged()
-            self.logger.debug(u"%s: Updated to version %s", device.name, kCurDevVersion)
-        elif instance_vers >= kCurDevVersion:
-            self.logger.debug(u"{}: Device Version is up to date".format(device.name))
+        with self.deviceLock:
+            self.lastDeviceStart = time.monotonic()
+            return self.startDevice(device)
+
+    def startDevice(self, device):
+        """
+        Starts a device. This will check dependencies, validate configurations, subscribe to topics,
+        and add message handlers. The caller must hold the device lock.
+
+        :param device: The device that is starting
+        :return: True or false to indicate if the device was started.
+        """
+
+        instance_vers = getDeviceVersion(device)
+        if instance_vers < kCurDevVersion:
+            with self.startupPhase('migrate'):
+                device, applied = migrateDevice(device)
+            self.deviceVersionCounts['migrated'] += 1
+            self.logger.debug(u"%s: Updated from version %s to %s, applied migrations: %s", device.name, instance_vers, kCurDevVersion, ", ".join(str(version) for version in applied))
         else:
-            self.logger.error(u"%s: Unknown device version: %s", device.name, instance_vers)
+            self.deviceVersionCounts['current'] += 1
+            self.logger.debug(u"%s: Device Version is up to date", device.name)
 
         #
         # Get or generate a Shelly device
         #
-        shelly = self.createDeviceObject(device)
+        with self.startupPhase('create'):
+            shelly = self.createDeviceObject(device)
         if not shelly:
             # The device is not dependent on a device and was not able to be created...
             self.logger.error(u"\"{}\" has an unknown deviceTypeId of: \"{}\"!".format(device.name, device.deviceTypeId))
@@ -387,13 +316,15 @@ class Plugin(indigo.PluginBase):
                     # This device has already been attempted to be started, so it must not have a host defined
                     self.logger.error(u"{} is not properly setup! Check the device host.".format(device.name))
                     del self.dependents[device.id]
+                    self.removeAddon(shelly)
                     return False
                 else:
                     # Could not get a host, but this is the first time the device is starting
                     # Add it to the known device list and stop attempting startup
                     # The host will attempt to start any of its addons
                     self.dependents[device.id] = shelly
-                    self.logger.debug(u"{} is queued to be started after the host starts".format(shelly.device.name))
+                    self.addAddon(shelly)
+                    self.logger.debug(u"%s is queued to be started after the host starts", shelly.device.name)
                     return False
 
         self.logger.info(u"Starting \"%s\"...", device.name)
@@ -405,6 +336,7 @@ class Plugin(indigo.PluginBase):
             # Ensure the device has a broker and address
             self.logger.error(u"brokerId: \"{}\" address: \"{}\"".format(shelly.getBrokerId(), shelly.getAddress()))
             self.logger.error(u"\"{}\" is not properly setup! Check the broker and topic root.".format(device.name))
+            self.removeAddon(shelly)
             return False
 
         #
@@ -412,28 +344,110 @@ class Plugin(indigo.PluginBase):
         #
         # NOTE: Stopped subscribing to individual topics in 0.2.4
         # shelly.subscribe()
-        self.addDeviceSubscriptions(shelly)
-        self.shellyDevices[device.id] = shelly
-        self.messageTypes.append(shelly.getMessageType())
-        if shelly.getAnnounceMessageType():
-            self.messageTypes.append(shelly.getAnnounceMessageType())
+        with self.startupPhase('register'):
+            self.addDeviceSubscriptions(shelly)
+            self.addDeviceIdentifier(shelly)
+            shelly.compileTopicHandlers()
+            self.shellyDevices[device.id] = shelly
+            for message_type in shelly.getMessageTypes():
+                self.messageTypes[message_type] += 1
+            if shelly.isAddon():
+                self.addAddon(shelly)
 
-        # Force the device to announce itself to gather the latest device information
-        shelly.announce()
+            # Ask the device to announce itself to gather the latest device information
+            self.announcer.request(shelly.getBrokerId(), shelly.getAddress(), time.monotonic())
 
-        #
-        # Attempt to start any addon devices that this device hosts
-        #
-        for dependentId in list(self.dependents.keys()):
-            addon = self.dependents.get(dependentId)
-            if addon and addon.isAddon() and addon.getHostDevice() and addon.getHostDevice().device.id == shelly.device.id:
-                # This addon is hosted by the device that has just been started, so it must have failed startup before
-                del self.dependents[dependentId]
-                self.deviceStartComm(indigo.devices[dependentId])
+        # Attempt to start any addon devices that this device hosts once it has started
+        if self.getAddons(shelly.device.id):
+            self.queueStartupTask('addons', self.startPendingAddons, shelly)
 
         # If this is an addon, get the latest data for the address column
         if shelly.isAddon():
-            shelly.refreshAddressColumn()
+            self.queueStartupTask('address', self.refreshAddressColumn, shelly)
+
+    def startPendingAddons(self, host):
+        """
+        Starts the add-ons of a host that could not start before the host was running.
+
+        :param host: The Shelly object of the host.
+        :return: None
+        """
+
+        if self.shellyDevices.get(host.device.id, None) is not host:
+            # The host stopped again before its add-ons were started
+            return
+
+        for addon in self.getAddons(host.device.id):
+            if addon.device.id in self.dependents:
+                # This addon is hosted by the device that has just been started, so it must have failed startup before
+                del self.dependents[addon.device.id]
+                self.startDevice(indigo.devices[addon.device.id])
+
+    def refreshAddressColumn(self, addon):
+        """
+        Refreshes the address column of an add-on that is still running.
+
+        :param addon: The Shelly object of the add-on.
+        :return: None
+        """
+
+        if self.shellyDevices.get(addon.device.id, None) is addon:
+            addon.refreshAddressColumn()
+
+    def queueStartupTask(self, phase, function, *args):
+        """
+        Queues startup work that a device does not need before it can handle messages, and wakes
+        up the plugin thread to do it.
+
+        :param phase: The name of the startup phase that the work is timed under.
+        :param function: The function to call.
+        :param args: The arguments to call the function with.
+        :return: None
+        """
+
+        self.startupTasks.put((phase, function, args))
+        # An empty message wakes up the message pump, as it does when the thread is stopping
+        self.messageQueue.put(None)
+
+    def runStartupTasks(self):
+        """
+        Does the queued startup work. The work is done in the order it was queued, so the add-ons
+        of a host are started after the host, and an add-on refreshes its address column after it
+        has started.
+
+        :return: None
+        """
+
+        while True:
+            try:
+                phase, function, args = self.startupTasks.get_nowait()
+            except Empty:
+                return
+
+            with self.deviceLock:
+                try:
+                    with self.startupPhase(phase):
+                        function(*args)
+                except Exception:
+                    self.logger.exception(u"Unable to complete the startup work: %s", phase)
+
+    @contextmanager
+    def startupPhase(self, phase):
+        """
+        Times the work of a startup phase.
+
+        :param phase: The name of the phase.
+        :return: None
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.startupPhaseCounts[phase] += 1
+            self.startupPhaseTimes[phase] += elapsed
+            self.startupPhaseMaxTimes[phase] = max(self.startupPhaseMaxTimes[phase], elapsed)
 
     def deviceStopComm(self, device):
         """
@@ -445,6 +459,17 @@ class Plugin(indigo.PluginBase):
         :return: True or false to indicate if the device was stopped.
         """
 
+        with self.deviceLock:
+            self.stopDevice(device)
+
+    def stopDevice(self, device):
+        """
+        Stops a device. The caller must hold the device lock.
+
+        :param device: The device that is stopping.
+        :return: None
+        """
+
         if device.id not in self.shellyDevices:
             return
         self.logger.info(u"Stopping \"%s\"...", device.name)
@@ -454,48 +479,27 @@ class Plugin(indigo.PluginBase):
         #
         # See if any add-ons are connected
         #
-        for addonDev in list(self.shellyDevices.keys()):
-            addon_shelly = self.shellyDevices.get(addonDev)
-            if addon_shelly and addon_shelly.isAddon() and addon_shelly.getHostDevice().device.id == shelly.device.id:
+        for addon in self.getAddons(shelly.device.id):
+            if addon.device.id in self.shellyDevices:
                 # Save and stop dependents because these should be started when this device starts again
-                self.dependents[addon_shelly.device.id] = addon_shelly
-                self.deviceStopComm(addon_shelly.device)
+                self.dependents[addon.device.id] = addon
+                self.stopDevice(addon.device)
+                addon.setHostDevice(None)
 
         #
         # Remove subscriptions and message handlers
         #
         self.removeDeviceSubscriptions(shelly)
+        self.removeDeviceIdentifier(shelly)
+        if device.id not in self.dependents:
+            # Add-ons stopped along with their host stay indexed so that they start with it again
+            self.removeAddon(shelly)
+        shelly.saveLastInputEventId()
         for message_type in shelly.getMessageTypes():
-            self.messageTypes.remove(message_type)
-
-        #
-        # Attempt to unsubscribe from topics that are no longer being listened to
-        #
-        if self.mqttPlugin.isEnabled():
-            brokerSubscriptions = self.brokerDeviceSubscriptions[shelly.getBrokerId()]
-            topicsToRemove = []
-            for topic in brokerSubscriptions:
-                if not brokerSubscriptions[topic]:  # If no device is listening on this topic anymore
-                    # Band-aid for bug in MQTT-Connector (Issue #10 on MQTT-Connector GitHub)
-                    if self.pluginPrefs.get('connector-fix', False):
-                        topic = "0:%s" % topic
-
-                    props = {
-                        'topic': topic
-                    }
-                    # Unsubscribe the broker from this topic and remove the record of the topic
-                    # NOTE: Stopped subscribing to individual topics in 0.2.4
-                    # self.mqttPlugin.executeAction("del_subscription", deviceId=shelly.getBrokerId(), props=props)
-                    topicsToRemove.append(topic)
-
-            #
-            # Actually remove the unneeded lists associated with the unsubscribed topics
-            #
-            for topic in topicsToRemove:
-                # Band-aid for bug in MQTT-Connector (Issue #10 on MQTT-Connector GitHub)
-                if self.pluginPrefs.get('connector-fix', False):
-                    topic = topic[2:]
-                del brokerSubscriptions[topic]
+            self.messageTypes[message_type] -= 1
+            if self.messageTypes[message_type] <= 0:
+                # No other device shares this message type
+                del self.messageTypes[message_type]
 
         del self.shellyDevices[device.id]
 
@@ -514,7 +518,7 @@ class Plugin(indigo.PluginBase):
         :return: True or false whether the device had the communication properties changed.
         """
 
-        deviceClass = deviceClasses.get(newDev.deviceTypeId, None)
+        deviceClass = getDeviceClass(newDev.deviceTypeId)
         if deviceClass:
             return deviceClass.didCommPropertyChange(origDev, newDev)
 
@@ -542,58 +546,157 @@ class Plugin(indigo.PluginBase):
 
         # Get the corresponding shelly device
         shelly = self.shellyDevices.get(origDev.id, None)
+        if shelly is None:
+            return
+
+        propsChanged = dict(origDev.pluginProps) != dict(newDev.pluginProps)
+        if not propsChanged and origDev.name == newDev.name and origDev.deviceTypeId == newDev.deviceTypeId:
+            # Only the states changed, and newDev already has them, so there is nothing to refresh
+            shelly.device = newDev
+            return
 
         # Refresh the associated indigo device
-        if shelly:
-            shelly.refresh_device()
+        shelly.refresh_device()
+        if propsChanged:
+            # The topics handled by the device and its identifier are built from its props
+            shelly.compileTopicHandlers()
+            if shelly.device.id in self.deviceIdentifierKeys:
+                self.addDeviceIdentifier(shelly)
+            if shelly.device.id in self.addonHostIds:
+                self.addAddon(shelly)
 
         # Refresh the address column of addon devices that this device hosts
-        for dev in self.shellyDevices.values():
-            if dev.isAddon() and dev.getHostDevice() == shelly:
-                dev.refreshAddressColumn()
+        for addon in self.getAddons(shelly.device.id):
+            if addon.device.id in self.shellyDevices:
+                addon.refreshAddressColumn()
 
     def addDeviceSubscriptions(self, shelly):
         """
-        Adds a Shelly device to the dictionary of device subscriptions.
+        Adds a Shelly device to the topics it listens to.
 
         :param shelly: The Shelly device to add.
         :return: None
         """
 
-        # ensure that deviceSubscriptions has a dictionary of subscriptions for the broker
-        if shelly.getBrokerId() not in self.brokerDeviceSubscriptions:
-            self.brokerDeviceSubscriptions[shelly.getBrokerId()] = {}
+        self.subscriptions.add(shelly.getBrokerId(), shelly.device.id, shelly.getSubscriptions(), shelly.getTelemetryTopics())
+
+    def addDeviceIdentifier(self, shelly):
+        """
+        Adds a Shelly device to the index of device identifiers, replacing any previous entry for the device.
+
+        :param shelly: The Shelly device to add.
+        :return: None
+        """
+
+        self.removeDeviceIdentifier(shelly)
+        address = shelly.getAddress()
+        if not address:
+            return
+
+        key = (shelly.getBrokerId(), address.split("/")[-1])
+        self.deviceIdentifierKeys[shelly.device.id] = key
+        self.deviceIdentifiers.setdefault(key, {})[shelly.device.id] = shelly
+        if not kShellyIdPattern.match(key[1]):
+            self.unindexedDevices.setdefault(key[0], {})[shelly.device.id] = shelly
+
+    def removeDeviceIdentifier(self, shelly):
+        """
+        Removes a Shelly device from the index of device identifiers.
+
+        :param shelly: The Shelly device to remove.
+        :return: None
+        """
+
+        key = self.deviceIdentifierKeys.pop(shelly.device.id, None)
+        if key is None:
+            return
+
+        devices = self.deviceIdentifiers[key]
+        devices.pop(shelly.device.id, None)
+        if not devices:
+            del self.deviceIdentifiers[key]
+
+        devices = self.unindexedDevices.get(key[0], None)
+        if devices is not None:
+            devices.pop(shelly.device.id, None)
+            if not devices:
+                del self.unindexedDevices[key[0]]
+
+    def addAddon(self, addon):
+        """
+        Adds an add-on to the index of host add-ons, replacing any previous entry for the add-on.
+
+        :param addon: The Shelly add-on to add.
+        :return: None
+        """
+
+        self.removeAddon(addon)
+        hostId = addon.getHostId()
+        if hostId is None:
+            return
 
-        brokerSubscriptions = self.brokerDeviceSubscriptions[shelly.getBrokerId()]
-        subscriptions = shelly.getSubscriptions()
-        for topic in subscriptions:
-            # See if there is a list of devices already listening to this subscription
-            if topic not in brokerSubscriptions:
-                # initialize a new list of devices for this subscription
-                brokerSubscriptions[topic] = []
-            brokerSubscriptions[topic].append(shelly.device.id)
-            # self.logger.debug(u"Added '%s' to '%s' on '%s'", shelly.device.name, topic, indigo.devices[shelly.getBrokerId()].name)
+        self.addonHostIds[addon.device.id] = hostId
+        self.hostAddons.setdefault(hostId, {})[addon.device.id] = addon
+
+    def removeAddon(self, addon):
+        """
+        Removes an add-on from the index of host add-ons.
+
+        :param addon: The Shelly add-on to remove.
+        :return: None
+        """
+
+        hostId = self.addonHostIds.pop(addon.device.id, None)
+        if hostId is None:
+            return
+
+        addons = self.hostAddons[hostId]
+        addons.pop(addon.device.id, None)
+        if not addons:
+            del self.hostAddons[hostId]
+
+    def getAddons(self, hostId):
+        """
+        Getter for the add-ons of a host, both running and waiting for the host to start.
+
+        :param hostId: The device id of the host.
+        :return: A list of Shelly add-ons.
+        """
+
+        addons = self.hostAddons.get(hostId, None)
+        if addons is None:
+            return []
+        return list(addons.values())
+
+    def getDevicesByIdentifier(self, brokerId, identifier):
+        """
+        Finds the running devices on a broker whose address contains an identifier. Most devices are
+        found in the index of device identifiers. Otherwise only the devices whose address does not
+        end in a device id are searched, since a device whose address ends in a device id announces
+        that id.
+
+        :param brokerId: The device id of the broker.
+        :param identifier: The identifier to find.
+        :return: A list of Shelly devices.
+        """
+
+        devices = self.deviceIdentifiers.get((brokerId, identifier), None)
+        if devices:
+            return list(devices.values())
+
+        devices = self.unindexedDevices.get(brokerId, {})
+        return [shelly for shelly in list(devices.values()) if identifier in shelly.getAddress()]
 
     def removeDeviceSubscriptions(self, shelly):
         """
-        Removes a Shelly device from the dictionary of device subscriptions.
+        Removes a Shelly device from the topics it listens to.
 
         :param shelly: The Shelly object to remove.
         :return: None
         """
 
-        # make sure that the device's broker has subscriptions
-        if shelly.getBrokerId() in self.brokerDeviceSubscriptions:
-            brokerSubscriptions = self.brokerDeviceSubscriptions[shelly.getBrokerId()]
-            subscriptions = shelly.getSubscriptions()
-            for topic in subscriptions:
-                if topic in brokerSubscriptions and shelly.device.id in brokerSubscriptions[topic]:
-                    # self.logger.debug(u"Removed '%s' from '%s' on '%s'", shelly.device.name, topic, indigo.devices[shelly.getBrokerId()].name)
-                    brokerSubscriptions[topic].remove(shelly.device.id)
-
-            # remove the broker key if there are no more devices using it
-            if len(brokerSubscriptions) == 0:
-                del self.brokerDeviceSubscriptions[shelly.getBrokerId()]
+        # The topics are unsubscribed from on the next flush if no device starts listening to them again
+        self.subscriptions.remove(shelly.device.id)
 
     def _normalize_action(self, action):
         """
@@ -691,7 +794,7 @@ class Plugin(indigo.PluginBase):
         :return:
         """
 
-        self.triggers[trigger.id] = trigger
+        self.triggers.add(trigger)
 
     def triggerStopProcessing(self, trigger):
         """
@@ -701,7 +804,7 @@ class Plugin(indigo.PluginBase):
         :return:
         """
 
-        del self.triggers[trigger.id]
+        self.triggers.remove(trigger.id)
 
     def triggerUpdated(self, origTrigger, newTrigger):
         """
@@ -724,10 +827,10 @@ class Plugin(indigo.PluginBase):
                 self.discoveredMessageTypes.append(message_type)
 
         if self.isShellyMQTTTrigger(origTrigger):
-            del self.triggers[origTrigger.id]
+            self.triggers.remove(origTrigger.id)
 
         if self.isShellyMQTTTrigger(newTrigger):
-            self.triggers[newTrigger.id] = newTrigger
+            self.triggers.add(newTrigger)
 
     ##########################################################################
     #
@@ -743,55 +846,221 @@ class Plugin(indigo.PluginBase):
         :return: None
         """
 
-        if message['message_type'] not in self.messageTypes:
+        message_type = message['message_type']
+        if message_type not in self.messageTypes:
             # None of the devices care about this message
+            self.ignoredMessageCounts[message_type] += 1
             self.logger.debug(u"ignoring MQTT message of type \"%s\"", message["message_type"])
             return
         else:
-            self.logger.debug(u"Queued MQTT message type {} from {}".format(message["message_type"], indigo.devices[int(message["brokerID"])].name))
+            self.acceptedMessageCounts[message_type] += 1
+            if self.debugLogging:
+                # The broker name is only looked up when it will be logged
+                self.logger.debug(u"Queued MQTT message type %s from %s", message_type, self.getBrokerName(int(message["brokerID"])))
             self.messageQueue.put(message)
 
-    def processMessages(self):
+    def getBrokerName(self, brokerId):
+        """
+        Getter for the name of a broker. The names are cached, since looking up a device is a call
+        to the Indigo server, and the cache is cleared with the device props write-behind.
+
+        :param brokerId: The device id of the broker.
+        :return: The name of the broker.
+        """
+
+        name = self.brokerNames.get(brokerId, None)
+        if name is None:
+            name = self.brokerNames[brokerId] = indigo.devices[brokerId].name
+        return name
+
+    def processMessages(self, timeout=None):
         """
         Processes messages in the queue until the queue is empty. This is used to pass
-        messages that have come from MQTT into the appropriate devices.
+        messages that have come from MQTT into the appropriate devices. The bursts that have
+        settled are handled as well, and the wait for a message ends when the next burst settles.
+
+        :param timeout: When given, block for up to this many seconds waiting for the first message.
+        :return: None
+        """
+
+        deadline = self.bursts.getNextDeadline()
+        if deadline is not None and timeout is not None:
+            timeout = max(0, min(timeout, deadline - time.monotonic()))
+
+        try:
+            message = self.messageQueue.get(block=timeout is not None, timeout=timeout)
+        except Empty:
+            if self.bursts:
+                self.handleSettledBursts()
+            return
+
+        workers = self.messageWorkers
+        if (workers.size if workers else 0) != self.messageWorkerCount:
+            if workers:
+                workers.stop()
+            self.messageWorkers = ShellyWorkers(self.messageWorkerCount, self.logger) if self.messageWorkerCount > 0 else None
+
+        # Gather every notification that has been queued so far
+        notifications = []
+        while message:
+            notifications.append(message)
+            try:
+                message = self.messageQueue.get_nowait()
+            except Empty:
+                break
+
+        if self.pluginPrefs.get('batch-message-fetching', True):
+            # Fetching drains everything queued for a broker and message type,
+            # so repeated notifications for the same pair only need a single pass.
+            # The pairs are kept in the order they were first notified.
+            pending = dict.fromkeys((int(notification['brokerID']), notification['message_type']) for notification in notifications)
+
+            for brokerID, message_type in pending:
+                self.fetchMessages(brokerID, message_type)
+        else:
+            for notification in notifications:
+                self.fetchMessages(int(notification['brokerID']), notification['message_type'])
+
+        while True:
+            message = self.pendingMessages.get()
+            if message is None:
+                break
+            self.dispatchMessage(*message)
+
+        if self.bursts:
+            self.handleSettledBursts()
+
+        # The workers are not waited on, so that a slow device does not hold up the next
+        # messages of the other devices. The queue of each worker keeps its devices in order.
+
+    def submitDeviceWork(self, shelly, function, *args):
+        """
+        Does work for a device, either directly or through the worker that handles the physical
+        device. Add-ons share the address of their host, so they are handled by the same worker
+        as the host and the work for a device is always done in order.
+
+        :param shelly: The Shelly device.
+        :param function: The function to call.
+        :param args: The arguments to call the function with.
+        :return: None
+        """
+
+        if self.messageWorkers is None:
+            function(*args)
+        else:
+            self.messageWorkers.submit((shelly.getBrokerId(), shelly.getAddress()), function, *args)
+
+    def handleDeviceMessage(self, shelly, topic, payload):
+        """
+        Passes a message to a device, in order with the other work for the device.
 
+        :param shelly: The Shelly device.
+        :param topic: The topic of the message.
+        :param payload: The payload of the message.
         :return: None
         """
 
-        while not self.messageQueue.empty():
-            # At least 1 of the devices care about this message
-            message = self.messageQueue.get()
-            if not message:
+        self.submitDeviceWork(shelly, shelly.handleMessage, topic, payload)
+
+    def handleBurst(self, messages):
+        """
+        Passes the messages of a burst to the devices that are still running, so that each
+        device handles its part of the burst in a single pass.
+
+        :param messages: A list of (shelly, topic, payload) tuples.
+        :return: None
+        """
+
+        deviceMessages = {}
+        for shelly, topic, payload in messages:
+            deviceMessages.setdefault(shelly.device.id, (shelly, []))[1].append((topic, payload))
+
+        for deviceId, (shelly, burst) in deviceMessages.items():
+            if self.shellyDevices.get(deviceId, None) is not shelly:
+                continue
+            self.submitDeviceWork(shelly, shelly.handleMessages, burst)
+
+    def handleSettledBursts(self):
+        """
+        Handles every burst that has settled.
+
+        :return: None
+        """
+
+        for messages in self.bursts.popSettled(time.monotonic()):
+            self.handleBurst(messages)
+
+    def fetchMessages(self, brokerID, message_type):
+        """
+        Fetches all of the messages queued by the MQTT Connector for a broker and message type
+        into the pending messages. Messages on the telemetry topics of the devices are queued
+        behind the control messages, and only the newest message on each telemetry topic is kept,
+        so the pending messages stay bounded while a device floods the broker with readings.
+
+        :param brokerID: The device id of the broker.
+        :param message_type: The message type to fetch.
+        :return: None
+        """
+
+        props = {'message_type': message_type}
+        while True:
+            data = self.mqttPlugin.executeAction("fetchQueuedMessage", deviceId=brokerID, props=props, waitUntilDone=True)
+            if data is None:  # Ensure we got data back
+                break
+
+            topic = '/'.join(data['topic_parts'])
+            if self.subscriptions.isTelemetry(brokerID, topic):
+                if self.pendingMessages.putTelemetry((brokerID, message_type, topic), (brokerID, data)):
+                    # The newest reading replaced the one that has not been handled yet
+                    self.coalescedMessageCounts[message_type] += 1
+            else:
+                self.pendingMessages.putControl((brokerID, data))
+
+    def dispatchMessage(self, brokerID, data):
+        """
+        Passes a single message fetched from the MQTT Connector to the devices that need it.
+
+        :param brokerID: The device id of the broker the message was published to.
+        :param data: The message data returned by the MQTT Connector.
+        :return: None
+        """
+
+        topic = '/'.join(data['topic_parts'])  # transform the topic into a single string
+        payload = data['payload']
+        if isinstance(payload, str):
+            # Devices sharing the payload decode its json once
+            payload = ShellyPayload(payload)
+        message_type = data['message_type']
+        debug = self.debugLogging
+        if debug:
+            self.logger.debug(u"    Processing: \"%s\" on topic \"%s\"", payload, topic)
+        if topic == "shellies/announce":
+            # Announcements are only passed to the devices they describe
+            try:
+                announcement = payload.decode()
+            except ValueError:
+                self.logger.error(u"Unable to convert '{}' into python object!".format(payload))
                 return
+            self.processAnnouncement(brokerID, announcement, message_type)
+            return
 
-            # We have a valid message
-            # Find the devices that need to get this message and give it to them
-            brokerID = int(message['brokerID'])
-            props = {'message_type': message['message_type']}
-            while True:
-                data = self.mqttPlugin.executeAction("fetchQueuedMessage", deviceId=brokerID, props=props, waitUntilDone=True)
-                if data is None:  # Ensure we got data back
-                    break
-
-                topic = '/'.join(data['topic_parts'])  # transform the topic into a single string
-                payload = data['payload']
-                message_type = data['message_type']
-                self.logger.debug(u"    Processing: \"%s\" on topic \"%s\"", payload, topic)
-                deviceSubscriptions = self.brokerDeviceSubscriptions.get(brokerID, {})  # get device subscriptions for this broker
-                devices = deviceSubscriptions.get(topic, list())  # get devices listening on this broker for this topic
-                for deviceId in devices:
-                    shelly = self.shellyDevices.get(deviceId, None)
-                    if shelly is not None and message_type in shelly.getMessageTypes():
-                        # Send this message data to the shelly object
-                        self.logger.debug(u"        \"%s\" handling \"%s\" on \"%s\"", shelly.device.name, payload, topic)
-                        shelly.handleMessage(topic, payload)
-
-                if topic == "shellies/announce":
-                    # Send this message to also be parsed by the plugin
-                    self.processAnnouncement(brokerID, payload)
-
-    def processAnnouncement(self, brokerId, payload):
+        devices = self.subscriptions.get(brokerID, topic)  # get devices listening on this broker for this topic
+        for deviceId in devices:
+            shelly = self.shellyDevices.get(deviceId, None)
+            if shelly is not None and message_type in shelly.getMessageTypes():
+                # Send this message data to the shelly object
+                if debug:
+                    self.logger.debug(u"        \"%s\" handling \"%s\" on \"%s\"", shelly.device.name, payload, topic)
+                if not shelly.burstTopics:
+                    self.handleDeviceMessage(shelly, topic, payload)
+                elif topic in shelly.burstTopics:
+                    self.bursts.add((brokerID, shelly.getAddress()), shelly.burstSettleTime, time.monotonic(), shelly, topic, payload)
+                else:
+                    # The burst that is waiting is handled ahead of the message that bypasses it
+                    self.handleBurst(self.bursts.pop((brokerID, shelly.getAddress())))
+                    self.handleDeviceMessage(shelly, topic, payload)
+
+    def processAnnouncement(self, brokerId, announcement, message_type=None):
         """
         Parses the data from an announce message. The payload is expected to be of the form:
         {
@@ -802,8 +1071,8 @@ class Plugin(indigo.PluginBase):
             "new_fw": <true/false>
         }
 
-        This method will check against a list of known devices and will keep track
-        of announcement messages that don't belong to a known device.
+        The announcement is passed to the known devices that it describes, and announcement
+        messages that don't belong to a known device are kept track of.
 
         Gen 2 devices will send an announcement that looks like:
         {
@@ -823,23 +1092,29 @@ class Plugin(indigo.PluginBase):
         Gen 2 messages should be ignored.
 
         :param brokerId The device id of the broker that the message was published to.
-        :param payload The payload of the message.
+        :param announcement The decoded payload of the message.
+        :param message_type The message type of the message, or None to not pass it to any devices.
         :return: None
         """
 
-        # Parse the json message into a python object
-        try:
-            announcement = json.loads(payload)
-        except ValueError:
-            self.logger.error(u"Unable to convert '{}' into python object!".format(payload))
+        if not isinstance(announcement, dict):
+            self.logger.error(u"Unable to parse announcement: {}".format(announcement))
             return
 
+        # Find the devices that this announcement describes
+        identifier = announcement.get('id', None)
+        devices = self.getDevicesByIdentifier(brokerId, identifier) if identifier else []
+        if message_type is not None:
+            for shelly in devices:
+                if message_type in shelly.getMessageTypes():
+                    self.logger.debug(u"        \"%s\" handling announcement from \"%s\"", shelly.device.name, identifier)
+                    self.handleDeviceMessage(shelly, "shellies/announce", announcement)
+
         if announcement.get("gen", 1) == 2:
-            self.logger.debug(f"Ignoring gen 2 device announcement from {announcement.get('id', 'Unknown')}")
+            self.logger.debug(u"Ignoring gen 2 device announcement from %s", announcement.get('id', 'Unknown'))
             return
 
         # Ensure we at least have the id key present
-        identifier = announcement.get('id', None)
         if not identifier:
             self.logger.error(u"Unable to parse announcement: {}".format(announcement))
             return
@@ -850,19 +1125,12 @@ class Plugin(indigo.PluginBase):
 
         # See if this device is not in our indigo devices list
         # This would indicate that this is an unknown device
-        known = False
-        for shelly in self.shellyDevices.values():
-            if shelly.getBrokerId() and shelly.getBrokerId() == brokerId and identifier in shelly.getAddress():
-                # This device is on the same broker and has the same address/identifier
-                known = True
-
-                # Ensure this identifier on the broker is not in the "unknown" list
-                self.discoveredDevices[brokerId].pop(identifier, None)
-                break
-
-        if not known:
+        if devices:
+            # Ensure this identifier on the broker is not in the "unknown" list
+            self.discoveredDevices[brokerId].pop(identifier, None)
+        else:
             # Here is where device creation COULD happen automatically
-            self.logger.info(u"Discovered a new device with an address of \"{}\" with ip: \"{}\"".format(identifier, announcement.get('ip', "Unavailable")))
+            self.logger.info(u"Discovered a new device with an address of \"%s\" with ip: \"%s\"", identifier, announcement.get('ip', "Unavailable"))
 
             # store the announcement within the broker list using the id as the key
             self.discoveredDevices[brokerId][identifier] = announcement
@@ -894,6 +1162,18 @@ class Plugin(indigo.PluginBase):
                 is_valid = False
                 errors['low-battery-threshold'] = u"You must enter an integer value."
 
+        # Validate the state refresh interval
+        interval = valuesDict.get('state-refresh-interval', None)
+        if not interval:
+            valuesDict['state-refresh-interval'] = 10
+        else:
+            try:
+                if int(interval) < 0:
+                    raise ValueError()
+            except ValueError:
+                is_valid = False
+                errors['state-refresh-interval'] = u"You must enter an integer value of 0 or more."
+
         return is_valid, valuesDict, errors
 
     def validateDeviceConfigUi(self, valuesDict, typeId, devId):
@@ -906,7 +1186,7 @@ class Plugin(indigo.PluginBase):
         :return: True if the config is valid.
         """
 
-        deviceClass = deviceClasses.get(typeId, None)
+        deviceClass = getDeviceClass(typeId)
         if deviceClass:
             errors = indigo.Dict()
             isValid, valuesDict, errors = deviceClass.validateConfigUI(valuesDict, typeId, devId)
@@ -1039,6 +1319,9 @@ class Plugin(indigo.PluginBase):
         if userCancelled is False:
             self.setLogLevel(valuesDict.get('log-level', "info"))
             self.lowBatteryThreshold = int(valuesDict.get('low-battery-threshold', 20))
+            self.stateRefreshInterval = int(valuesDict.get('state-refresh-interval', 10)) * 60
+            self.subscriptions.connectorFix = valuesDict.get('connector-fix', False)
+            self.messageWorkerCount = int(valuesDict.get('message-workers', 0))
 
         for shelly in self.shellyDevices.values():
             if shelly.isAddon():
@@ -1062,6 +1345,9 @@ class Plugin(indigo.PluginBase):
         if level not in valid_log_levels:
             self.logger.error(u"Attempted to set the log level to an unhandled value: {}".format(level))
 
+        # The debug messages logged for every message are only built when they will be shown
+        self.debugLogging = level == "debug"
+
         if level == "debug":
             self.indigo_log_handler.setLevel(logging.DEBUG)
             self.logger.debug(u"Log level set to debug")
@@ -1081,7 +1367,7 @@ class Plugin(indigo.PluginBase):
         """
 
         deviceType = device.deviceTypeId
-        deviceClass = deviceClasses[deviceType]
+        deviceClass = getDeviceClass(deviceType)
         if deviceClass:
             return deviceClass(device)
         else:
@@ -1094,11 +1380,98 @@ class Plugin(indigo.PluginBase):
         """
 
         self.logger.debug(u"Broker-Device Subscriptions:")
-        for broker in self.brokerDeviceSubscriptions:
+        for broker in self.subscriptions.topics:
             self.logger.debug(u"    Broker %s:", broker)
-            deviceSubscriptions = self.brokerDeviceSubscriptions[broker]
-            for topic in deviceSubscriptions:
-                self.logger.debug(u"        %s: %s", topic, deviceSubscriptions[topic])
+            for topic in self.subscriptions.topics[broker]:
+                self.logger.debug(u"        %s: %s", topic, self.subscriptions.get(broker, topic))
+
+    def printMessageTypeStatistics(self, pluginAction=None, device=None, callerWaitingForResult=False):
+        """
+        Print out the number of devices using each message type, how many broadcasts
+        of each type have been accepted or ignored, and how many telemetry messages were coalesced.
+
+        :param pluginAction:
+        :param device:
+        :param callerWaitingForResult:
+        :return: None
+        """
+
+        messageTypes = set(self.messageTypes) | set(self.acceptedMessageCounts) | set(self.ignoredMessageCounts) | set(self.coalescedMessageCounts)
+        if len(messageTypes) == 0:
+            self.logger.info(u"No message types are in use and no messages have been received.")
+            return
+
+        self.logger.info(u"    {:25} {:>8} {:>10} {:>10} {:>10}".format("Message Type", "Devices", "Accepted", "Ignored", "Coalesced"))
+        for message_type in sorted(messageTypes):
+            self.logger.info(u"    {:25} {:>8} {:>10} {:>10} {:>10}".format(message_type, self.messageTypes[message_type], self.acceptedMessageCounts[message_type],
+                                                                       self.ignoredMessageCounts[message_type], self.coalescedMessageCounts[message_type]))
+
+    def printStateUpdateStatistics(self, pluginAction=None, device=None, callerWaitingForResult=False):
+        """
+        Print out the number of state updates each device has written to the server and how many
+        were skipped because they would not have changed the state.
+
+        :param pluginAction:
+        :param device:
+        :param callerWaitingForResult:
+        :return: None
+        """
+
+        if len(self.shellyDevices) == 0:
+            self.logger.info(u"There are no Shelly devices running.")
+            return
+
+        self.logger.info(u"    {:40} {:>10} {:>10}".format("Device", "Written", "Skipped"))
+        written = 0
+        suppressed = 0
+        for shelly in sorted(self.shellyDevices.values(), key=lambda s: s.device.name):
+            self.logger.info(u"    {:40} {:>10} {:>10}".format(shelly.device.name, shelly.writtenStateCount, shelly.suppressedStateCount))
+            written += shelly.writtenStateCount
+            suppressed += shelly.suppressedStateCount
+        self.logger.info(u"    {:40} {:>10} {:>10}".format("Total", written, suppressed))
+
+    def reportStartup(self):
+        """
+        Prints the device start statistics once the startup work is done and no device has started
+        for a while.
+
+        :return: None
+        """
+
+        if self.startupReported or self.lastDeviceStart is None or not self.startupTasks.empty():
+            return
+        if time.monotonic() - self.lastDeviceStart < kStartupReportDelay:
+            return
+
+        self.startupReported = True
+        self.logger.info(u"Started {} devices".format(sum(self.deviceVersionCounts.values())))
+        self.printDeviceStartStatistics()
+
+    def printDeviceStartStatistics(self, pluginAction=None, device=None, callerWaitingForResult=False):
+        """
+        Print out how many of the devices that started had to be migrated to the current device
+        version and the time that was spent in each phase of starting the devices.
+
+        :param pluginAction:
+        :param device:
+        :param callerWaitingForResult:
+        :return: None
+        """
+
+        migrated = self.deviceVersionCounts['migrated']
+        current = self.deviceVersionCounts['current']
+        self.logger.info(u"    {:25} {:>8}".format("Device Version", kCurDevVersion))
+        self.logger.info(u"    {:25} {:>8}".format("Devices Started", migrated + current))
+        self.logger.info(u"    {:25} {:>8}".format("Already Up To Date", current))
+        self.logger.info(u"    {:25} {:>8}".format("Migrated", migrated))
+        self.logger.info(u"    {:25} {:>8}".format("Startup Work Waiting", self.startupTasks.qsize()))
+
+        self.logger.info(u"    {:12} {:>8} {:>12} {:>12} {:>12}".format("Phase", "Count", "Total ms", "Average ms", "Max ms"))
+        for phase in kStartupPhases:
+            count = self.startupPhaseCounts[phase]
+            total = self.startupPhaseTimes[phase] * 1000
+            average = total / count if count else 0.0
+            self.logger.info(u"    {:12} {:>8} {:>12.1f} {:>12.1f} {:>12.1f}".format(phase, count, total, average, self.startupPhaseMaxTimes[phase] * 1000))
 
     @staticmethod
     def isShellyMQTTTrigger(trigger):
@@ -1136,6 +1509,49 @@ class Plugin(indigo.PluginBase):
         self.logger.info(u"Build code: {}".format(build_code_file.read()))
         build_code_file.close()
 
+    def runAnnouncer(self):
+        """
+        Sends the announce commands that are due for the devices that started. The announcer is run
+        under the device lock, since Indigo can be starting devices at the same time.
+
+        :return: None
+        """
+
+        with self.deviceLock:
+            brokers, devices = self.announcer.run(time.monotonic(), self.getBrokerAddresses)
+        for brokerId in brokers:
+            self.publishAnnounce(brokerId, "shellies/command")
+        for brokerId, address in devices:
+            self.publishAnnounce(brokerId, "{}/command".format(address))
+
+    def getBrokerAddresses(self, brokerId):
+        """
+        Getter for the addresses of the running devices on a broker. The caller must hold the device lock.
+
+        :param brokerId: The device id of the broker.
+        :return: A set of addresses.
+        """
+
+        return {shelly.getAddress() for shelly in self.shellyDevices.values() if shelly.getBrokerId() == brokerId}
+
+    def publishAnnounce(self, brokerId, topic):
+        """
+        Publishes an announce command to a broker.
+
+        :param brokerId: The device id of the broker.
+        :param topic: Either "shellies/command" to ask every device on the broker, or the command topic of a device.
+        :return: None
+        """
+
+        props = {
+            'topic': topic,
+            'payload': 'announce',
+            'qos': 0,
+            'retain': 0,
+        }
+        self.mqttPlugin.executeAction("publish", deviceId=brokerId, props=props, waitUntilDone=False)
+        self.logger.debug(u"published \"announce\" to \"%s\" on broker %s", topic, brokerId)
+
     def discoverShelly(self, pluginAction, device, callerWaitingForResult):
         """
         Handler for discovering a targeted Shelly device. This will send an announce command to
@@ -1174,14 +1590,7 @@ class Plugin(indigo.PluginBase):
             for brokerId in brokerIds:
                 brokerId = int(brokerId)
                 if indigo.devices[brokerId].enabled:
-                    props = {
-                        'topic': 'shellies/command',
-                        'payload': 'announce',
-                        'qos': 0,
-                        'retain': 0,
-                    }
-                    self.mqttPlugin.executeAction("publish", deviceId=brokerId, props=props, waitUntilDone=False)
-                    self.logger.debug(u"published \"announce\" to \"shellies/command\" on broker \"%s\"", indigo.devices[brokerId].name)
+                    self.publishAnnounce(brokerId, "shellies/command")
 
     def updateShelly(self, valuesDict, typeId):
         """
@@ -1522,12 +1931,7 @@ class Plugin(indigo.PluginBase):
 
         # Dynamically build a filter if none was supplied
         if filter is None or len(filter) == 0:
-            related_device_types = []
-            for model in deviceModelInformation[typeId]['relations']:
-                for model_type_id, info in deviceModelInformation.items():
-                    if info['class'] is model:
-                        related_device_types.append("self.{}".format(model_type_id))
-            filter = ",".join(related_device_types)
+            filter = ",".join("self.{}".format(related_type_id) for related_type_id in getRelatedDeviceTypes(typeId))
 
         # Build the related devices section
         related_devices = []
@@ -1675,7 +2079,7 @@ class Plugin(indigo.PluginBase):
             return [(u"-1", u"%%disabled:No TRV device selected!%%")]
 
         shelly = self.shellyDevices[int(device_id)]
-        if not isinstance(shelly, Shelly_TRV):
+        if not isinstance(shelly, getDeviceClass("shelly-trv")):
             return []
 
         menu_items = []